@@ -0,0 +1,90 @@
+"""
+Benchmark of the chunked encoding of image sequences
+Encodes an image sequence into mp4 with a single ffmpeg process using every core, then
+in chunks encoded in parallel, then again in chunks after touching a single frame.
+
+    python bench_chunked_encoding.py [first_frame_of_a_sequence] [--profile mp4] [--chunk-size 100]
+
+Without a sequence, a synthetic EXR sequence is generated with the ffmpeg found in the PATH.
+"""
+
+import sys
+import os
+# Add the "scripts" directory to paths python can use, to avoid import errors
+pipeline_root = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+sys.path.append(os.path.join(pipeline_root, "scripts"))
+
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from batch_convert import get_transcoder, PROFILES
+from chunked_encoding import ChunkedTranscoder
+
+# Synthetic sequence : 500 frames in 1920x1080
+FRAME_COUNT = 500
+RESOLUTION = "1920x1080"
+
+
+def generate_sequence(folder):
+    """Writes a synthetic EXR sequence and returns the path of its first frame"""
+    subprocess.check_call([
+        "ffmpeg", "-loglevel", "error", "-f", "lavfi",
+        "-i", f"testsrc2=size={RESOLUTION}:rate=25",
+        "-frames:v", str(FRAME_COUNT), "-start_number", "1001",
+        "-pix_fmt", "gbrpf32le", folder + "/bench.%04d.exr"
+    ])
+    return folder + "/bench.1001.exr"
+
+
+def measure(label, function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.2f}s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="WARNING")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?")
+    parser.add_argument("--profile", default="mp4", choices=sorted(PROFILES))
+    parser.add_argument("--chunk-size", type=int, default=100)
+    arguments = parser.parse_args()
+
+    temporary_folder = None
+    first_frame = arguments.input
+    if not first_frame:
+        temporary_folder = tempfile.mkdtemp()
+        first_frame = generate_sequence(temporary_folder)
+
+    workers = os.cpu_count() or 1
+    try:
+        single = measure(
+            "single process",
+            lambda: get_transcoder(first_frame, arguments.profile).transcode(force=True)
+        )
+        chunked_transcoder = ChunkedTranscoder(
+            get_transcoder(first_frame, arguments.profile, threads=1), arguments.chunk_size, workers
+        )
+        chunked = measure(
+            f"{workers} chunks of {chunked_transcoder.chunk_size} frames in parallel",
+            lambda: chunked_transcoder.transcode(force=True)
+        )
+
+        # Render a single frame again, only its chunk is encoded again
+        sequence = chunked_transcoder.sequence
+        os.utime(sequence.frame_path(sequence.frames[len(sequence.frames) // 2]))
+        incremental = measure(
+            "chunked, after touching one frame",
+            lambda: ChunkedTranscoder(
+                get_transcoder(first_frame, arguments.profile, threads=1), arguments.chunk_size, workers
+            ).transcode()
+        )
+        print(f"Speedup : {single / chunked:.2f}x, {single / incremental:.2f}x after touching one frame")
+    finally:
+        if temporary_folder:
+            shutil.rmtree(temporary_folder)
@@ -0,0 +1,109 @@
+"""
+Benchmark of the incremental csv import on a synthetic shot list
+Writes a csv file of about 20k shots in a temporary database, then measures a full
+rewrite of every document (the previous behaviour of the importers), the first import,
+an import where nothing changed and an import where a single row changed.
+Then the latency of a network share is simulated on each write, and the first import
+of a smaller sheet is measured with more and more workers.
+
+    python bench_csv_import.py [number_of_shots] [write_latency_in_ms]
+"""
+
+import sys
+import os
+# Add the "scripts" directory to paths python can use, to avoid import errors
+pipeline_root = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+sys.path.append(os.path.join(pipeline_root, "scripts"))
+
+import csv
+import json
+import time
+import shutil
+import tempfile
+import csv_import
+from csv_import import import_csv
+
+# Shots per sequence of the synthetic shot list
+SHOTS_PER_SEQUENCE = 50
+
+# Shots of the sheet imported with a simulated latency, and numbers of workers measured
+LATENCY_SHOT_COUNT = 2000
+WORKER_COUNTS = [1, 2, 4, 8, 16]
+
+
+def write_csv(path, shot_count, changed_shot=None):
+    """Writes the synthetic shot list, the frame range of changed_shot differs"""
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["shot", "sequence", "frame_start", "frame_end"])
+        for index in range(shot_count):
+            shot = f"sh{index * 10:06d}"
+            frame_end = 1100 if shot == changed_shot else 1050
+            writer.writerow([shot, f"sq{index // SHOTS_PER_SEQUENCE:04d}", 1001, frame_end])
+
+
+def full_rewrite(csv_file_path, output_folder):
+    """Removes and writes every document, as the importers did before"""
+    with open(csv_file_path, 'r') as csv_file:
+        for row in csv.DictReader(csv_file):
+            json_filename = output_folder + "/" + row["shot"] + ".json"
+            if os.path.exists(json_filename):
+                os.remove(json_filename)
+            with open(json_filename, 'w') as json_file:
+                json_file.write(json.dumps(row, indent=4))
+
+
+def simulate_latency(latency):
+    """Adds the latency of a network share to every document written by the importer"""
+    write_file_atomic = csv_import.write_file_atomic
+
+    def slow_write_file_atomic(path, content):
+        time.sleep(latency)
+        write_file_atomic(path, content)
+    csv_import.write_file_atomic = slow_write_file_atomic
+
+
+if __name__ == "__main__":
+    shot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+    database_folder = tempfile.mkdtemp().replace("\\", "/")
+    try:
+        csv_file_path = database_folder + "/shots.csv"
+        write_csv(csv_file_path, shot_count)
+
+        summary = import_csv(csv_file_path, "shots", database_folder=database_folder)
+        print(f"First import   : {summary}")
+
+        start = time.perf_counter()
+        full_rewrite(csv_file_path, database_folder + "/shots")
+        print(f"Full rewrite   : {shot_count} documents in {time.perf_counter() - start:.2f}s")
+
+        # The full rewrite changed the modification times, the documents are hashed again once
+        summary = import_csv(csv_file_path, "shots", database_folder=database_folder)
+        print(f"After rewrite  : {summary}")
+
+        summary = import_csv(csv_file_path, "shots", database_folder=database_folder)
+        print(f"Unchanged      : {summary}")
+
+        write_csv(csv_file_path, shot_count, changed_shot=f"sh{(shot_count // 2) * 10:06d}")
+        summary = import_csv(csv_file_path, "shots", database_folder=database_folder)
+        print(f"One row change : {summary}")
+
+        write_csv(csv_file_path, shot_count - 100)
+        summary = import_csv(csv_file_path, "shots", remove_missing=True, database_folder=database_folder)
+        print(f"Removed rows   : {summary}")
+
+        simulate_latency(latency)
+        write_csv(csv_file_path, LATENCY_SHOT_COUNT)
+        reference = None
+        for workers in WORKER_COUNTS:
+            shutil.rmtree(database_folder + "/shots")
+            os.remove(database_folder + "/shots.hashes.json")
+            summary = import_csv(csv_file_path, "shots", database_folder=database_folder, workers=workers)
+            reference = reference or summary.elapsed
+            print(
+                f"{latency * 1000:.0f} ms per write, {workers:>2} workers : {summary.elapsed:.2f}s "
+                f"(x{reference / summary.elapsed:.1f}) for {len(summary.added)} documents"
+            )
+    finally:
+        shutil.rmtree(database_folder)
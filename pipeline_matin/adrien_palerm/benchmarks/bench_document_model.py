@@ -0,0 +1,66 @@
+"""
+Benchmark of the compact document model on a synthetic project
+Parses about 100k shot documents from json, then measures the memory and load time
+of plain dictionaries, ShotDocument objects and a DocumentColumns, and the time to
+resolve a pattern with each of them.
+
+    python bench_document_model.py [number_of_shots]
+"""
+
+import sys
+import os
+# Add the "scripts" directory to paths python can use, to avoid import errors
+pipeline_root = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+sys.path.append(os.path.join(pipeline_root, "scripts"))
+
+import gc
+import json
+import time
+import tracemalloc
+from pattern_resolver import resolve_patterns
+from document_model import ShotDocument, DocumentColumns
+
+# Shots per sequence of the synthetic project
+SHOTS_PER_SEQUENCE = 50
+
+# Pattern resolved with every document
+PATTERN = "D:/project/shots/<sequence>/<shot>/lighting/work"
+
+
+def get_json_documents(shot_count):
+    """Returns the json content of the synthetic shot documents, as found in database/shots"""
+    return [
+        json.dumps({"shot": f"sh{index * 10:06d}", "sequence": f"sq{index // SHOTS_PER_SEQUENCE:04d}"}, indent=4)
+        for index in range(shot_count)
+    ]
+
+
+def measure(label, load, contents):
+    """Loads the documents, printing the time spent and the memory they use"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    documents = load(contents)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} : load {elapsed:.2f}s, {size / 1024 / 1024:.1f} MB ({size / len(contents):.0f} bytes per shot)")
+    return documents
+
+
+if __name__ == "__main__":
+    shot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    contents = get_json_documents(shot_count)
+
+    dictionaries = measure("dict", lambda contents: [json.loads(content) for content in contents], contents)
+    documents = measure("ShotDocument", lambda contents: [ShotDocument(json.loads(content)) for content in contents], contents)
+    columns = measure(
+        "DocumentColumns",
+        lambda contents: DocumentColumns(ShotDocument, (json.loads(content) for content in contents)),
+        contents
+    )
+
+    for label, items in (("dict", dictionaries), ("ShotDocument", documents), ("DocumentColumns", columns)):
+        start = time.perf_counter()
+        resolve_patterns([PATTERN], items)
+        print(f"{label:<16} : resolve_patterns {time.perf_counter() - start:.2f}s")
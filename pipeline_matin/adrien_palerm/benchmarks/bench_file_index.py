@@ -0,0 +1,83 @@
+"""
+Benchmark of the file index on a synthetic project
+Builds a temporary project of about 100k files (workfiles, publishes and other files),
+then measures the startup crawl, the queries, and a polling pass.
+
+    python bench_file_index.py [number_of_files]
+"""
+
+import sys
+import os
+# Add the "scripts" directory to paths python can use, to avoid import errors
+pipeline_root = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+sys.path.append(os.path.join(pipeline_root, "scripts"))
+
+import time
+import shutil
+import tempfile
+from file_index import FileIndex
+
+# Files created per asset : workfiles, publishes and textures
+FILES_PER_ASSET = 50
+
+
+def build_project(project_root, file_count):
+    """Creates the synthetic project and returns the names of the assets"""
+    assets = []
+    for index in range(file_count // FILES_PER_ASSET):
+        asset = f"asset{index:05d}"
+        assets.append(asset)
+        asset_root = f"{project_root}/assets/prop/group{index % 50:02d}/{asset}/modeling"
+        os.makedirs(asset_root + "/work")
+        os.makedirs(asset_root + "/textures")
+        for version in range(1, 21):
+            open(f"{asset_root}/work/{asset}_v{version:03d}_wip.ma", "w").close()
+        for version in range(1, 11):
+            folder = f"{asset_root}/publish/v{version:03d}"
+            os.makedirs(folder)
+            open(f"{folder}/{asset}_v{version:03d}.ma", "w").close()
+        for texture in range(FILES_PER_ASSET - 30):
+            open(f"{asset_root}/textures/texture_{texture:03d}.png", "w").close()
+    return assets
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    project_root = tempfile.mkdtemp().replace("\\", "/")
+    try:
+        start = time.perf_counter()
+        assets = build_project(project_root, file_count)
+        print(f"Built {len(assets) * FILES_PER_ASSET} files in {time.perf_counter() - start:.1f}s")
+
+        index = FileIndex(project_root)
+        elapsed = index.crawl()
+        print(f"Startup crawl : {len(index.files)} files, {len(index.directories)} folders in {elapsed:.2f}s")
+
+        start = time.perf_counter()
+        for asset in assets:
+            index.latest_workfile(asset)
+        elapsed = time.perf_counter() - start
+        print(f"latest_workfile : {elapsed / len(assets) * 1e6:.1f} us per query")
+
+        start = time.perf_counter()
+        for asset in assets:
+            index.latest_publish(asset)
+        elapsed = time.perf_counter() - start
+        print(f"latest_publish : {elapsed / len(assets) * 1e6:.1f} us per query")
+
+        start = time.perf_counter()
+        publishes = index.files_newer_than(0, kind="publish")
+        elapsed = time.perf_counter() - start
+        print(f"files_newer_than : {len(publishes)} publishes in {elapsed * 1000:.1f} ms")
+
+        # A new version appears, then the index notices it by polling
+        new_workfile = f"{project_root}/assets/prop/group00/{assets[0]}/modeling/work/{assets[0]}_v021_wip.ma"
+        time.sleep(0.01)
+        open(new_workfile, "w").close()
+        start = time.perf_counter()
+        index.poll()
+        elapsed = time.perf_counter() - start
+        assert index.latest_workfile(assets[0]) == new_workfile
+        print(f"Polling pass : {elapsed:.2f}s")
+    finally:
+        shutil.rmtree(project_root)
@@ -0,0 +1,71 @@
+"""
+Benchmark of the single-decode mode of batch_convert
+Encodes an image sequence into mp4, ProRes 422 and ProRes 4444, first with three
+separate ffmpeg runs, then with a single ffmpeg run writing the three outputs.
+
+    python bench_multi_output.py [first_frame_of_a_sequence]
+
+Without argument, a synthetic EXR sequence is generated with the ffmpeg found in the PATH.
+"""
+
+import sys
+import os
+# Add the "scripts" directory to paths python can use, to avoid import errors
+pipeline_root = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+sys.path.append(os.path.join(pipeline_root, "scripts"))
+
+import time
+import shutil
+import logging
+import tempfile
+import subprocess
+from batch_convert import get_transcoder, MultiOutputTranscoder
+
+PROFILES = ["mp4", "prores422", "prores4444"]
+
+# Synthetic sequence : 100 frames in 1920x1080
+FRAME_COUNT = 100
+RESOLUTION = "1920x1080"
+
+
+def generate_sequence(folder):
+    """Writes a synthetic EXR sequence and returns the path of its first frame"""
+    subprocess.check_call([
+        "ffmpeg", "-loglevel", "error", "-f", "lavfi",
+        "-i", f"testsrc2=size={RESOLUTION}:rate=25",
+        "-frames:v", str(FRAME_COUNT), "-start_number", "1001",
+        "-pix_fmt", "gbrpf32le", folder + "/bench.%04d.exr"
+    ])
+    return folder + "/bench.1001.exr"
+
+
+def measure(label, function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} {elapsed:8.2f}s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="WARNING")
+    temporary_folder = None
+    if len(sys.argv) > 1:
+        first_frame = sys.argv[1]
+    else:
+        temporary_folder = tempfile.mkdtemp()
+        first_frame = generate_sequence(temporary_folder)
+
+    try:
+        separate = measure(
+            "three separate runs",
+            lambda: [get_transcoder(first_frame, profile).transcode(force=True) for profile in PROFILES]
+        )
+        single = measure(
+            "single decode, three outputs",
+            lambda: MultiOutputTranscoder([get_transcoder(first_frame, profile) for profile in PROFILES]).transcode(force=True)
+        )
+        print(f"Speedup : {separate / single:.2f}x")
+    finally:
+        if temporary_folder:
+            shutil.rmtree(temporary_folder)
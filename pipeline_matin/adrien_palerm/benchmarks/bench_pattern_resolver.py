@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of the pattern resolver
+Compares the previous implementation (one settings read and one str.replace pass
+per key, for every path) with the compiled templates and the batch API.
+
+    python bench_pattern_resolver.py [number_of_documents]
+"""
+
+import sys
+import os
+# Add the "scripts" directory to paths python can use, to avoid import errors
+pipeline_root = os.path.split(os.path.split(os.path.abspath(__file__))[0])[0]
+sys.path.append(os.path.join(pipeline_root, "scripts"))
+
+import time
+from project import get_project_root
+from pattern_resolver import resolve_pattern, resolve_patterns
+
+PATTERNS = [
+    "<project_root>/shots/<sequence>/<shot>/layout/work",
+    "<project_root>/shots/<sequence>/<shot>/layout/publish",
+    "<project_root>/shots/<sequence>/<shot>/animation/work",
+    "<project_root>/shots/<sequence>/<shot>/animation/publish",
+    "<project_root>/shots/<sequence>/<shot>/lighting/work",
+    "<project_root>/shots/<sequence>/<shot>/lighting/publish",
+]
+
+
+def legacy_resolve_pattern(pattern, document):
+    """Previous implementation of resolve_pattern, kept for comparison"""
+    pattern = pattern.replace("<project_root>", get_project_root())
+    for key, value in document.items():
+        pattern = pattern.replace("<" + key + ">", value)
+    if "<" in pattern:
+        raise Exception(f"Failed to fully resolve the pattern : {pattern}")
+    return pattern
+
+
+def measure(label, function, count, repeat=5):
+    """Returns the best time of several runs, the first runs also fill the caches"""
+    elapsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        run_time = time.perf_counter() - start
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    print(f"{label:<30} {elapsed * 1000:10.1f} ms  {elapsed / count * 1e6:8.2f} us/path")
+    return elapsed
+
+
+if __name__ == "__main__":
+    document_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    documents = [
+        {"shot": f"sh{index:04d}0", "sequence": f"sq{index // 10:04d}"}
+        for index in range(document_count)
+    ]
+    path_count = document_count * len(PATTERNS)
+    print(f"Resolving {path_count} paths ({document_count} documents x {len(PATTERNS)} patterns)")
+
+    legacy = measure(
+        "legacy resolve_pattern",
+        lambda: [legacy_resolve_pattern(p, d) for d in documents for p in PATTERNS],
+        path_count
+    )
+    single = measure(
+        "compiled resolve_pattern",
+        lambda: [resolve_pattern(p, d) for d in documents for p in PATTERNS],
+        path_count
+    )
+    batch = measure(
+        "batch resolve_patterns",
+        lambda: resolve_patterns(PATTERNS, documents),
+        path_count
+    )
+    print(f"Speedup : {legacy / single:.1f}x (single), {legacy / batch:.1f}x (batch)")
@@ -0,0 +1,3 @@
+@echo off
+"%~dp0..\python\python.exe" "%~dp0..\scripts\batch_convert.py" %*
+pause
\ No newline at end of file
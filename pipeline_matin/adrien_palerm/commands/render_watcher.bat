@@ -0,0 +1,3 @@
+@echo off
+"%~dp0..\python\python.exe" "%~dp0..\scripts\render_watcher.py" %*
+pause
@@ -0,0 +1,357 @@
+"""
+This script converts many inputs into one or more formats at the same time.
+
+Each input is converted into each requested profile by a pool of workers,
+and every job reports its own success or failure : a broken input doesn't stop the others.
+
+Outputs that are up to date (same frames, same audio, same ffmpeg command as
+their last encode) are skipped, unless --force is used.
+
+The frames of image sequences are checked before they are encoded (missing, empty,
+truncated frames...), broken sequences are rejected unless --skip-preflight is used.
+
+With --single-decode, all the profiles of an input are written by a single ffmpeg
+process, so the frames are read and decoded only once.
+
+With --chunk-size, image sequences are split into chunks of frames encoded in parallel
+then joined, and only the chunks whose frames changed are encoded again.
+
+The review profiles ("proxy" and "contact_sheet") write a low resolution movie and a
+contact sheet of image sequences. They are always written from the frames decoded for
+another profile of the sequence, by the same ffmpeg process, unless that profile is
+encoded in chunks.
+
+    python batch_convert.py --profile mp4 --profile prores422 --workers 4 --threads 4 <inputs>
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Import pipeline modules
+from convert_to_mp4 import ImgSequenceToMp4, VideoToMp4
+from convert_to_prores422 import ImgSequenceToProres422, VideoToProres422
+from convert_to_prores4444 import ImgSequenceToProres4444, VideoToProres4444
+from pipeline import get_ffmpeg_path
+from ffmpeg_progress import run_ffmpeg
+from preflight import check_transcoder
+from chunked_encoding import ChunkedTranscoder
+from review_proxies import ProxyMovie, ContactSheet
+from transcode_fingerprint import compute_fingerprint, is_up_to_date, write_fingerprint, remove_fingerprint
+
+# Extensions of the inputs considered as image sequences
+IMAGE_EXTENSIONS = [".png", ".jpeg", ".jpg", ".exr", ".tiff", ".tif", ".tga"]
+
+# Transcoder classes of each profile : (image sequence class, video class)
+PROFILES = {
+    "mp4": (ImgSequenceToMp4, VideoToMp4),
+    "prores422": (ImgSequenceToProres422, VideoToProres422),
+    "prores4444": (ImgSequenceToProres4444, VideoToProres4444),
+}
+
+# Review outputs of image sequences, written next to the frames
+REVIEW_PROFILES = {
+    "proxy": ProxyMovie,
+    "contact_sheet": ContactSheet,
+}
+
+# Number of encodes run at the same time
+DEFAULT_WORKERS = 2
+
+
+class JobResult():
+    """
+    Result of the conversion of one input into one profile
+    """
+    def __init__(self, input_path: Path, profile: str) -> None:
+        self.input_path = input_path
+        self.profile = profile
+        self.output_path = None
+        self.error = None
+        self.skipped = False  # True when the output was already up to date
+        self.elapsed = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+    def __str__(self) -> str:
+        if self.skipped:
+            return f"[SKIPPED] {self.profile:<13} {self.input_path} -> {self.output_path} is up to date"
+        if self.succeeded:
+            return f"[OK]     {self.profile:<13} {self.input_path} -> {self.output_path} ({self.elapsed:.1f}s)"
+        return f"[FAILED] {self.profile:<13} {self.input_path} : {self.error}"
+
+
+class MultiOutputTranscoder():
+    """
+    Runs several transcoders of the same input with a single ffmpeg process.
+    The input is read and decoded once, then each output is encoded from the same frames.
+    """
+    def __init__(self, transcoders: List) -> None:
+        if not can_share_decode(transcoders):
+            raise ValueError("Transcoders sharing a decode must read the same inputs")
+        self.transcoders = transcoders
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command to run, with one output per transcoder"""
+        command = [get_ffmpeg_path().as_posix(), "-y"]
+        command += self.transcoders[0].input_arguments
+        for transcoder in self.transcoders:
+            command += transcoder.output_arguments
+            command += [transcoder.output_path.as_posix()]
+        return command
+
+    @property
+    def total_frames(self) -> int:
+        """returns the number of frames to encode, or None for videos"""
+        transcoder = self.transcoders[0]
+        if hasattr(transcoder, "last_frame"):
+            return transcoder.last_frame - transcoder.first_frame + 1
+        return None
+
+    def transcode(self, force: bool = False, fingerprints: List[str] = None) -> List[Path]:
+        """
+        Runs the transcoding of every output using a single ffmpeg subprocess
+        Only the outputs that are not up to date are encoded, unless force is True
+        The fingerprints of the outputs may be given when they were already computed
+        """
+        all_transcoders = self.transcoders
+        fingerprints = fingerprints or [compute_fingerprint(transcoder) for transcoder in all_transcoders]
+        outdated = {}
+        for transcoder, fingerprint in zip(all_transcoders, fingerprints):
+            if force or not is_up_to_date(transcoder, fingerprint):
+                outdated[transcoder] = fingerprint
+            else:
+                logging.info("Output is up to date : %s", transcoder.output_path)
+        if not outdated:
+            return [transcoder.output_path for transcoder in all_transcoders]
+
+        # Check the frames before starting a long encode, the existing outputs are kept if they are broken
+        if hasattr(self.transcoders[0], "sequence"):
+            check_transcoder(self.transcoders[0])
+
+        for transcoder in outdated:
+            # Create folder
+            transcoder.output_path.parent.mkdir(exist_ok=True, parents=True)
+            remove_fingerprint(transcoder.output_path)
+
+        # Run ffmpeg command, with the outputs to encode only
+        # The existing outputs are replaced once the encode succeeded
+        self.transcoders = list(outdated)
+        try:
+            logging.info("Executing command : \n%s", self.ffmpeg_command)
+            run_ffmpeg(self.ffmpeg_command, total_frames=self.total_frames, outputs=[transcoder.output_path for transcoder in outdated])
+        finally:
+            self.transcoders = all_transcoders
+
+        for transcoder, fingerprint in outdated.items():
+            write_fingerprint(transcoder.output_path, fingerprint)
+        return [transcoder.output_path for transcoder in all_transcoders]
+
+
+def can_share_decode(transcoders: List) -> bool:
+    """
+    Returns True if all the transcoders read the same inputs with the same input options
+    The options given after the last input would only apply to the first output,
+    the transcoders doing so can't share their decode
+    """
+    input_arguments = {tuple(transcoder.input_arguments) for transcoder in transcoders}
+    if len(input_arguments) != 1:
+        return False
+    arguments = input_arguments.pop()
+    return len(arguments) >= 2 and arguments[-2] == "-i"
+
+
+def is_image_sequence(input_path: Path) -> bool:
+    """Returns True if the input is a frame of an image sequence"""
+    return Path(input_path).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def get_transcoder(input_path: Path, profile: str, threads: int = None, audio_path: str = None, preflight: bool = True):
+    """
+    Returns the transcoder converting the input into the profile
+    When preflight is False, the frames of image sequences are encoded without being checked
+    """
+    if profile in REVIEW_PROFILES:
+        if not is_image_sequence(input_path):
+            raise ValueError(f"The {profile} profile only converts image sequences")
+        image_sequence_class, video_class = REVIEW_PROFILES[profile], None
+    else:
+        image_sequence_class, video_class = PROFILES[profile]
+    if is_image_sequence(input_path):
+        transcoder = image_sequence_class(input_path=input_path, audio_path=audio_path, threads=threads)
+        transcoder.preflight = preflight
+        return transcoder
+    return video_class(input_path=input_path, audio_path=audio_path, threads=threads)
+
+
+def get_job_profiles(input_path: Path, profiles: List[str], single_decode: bool = False, chunk_size: int = None) -> List[List[str]]:
+    """
+    Returns the profiles of the input written by each job
+    With single_decode, all the profiles are written by the same job. Otherwise the review
+    profiles of image sequences are written with the first full size profile, sharing its
+    decode, unless it is encoded in chunks
+    """
+    if single_decode:
+        return [profiles]
+    review_profiles = [profile for profile in profiles if profile in REVIEW_PROFILES]
+    if not review_profiles or not is_image_sequence(input_path):
+        return [[profile] for profile in profiles]
+    other_profiles = [profile for profile in profiles if profile not in REVIEW_PROFILES]
+    if chunk_size or not other_profiles:
+        # The chunks are decoded separately, the review outputs share a decode of their own
+        return [[profile] for profile in other_profiles] + [review_profiles]
+    return [[other_profiles[0]] + review_profiles] + [[profile] for profile in other_profiles[1:]]
+
+
+def run_job(input_path: Path, profile: str, threads: int = None, force: bool = False, chunk_size: int = None, preflight: bool = True) -> JobResult:
+    """
+    Converts one input into one profile, catching any error
+    When chunk_size is set, image sequences are encoded in chunks : the threads of the job
+    run that many single threaded chunk encodes at the same time, review profiles are
+    never chunked
+    """
+    result = JobResult(input_path, profile)
+    start = time.perf_counter()
+    try:
+        if chunk_size and is_image_sequence(input_path) and profile not in REVIEW_PROFILES:
+            transcoder = get_transcoder(input_path, profile, threads=1, preflight=preflight)
+            transcoder = ChunkedTranscoder(transcoder, chunk_size, workers=threads)
+        else:
+            transcoder = get_transcoder(input_path, profile, threads=threads, preflight=preflight)
+        # The fingerprint stats every frame, it is computed once for the check and the encode
+        fingerprint = compute_fingerprint(transcoder)
+        result.skipped = not force and is_up_to_date(transcoder, fingerprint)
+        if result.skipped:
+            result.output_path = transcoder.output_path
+        else:
+            result.output_path = transcoder.transcode(force=force, fingerprint=fingerprint)
+    except Exception as error:
+        logging.debug("Conversion of %s failed", input_path, exc_info=True)
+        result.error = error
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_multi_output_job(input_path: Path, profiles: List[str], threads: int = None, force: bool = False, preflight: bool = True) -> List[JobResult]:
+    """
+    Converts one input into several profiles with a single decode, catching any error
+    The profiles whose transcoder can't be created are converted by their own job, which
+    reports the error. Falls back to one job per profile when the other profiles can't
+    share the same decode
+    """
+    start = time.perf_counter()
+    transcoders = {}  # profile -> transcoder
+    for profile in profiles:
+        try:
+            transcoders[profile] = get_transcoder(input_path, profile, threads=threads, preflight=preflight)
+        except Exception:
+            logging.debug("Can't create the %s transcoder of %s", profile, input_path, exc_info=True)
+    if len(transcoders) < 2 or not can_share_decode(list(transcoders.values())):
+        return [run_job(input_path, profile, threads, force, preflight=preflight) for profile in profiles]
+
+    results = {profile: JobResult(input_path, profile) for profile in transcoders}
+    try:
+        fingerprints = [compute_fingerprint(transcoder) for transcoder in transcoders.values()]
+        for result, transcoder, fingerprint in zip(results.values(), transcoders.values(), fingerprints):
+            result.skipped = not force and is_up_to_date(transcoder, fingerprint)
+        output_paths = MultiOutputTranscoder(list(transcoders.values())).transcode(force=force, fingerprints=fingerprints)
+        for result, output_path in zip(results.values(), output_paths):
+            result.output_path = output_path
+    except Exception as error:
+        logging.debug("Conversion of %s failed", input_path, exc_info=True)
+        for result in results.values():
+            result.error = error
+    for result in results.values():
+        result.elapsed = time.perf_counter() - start
+
+    for profile in profiles:
+        if profile not in results:
+            results[profile] = run_job(input_path, profile, threads, force, preflight=preflight)
+    return [results[profile] for profile in profiles]
+
+
+def run_job_profiles(input_path: Path, profiles: List[str], threads: int = None, force: bool = False, chunk_size: int = None, preflight: bool = True) -> List[JobResult]:
+    """
+    Converts one input into the profiles of a job (see get_job_profiles), catching any error
+    Returns the result of each profile
+    """
+    if len(profiles) > 1:
+        return run_multi_output_job(input_path, profiles, threads, force, preflight)
+    return [run_job(input_path, profiles[0], threads, force, chunk_size, preflight)]
+
+
+def get_default_threads(workers: int) -> int:
+    """Shares the cores of the machine between the workers"""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def run_batch(input_paths: List[Path], profiles: List[str], workers: int = DEFAULT_WORKERS, threads: int = None, single_decode: bool = False, force: bool = False, chunk_size: int = None, preflight: bool = True) -> List[JobResult]:
+    """
+    Converts every input into every profile with a pool of workers
+    When single_decode is True, all the profiles of an input are encoded by the same job,
+    otherwise only the review profiles share the job of another profile (see get_job_profiles)
+    When force is True, outputs are encoded even if they are up to date
+    When chunk_size is set, image sequences are encoded in chunks of that many frames,
+    except with single_decode
+    When preflight is False, the frames of image sequences are encoded without being checked
+    Results are printed as soon as each job finishes, and returned in the order of the inputs
+    """
+    threads = threads or get_default_threads(workers)
+    input_paths = [Path(input_path) for input_path in input_paths]
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for input_path in input_paths:
+            for job_profiles in get_job_profiles(input_path, profiles, single_decode, chunk_size):
+                futures.append(executor.submit(run_job_profiles, input_path, job_profiles, threads, force, chunk_size, preflight))
+        for future in as_completed(futures):
+            for result in future.result():
+                print(result)
+                results[(result.input_path, result.profile)] = result
+    return [results[(input_path, profile)] for input_path in input_paths for profile in profiles]
+
+
+def print_summary(results: List[JobResult], elapsed: float) -> None:
+    """Prints the number of encoded, skipped and failed jobs, and lists the failures"""
+    failures = [result for result in results if not result.succeeded]
+    skipped = [result for result in results if result.skipped and result.succeeded]
+    encoded = len(results) - len(failures) - len(skipped)
+    print(f"\n{encoded} encoded, {len(skipped)} up to date, {len(failures)} failed, in {elapsed:.1f}s")
+    for result in failures:
+        print(result)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO")
+    parser = argparse.ArgumentParser(description="Converts many inputs into one or more formats")
+    parser.add_argument("inputs", nargs="+", help="videos, or one frame of each image sequence")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES) + sorted(REVIEW_PROFILES), help="output format, may be used several times (default : mp4)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of encodes run at the same time")
+    parser.add_argument("--threads", type=int, default=None, help="number of threads of each ffmpeg process (default : cores / workers)")
+    parser.add_argument("--single-decode", action="store_true", help="write all the profiles of an input with a single ffmpeg process")
+    parser.add_argument("--force", action="store_true", help="encode every output, even the ones that are up to date")
+    parser.add_argument("--chunk-size", type=int, default=None, help="encode image sequences in parallel chunks of this many frames")
+    parser.add_argument("--skip-preflight", action="store_true", help="encode image sequences without checking their frames first")
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_batch(
+        arguments.inputs, arguments.profile or ["mp4"], arguments.workers, arguments.threads,
+        single_decode=arguments.single_decode, force=arguments.force, chunk_size=arguments.chunk_size,
+        preflight=not arguments.skip_preflight
+    )
+    print_summary(results, time.perf_counter() - start)
+    if any(not result.succeeded for result in results):
+        sys.exit(1)
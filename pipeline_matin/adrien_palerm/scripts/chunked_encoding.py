@@ -0,0 +1,210 @@
+"""
+This module encodes long image sequences in chunks, in parallel.
+
+The frame range of the sequence is split into chunks, each chunk is encoded by its own
+ffmpeg process, then the chunks are joined with the concat demuxer without re-encoding
+("-c:v copy"). The audio is added when the chunks are joined.
+
+Every chunk keeps its own fingerprint, so when a few frames are rendered again only the
+chunks containing them are encoded again.
+The size of the chunks is a multiple of the GOP size of the transcoder (one second for
+mp4, one frame for ProRes) : every chunk starts on a keyframe of the regular GOP
+structure, so the seams don't add any keyframe to the joined output.
+
+    transcoder = ImgSequenceToMp4(input_path)
+    ChunkedTranscoder(transcoder, chunk_size=250, workers=4).transcode()
+"""
+
+import os
+import copy
+import logging
+from pathlib import Path
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pipeline modules
+from pipeline import get_ffmpeg_path
+from ffmpeg_progress import run_ffmpeg
+from preflight import check_transcoder
+from transcode_fingerprint import compute_fingerprint, is_up_to_date, write_fingerprint, remove_fingerprint, get_fingerprint_path, encode_output
+
+# Default number of frames of a chunk, rounded up to a multiple of the GOP size
+DEFAULT_CHUNK_SIZE = 250
+
+# Name of the folder storing the chunks, next to the output
+CHUNKS_FOLDER = ".chunks"
+
+
+class EncodingChunk():
+    """
+    A frame range of the sequence of a transcoder, encoded into its own file, without audio
+    """
+    def __init__(self, transcoder, first_frame: int, last_frame: int, output_path: Path, threads: int = None) -> None:
+        # Copy of the transcoder restricted to the frame range, its arguments give the chunk command
+        self.transcoder = copy.copy(transcoder)
+        self.transcoder.first_frame = first_frame
+        self.transcoder.last_frame = last_frame
+        self.transcoder.audio_path = None
+        self.transcoder.threads = threads or transcoder.threads
+        self.output_path = output_path
+
+    @property
+    def sequence(self):
+        return self.transcoder.sequence
+
+    @property
+    def first_frame(self) -> int:
+        return self.transcoder.first_frame
+
+    @property
+    def last_frame(self) -> int:
+        return self.transcoder.last_frame
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command encoding the chunk"""
+        command = [get_ffmpeg_path().as_posix(), "-y"]
+        command += self.transcoder.input_arguments
+        command += self.transcoder.output_arguments
+        command += [self.output_path.as_posix()]
+        return command
+
+    def transcode(self, force: bool = False) -> bool:
+        """
+        Encodes the chunk, unless it is up to date
+        The frames are checked once for every chunk by the ChunkedTranscoder
+        Returns True if the chunk was encoded
+        """
+        return encode_output(self, force, preflight=False)
+
+
+class ChunkedTranscoder():
+    """
+    Encodes the image sequence of a transcoder in chunks, in parallel, and joins them
+    The output and its fingerprint are the same as with transcoder.transcode()
+    """
+    def __init__(self, transcoder, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None) -> None:
+        if getattr(transcoder, "sequence", None) is None:
+            raise ValueError("Only image sequences can be encoded in chunks")
+        self.transcoder = transcoder
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = get_chunk_size(chunk_size, transcoder.gop_size)
+
+    # The attributes used by the fingerprint are the ones of the transcoder
+
+    @property
+    def sequence(self):
+        return self.transcoder.sequence
+
+    @property
+    def first_frame(self) -> int:
+        return self.transcoder.first_frame
+
+    @property
+    def last_frame(self) -> int:
+        return self.transcoder.last_frame
+
+    @property
+    def audio_path(self) -> Path:
+        return self.transcoder.audio_path
+
+    @property
+    def output_path(self) -> Path:
+        return self.transcoder.output_path
+
+    @property
+    def preflight(self) -> bool:
+        return self.transcoder.preflight
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        return self.transcoder.ffmpeg_command
+
+    @property
+    def chunks_folder(self) -> Path:
+        """Returns the folder storing the chunks of the output"""
+        return self.output_path.parent.joinpath(CHUNKS_FOLDER, self.output_path.name)
+
+    @property
+    def concat_list_path(self) -> Path:
+        """Returns the path of the list of chunks read by the concat demuxer"""
+        return self.chunks_folder.joinpath("chunks.txt")
+
+    def get_chunks(self) -> List[EncodingChunk]:
+        """Returns the chunks of the frame range, in order"""
+        # Each ffmpeg process gets its share of the cores
+        threads = self.transcoder.threads or max(1, (os.cpu_count() or 1) // self.workers)
+        chunks = []
+        for first_frame in range(self.first_frame, self.last_frame + 1, self.chunk_size):
+            last_frame = min(first_frame + self.chunk_size - 1, self.last_frame)
+            name = f"{first_frame}-{last_frame}{self.output_path.suffix}"
+            chunks.append(EncodingChunk(self.transcoder, first_frame, last_frame, self.chunks_folder.joinpath(name), threads))
+        return chunks
+
+    def get_concat_command(self) -> List[str]:
+        """returns the ffmpeg command joining the chunks and adding the audio"""
+        command = [get_ffmpeg_path().as_posix(), "-y"]
+        command += ["-f", "concat", "-safe", "0", "-i", self.concat_list_path.as_posix()]
+        if self.audio_path:
+            command += ["-i", self.audio_path.as_posix()]
+            command += ["-map", "0:v", "-map", "1:a"]
+        command += ["-c:v", "copy"]
+        if self.audio_path:
+            command += self.transcoder.audio_arguments
+        command += ["-movflags", "+faststart"]
+        command += [self.output_path.as_posix()]
+        return [str(part) for part in command]
+
+    def remove_unused_chunks(self, chunks: List[EncodingChunk]) -> None:
+        """Removes the chunks of previous encodes that are not part of the frame range anymore"""
+        if not self.chunks_folder.exists():
+            return
+        used = {chunk.output_path.name for chunk in chunks}
+        used |= {get_fingerprint_path(chunk.output_path).name for chunk in chunks}
+        used.add(self.concat_list_path.name)
+        for path in self.chunks_folder.iterdir():
+            if path.name not in used:
+                os.remove(path)
+
+    def transcode(self, force: bool = False, fingerprint: str = None) -> Path:
+        """
+        Encodes the chunks whose frames changed, in parallel, then joins every chunk
+        The encode is skipped when the output is up to date, unless force is True
+        The fingerprint of the encode may be given when it was already computed
+        """
+        fingerprint = fingerprint or compute_fingerprint(self)
+        if not force and is_up_to_date(self, fingerprint):
+            logging.info("Output is up to date : %s", self.output_path)
+            return self.output_path
+
+        chunks = self.get_chunks()
+        if len(chunks) == 1:
+            return self.transcoder.transcode(force=force, fingerprint=fingerprint)
+        self.remove_unused_chunks(chunks)
+
+        # Check the frames before starting a long encode
+        check_transcoder(self)
+
+        # Encode the chunks, the first error is raised once the running chunks are done
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            encoded = list(executor.map(lambda chunk: chunk.transcode(force), chunks))
+        logging.info(
+            "%s : %d chunks encoded, %d chunks up to date",
+            self.output_path.name, sum(encoded), len(chunks) - sum(encoded)
+        )
+
+        # Join the chunks, the existing output is replaced once they are joined
+        remove_fingerprint(self.output_path)
+        lines = ["file '{}'".format(chunk.output_path.as_posix().replace("'", "'\\''")) for chunk in chunks]
+        self.concat_list_path.write_text("\n".join(lines) + "\n")
+        logging.info("Executing command : \n%s", self.get_concat_command())
+        run_ffmpeg(self.get_concat_command(), outputs=[self.output_path])
+        write_fingerprint(self.output_path, fingerprint)
+        return self.output_path
+
+
+def get_chunk_size(chunk_size: int, gop_size: int) -> int:
+    """Rounds the chunk size up to a multiple of the GOP size, so that chunks start on keyframes"""
+    gop_size = max(1, int(gop_size))
+    return max(1, -(-int(chunk_size) // gop_size)) * gop_size
+
@@ -0,0 +1,280 @@
+"""
+This script builds the review movie of a sequence from the movies of its shots.
+
+The shots of the sequence are read from the shot documents, and the latest movie of
+each shot (the most recent output of the converters in its render folder) is used.
+Movies are joined with the concat demuxer, without encoding them : conforming a whole
+sequence takes seconds.
+Concatenation without encoding needs every movie to use the same codec, resolution,
+pixel format, frame rate and time base, and the same audio codec, sample rate and
+channel layout.
+The shots that don't match the other ones are encoded again to match them, only those.
+
+    python conform_sequence.py sq0010 --profile mp4
+
+The movie is written to <project_root>/light_render/sequences/<sequence>/
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import re
+import glob
+import time
+import logging
+import argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pipeline modules
+from documents import get_shot_documents
+from pattern_resolver import resolve_pattern
+from batch_convert import PROFILES
+from ffprobe_cache import probe, get_stream
+from pipeline import get_ffmpeg_path
+from ffmpeg_progress import run_ffmpeg
+from transcode_fingerprint import compute_fingerprint, is_up_to_date, write_fingerprint, remove_fingerprint
+
+# Movies written by the converters for each shot, the most recent one is used
+SHOT_MOVIE_PATTERNS = {
+    "mp4": "<project_root>/light_render/shots/<sequence>/<shot>/render/**/mp4/*.mp4",
+    "prores422": "<project_root>/light_render/shots/<sequence>/<shot>/render/**/Prores422/*.mov",
+    "prores4444": "<project_root>/light_render/shots/<sequence>/<shot>/render/**/Prores4444/*.mov",
+}
+
+# Movie of the whole sequence
+SEQUENCE_MOVIE_PATTERNS = {
+    "mp4": "<project_root>/light_render/sequences/<sequence>/<sequence>.mp4",
+    "prores422": "<project_root>/light_render/sequences/<sequence>/<sequence>_prores422.mov",
+    "prores4444": "<project_root>/light_render/sequences/<sequence>/<sequence>_prores4444.mov",
+}
+
+# Name of the folder storing the shots encoded again, next to the sequence movie
+CONFORM_FOLDER = ".conform"
+
+# Number of shots encoded again at the same time
+DEFAULT_WORKERS = 2
+
+
+class ShotConform():
+    """
+    Encodes the movie of a shot again, so it can be joined with the other shots
+    """
+    def __init__(self, transcoder, reference_video: dict, reference_audio: dict, has_audio: bool, output_path: Path) -> None:
+        self.transcoder = transcoder
+        self.transcoder.stream_copy = False  # The movie must be encoded with the profile
+        self.reference_video = reference_video
+        self.reference_audio = reference_audio  # None when the other shots have no audio
+        self.has_audio = has_audio
+        self.input_path = transcoder.input_path
+        self.audio_path = None
+        self.output_path = output_path
+
+    @property
+    def audio_layout(self) -> str:
+        """Returns the channel layout of the other shots, as understood by ffmpeg"""
+        return self.reference_audio.get("channel_layout") or "{}c".format(self.reference_audio["channels"])
+
+    @property
+    def ffmpeg_command(self):
+        """
+        returns the ffmpeg command encoding the movie with the resolution, pixel format,
+        frame rate and audio format of the other shots
+        """
+        command = [get_ffmpeg_path().as_posix(), "-y"]
+        command += self.transcoder.input_arguments
+        silent = self.reference_audio is not None and not self.has_audio
+        if silent:
+            # Shots without audio get a silent track, so the audio of the other shots is kept
+            sample_rate = self.reference_audio["sample_rate"]
+            command += ["-f", "lavfi", "-i", f"anullsrc=channel_layout={self.audio_layout}:sample_rate={sample_rate}"]
+
+        # The options given after the ones of the profile replace them
+        command += self.transcoder.output_arguments
+        command += ["-s", "{}x{}".format(self.reference_video["width"], self.reference_video["height"])]
+        command += ["-r", self.reference_video["r_frame_rate"]]
+        if self.reference_video.get("pix_fmt"):
+            command += ["-pix_fmt", self.reference_video["pix_fmt"]]
+        if self.reference_video.get("time_base"):
+            # The timestamps of the joined movies are copied, they must use the same time base
+            command += ["-video_track_timescale", self.reference_video["time_base"].split("/")[-1]]
+        if self.reference_audio is None:
+            command += ["-an"]
+        else:
+            command += ["-map", "0:v:0", "-map", "1:a:0" if silent else "0:a:0"]
+            command += ["-c:a", self.reference_audio["codec_name"]]
+            command += ["-ar", self.reference_audio["sample_rate"]]
+            command += ["-af", f"aformat=channel_layouts={self.audio_layout}"]
+            if silent:
+                command += ["-shortest"]
+        command += [self.output_path.as_posix()]
+        return [str(part) for part in command]
+
+    def transcode(self, force: bool = False) -> Path:
+        """Encodes the movie, unless it is up to date"""
+        fingerprint = compute_fingerprint(self)
+        if not force and is_up_to_date(self, fingerprint):
+            return self.output_path
+        remove_fingerprint(self.output_path)
+        self.output_path.parent.mkdir(exist_ok=True, parents=True)
+        logging.info("Executing command : \n%s", self.ffmpeg_command)
+        run_ffmpeg(self.ffmpeg_command, outputs=[self.output_path])
+        write_fingerprint(self.output_path, fingerprint)
+        return self.output_path
+
+
+class SequenceMovie():
+    """
+    The movie of a sequence, joining the movies of its shots without encoding them
+    """
+    def __init__(self, ffmpeg_path: str, input_paths: list, output_path: Path, include_audio: bool) -> None:
+        self.ffmpeg_path = ffmpeg_path
+        self.input_paths = input_paths  # Movies of the shots, in order
+        self.audio_path = None
+        self.output_path = output_path
+        self.include_audio = include_audio
+
+    @property
+    def concat_list_path(self) -> Path:
+        return self.output_path.parent.joinpath(CONFORM_FOLDER, self.output_path.stem + ".txt")
+
+    @property
+    def ffmpeg_command(self):
+        """returns the ffmpeg command joining the movies"""
+        command = [self.ffmpeg_path, "-y"]
+        command += ["-f", "concat", "-safe", "0", "-i", self.concat_list_path.as_posix()]
+        command += ["-map", "0:v"]
+        if self.include_audio:
+            command += ["-map", "0:a"]
+        command += ["-c", "copy"]
+        command += ["-movflags", "+faststart"]
+        command += [self.output_path.as_posix()]
+        return [str(part) for part in command]
+
+    def transcode(self, force: bool = False) -> Path:
+        """Joins the movies, unless the output is up to date"""
+        fingerprint = compute_fingerprint(self)
+        if not force and is_up_to_date(self, fingerprint):
+            logging.info("Output is up to date : %s", self.output_path)
+            return self.output_path
+
+        # The existing movie is replaced once the shots are joined
+        remove_fingerprint(self.output_path)
+        self.concat_list_path.parent.mkdir(exist_ok=True, parents=True)
+        lines = ["file '{}'".format(Path(path).as_posix().replace("'", "'\\''")) for path in self.input_paths]
+        self.concat_list_path.write_text("\n".join(lines) + "\n")
+
+        logging.info("Executing command : \n%s", self.ffmpeg_command)
+        run_ffmpeg(self.ffmpeg_command, outputs=[self.output_path])
+        write_fingerprint(self.output_path, fingerprint)
+        return self.output_path
+
+
+def get_shot_order(shot_document):
+    """Sort key of the shots, numbers are compared as numbers : sh90 comes before sh100"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", shot_document["shot"])]
+
+
+def get_latest_shot_movie(shot_document, profile):
+    """Returns the most recent movie of the shot in the profile, or None"""
+    pattern = resolve_pattern(SHOT_MOVIE_PATTERNS[profile], shot_document).replace("\\", "/")
+    # Only the folders below the render folder of the shot are checked, the project may be in a hidden folder
+    render_folder = pattern.split("**")[0]
+    paths = []
+    for path in glob.glob(pattern, recursive=True):
+        path = path.replace("\\", "/")
+        # Skip the chunks of the chunked encodes, and the outputs being written
+        if not any(part.startswith(".") for part in path[len(render_folder):].split("/")):
+            paths.append(path)
+    if not paths:
+        return None
+    return max(paths, key=os.path.getmtime)
+
+
+def get_video_signature(video_stream):
+    """Returns what must be the same for two videos to be joined without encoding"""
+    return tuple(
+        video_stream.get(key)
+        for key in ("codec_name", "profile", "level", "pix_fmt", "width", "height", "r_frame_rate", "time_base")
+    )
+
+
+def get_audio_signature(audio_stream):
+    """Returns what must be the same for two audio streams to be joined without encoding"""
+    if audio_stream is None:
+        return None
+    return tuple(audio_stream.get(key) for key in ("codec_name", "sample_rate", "channels", "channel_layout"))
+
+
+def conform_sequence(sequence, profile="mp4", force=False, workers=DEFAULT_WORKERS):
+    """
+    Builds the movie of the sequence from the latest movies of its shots
+    Returns the path of the movie
+    """
+    start = time.perf_counter()
+    video_class = PROFILES[profile][1]
+    shot_documents = sorted(get_shot_documents(sequence), key=get_shot_order)
+    if not shot_documents:
+        raise ValueError(f"No shot found in the sequence {sequence}")
+
+    # Latest movie of each shot
+    movies = []
+    for shot_document in shot_documents:
+        path = get_latest_shot_movie(shot_document, profile)
+        if path is None:
+            logging.warning("No %s movie found for %s, it is skipped", profile, shot_document["shot"])
+        else:
+            movies.append((shot_document["shot"], path))
+    if not movies:
+        raise FileNotFoundError(f"No {profile} movie found for the shots of {sequence}")
+
+    # The movies joined as they are must match the most common video and audio format
+    transcoders = {path: video_class(input_path=path) for _, path in movies}
+    probes = {path: probe(path, get_ffmpeg_path("ffprobe")) for _, path in movies}
+    videos = {path: get_stream(probes[path], "video") or {} for _, path in movies}
+    audios = {path: get_stream(probes[path], "audio") for _, path in movies}
+    signatures = {
+        path: (get_video_signature(videos[path]), get_audio_signature(audios[path]))
+        for _, path in movies
+    }
+    reference = Counter(signatures.values()).most_common(1)[0][0]
+    reference_path = next(path for _, path in movies if signatures[path] == reference)
+    reference_video, reference_audio = videos[reference_path], audios[reference_path]
+
+    output_path = Path(resolve_pattern(SEQUENCE_MOVIE_PATTERNS[profile], {"sequence": sequence}))
+    conforms = {
+        path: ShotConform(
+            transcoders[path], reference_video, reference_audio, audios[path] is not None,
+            output_path.parent.joinpath(CONFORM_FOLDER, shot + Path(path).suffix)
+        )
+        for shot, path in movies if signatures[path] != reference
+    }
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        conformed = dict(zip(conforms, executor.map(lambda conform: conform.transcode(force), conforms.values())))
+    input_paths = [conformed.get(path, path) for _, path in movies]
+
+    # Every movie now has the audio of the reference shot, or no audio
+    movie = SequenceMovie(get_ffmpeg_path().as_posix(), input_paths, output_path, reference_audio is not None)
+    movie.transcode(force=force)
+    print(
+        f"{sequence} : {len(movies) - len(conforms)} shots joined as they are, {len(conforms)} encoded again, "
+        f"{len(shot_documents) - len(movies)} missing, in {time.perf_counter() - start:.1f}s"
+    )
+    return output_path
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO")
+    parser = argparse.ArgumentParser(description="Builds the review movie of sequences from the movies of their shots")
+    parser.add_argument("sequences", nargs="+", help="names of the sequences")
+    parser.add_argument("--profile", default="mp4", choices=sorted(PROFILES), help="format of the shot movies to join (default : mp4)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of shots encoded again at the same time")
+    parser.add_argument("--force", action="store_true", help="build the movie even if it is up to date")
+    arguments = parser.parse_args()
+
+    for sequence in arguments.sequences:
+        print(conform_sequence(sequence, arguments.profile, arguments.force, arguments.workers))
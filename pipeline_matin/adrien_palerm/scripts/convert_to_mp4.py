@@ -10,14 +10,21 @@ import os
 script_directory = os.path.split(__file__)[0]
 sys.path.append(script_directory)
 
-import subprocess
-import re
 import json
 import logging
+import subprocess
 from pathlib import Path
 from typing import List
-from glob import glob
 from settings import get_settings
+from pipeline import get_ffmpeg_path
+from image_sequences import find_sequence
+from image_headers import try_read_header
+from ffprobe_cache import probe, probe_keyframes, get_stream, get_frame_rate, ENCODER_CODECS
+from transcode_fingerprint import encode_output
+
+# Videos above this bitrate, in bits per second, are encoded instead of copied
+# The "stream_copy_max_bitrate" key of the encoding profile may change it
+STREAM_COPY_MAX_BITRATE = 20000000
 
 
 class ImgSequenceToMp4():
@@ -25,46 +32,31 @@ class ImgSequenceToMp4():
     This class is used to transcode an image sequence into a mp4 file using ffmpeg
     An audio file may also be passed as an argument.
     """
-    def __init__(self, input_path: str, audio_path:str=None) -> None:
+    def __init__(self, input_path: str, audio_path:str=None, threads:int=None) -> None:
         self.input_path = Path(input_path)
         if not self.input_path.exists():
             raise FileNotFoundError(
                 "The input file does not exist : {}".format(self.input_path)
             )
+        self.sequence = find_sequence(self.input_path)
         self.settings = get_settings()
         self.encoding_profile = self.get_encoding_profile()
         self.separator = self.get_separator()
         self.input_img_sequence = self.get_input_image_sequence()
         self.first_frame = self.get_first_frame()
+        self.last_frame = self.get_last_frame()
+        self.image_header = try_read_header(self.sequence.frame_path(self.first_frame))  # Resolution and channels, or None
+        self.preflight = True  # Check the frames before encoding them
         self.audio_path = Path(audio_path) if audio_path else None
-
-    def parse_input_path(self) -> re.Match:
-        """Analyses the input path to get the different parts of it"""
-        path = self.input_path.as_posix()
-        regex_pattern = re.compile(r"(?P<stem>^.+?)(?P<separator_before>\.|_)(?P<frame_number>\d+)\.(?P<extension>.+)")
-        match = re.match(regex_pattern, path)
-        if not match:
-            raise Exception('File did not match the patern "path/to/file(.|_)<frame_number>.<extension>"')
-        return match
+        self.threads = threads  # Number of threads ffmpeg may use, all cores if None
 
     def get_separator(self) -> str:
-        """Returns the input path, formatted as an image sequence"""
-        match = self.parse_input_path()
-        return match.group("separator_before")
+        """Returns the separator between the name of the sequence and the frame number"""
+        return self.sequence.separator
 
     def get_input_image_sequence(self) -> Path:
         """Returns the input path, formatted as an image sequence with the "%<2digits>d" notation"""
-        match = self.parse_input_path()
-        padding = len(match.group("frame_number"))
-        frame_pattern = "%{}d".format(str(padding).zfill(2))
-        path = (
-            match.group("stem")
-            + match.group("separator_before")
-            + frame_pattern
-            + "."
-            + match.group("extension")
-        )
-        return Path(path)
+        return Path(self.sequence.pattern)
 
     @property
     def output_path(self) -> Path:
@@ -87,28 +79,50 @@ class ImgSequenceToMp4():
         return content
 
     @property
-    def ffmpeg_path(self) -> Path:
-        return Path(__file__).parent.parent.joinpath("ffmpeg/ffmpeg.exe")
+    def gop_size(self) -> int:
+        """Returns the number of frames between two keyframes, one second by default"""
+        return int(self.encoding_profile.get("gop_size") or self.settings["fps"])
 
     @property
-    def ffmpeg_command(self) -> List[str]:
-        """returns the ffmpeg command to run"""
-        command = [self.ffmpeg_path.as_posix(), "-y"]
+    def audio_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the audio"""
+        command = []
+        command += ["-acodec", self.encoding_profile["audio_codec"]]
+        command += ["-ar", self.encoding_profile["audio_sample_rate"]]
+        return [str(c) for c in command]
 
+    @property
+    def ffmpeg_path(self) -> Path:
+        return get_ffmpeg_path()
+
+    @property
+    def input_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments reading the inputs"""
         framerate = self.settings["fps"]
-        width = self.encoding_profile.get("width")
-        height = self.encoding_profile.get("height")
-        quality = self.encoding_profile.get("quality") # On a scale of 0-100
-        video_bitrate = self.encoding_profile.get("video_bitrate")
-            
+        command = []
+
         # Add inputs
         command += ["-framerate", framerate]
         command += ["-start_number", self.first_frame]
         command += ["-i", self.input_img_sequence.as_posix()]
-        command += ["-r", framerate]
 
         if self.audio_path:
             command += ["-i", self.audio_path.as_posix()]
+        return [str(c) for c in command]
+
+    @property
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the output, without the output path"""
+        framerate = self.settings["fps"]
+        width = self.encoding_profile.get("width")
+        height = self.encoding_profile.get("height")
+        quality = self.encoding_profile.get("quality") # On a scale of 0-100
+        video_bitrate = self.encoding_profile.get("video_bitrate")
+        command = []
+
+        # Encode the frame range of the sequence
+        command += ["-frames:v", self.last_frame - self.first_frame + 1]
+        command += ["-r", framerate]
 
         # Configure video codec
         command += ["-vcodec", self.encoding_profile["video_codec"]]
@@ -118,51 +132,67 @@ class ImgSequenceToMp4():
             command += ["-crf", crf]
         elif video_bitrate:
             command += ["-b:v", video_bitrate]
+
+        # Place a keyframe every gop_size frames exactly, so chunks encoded separately
+        # start on the same keyframes as a single encode
+        command += ["-g", self.gop_size]
+        command += ["-keyint_min", self.gop_size]
+        command += ["-sc_threshold", "0"]
         
         # Configure audio codec
-        command += ["-acodec", self.encoding_profile["audio_codec"]]
-        command += ["-ar", self.encoding_profile["audio_sample_rate"]]
+        command += self.audio_arguments
 
         # Configure output
         if width:
             command += ["-s", f"{width}x{height}"]
+        elif self.image_header and (self.image_header.width % 2 or self.image_header.height % 2):
+            # yuv420p needs even dimensions, the frames are resized by one pixel
+            command += ["-s", f"{self.image_header.width // 2 * 2}x{self.image_header.height // 2 * 2}"]
         
         # Output options
         command += ["-movflags", "+faststart"]
         command += ["-bf", "0"] # b_frames
         command += ["-video_track_timescale", int(framerate)*1000]
 
+        # Limit the number of threads used by the encoder
+        if self.threads:
+            command += ["-threads", self.threads]
+        return [str(c) for c in command]
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command to run"""
+        command = [self.ffmpeg_path.as_posix(), "-y"]
+        command += self.input_arguments
+        command += self.output_arguments
+
         # Set output path
         command += [self.output_path.as_posix()]
         return [str(c) for c in command]
 
-    def transcode(self) -> Path:
-        """Runs the transcoding of the input file using an ffmpeg subprocess"""
-        # Remove existing output
-        if self.output_path.exists():
-            os.remove(self.output_path)
-        
-        # Create folder
-        self.output_path.parent.mkdir(exist_ok=True, parents=True)
-
-        # Run ffmpeg command
-        logging.info("Executing command : \n%s", self.ffmpeg_command)
-        subprocess.check_call(self.ffmpeg_command)
+    def transcode(self, force: bool = False, fingerprint: str = None) -> Path:
+        """
+        Runs the transcoding of the input file using an ffmpeg subprocess
+        The encode is skipped when the output is up to date, unless force is True
+        The fingerprint of the encode may be given when it was already computed
+        """
+        encode_output(self, force, fingerprint)
         return self.output_path
 
     def get_first_frame(self) -> int:
         """Returns the first frame of the image sequence as an integer"""
-        pattern = self.input_img_sequence.as_posix().replace(r"%04d", "*")
-        first_frame = sorted(glob(pattern))[0]
-        first_frame = first_frame.rsplit(".", 1)[0].rsplit(self.separator, 1)[-1]
-        return int(first_frame)
+        return self.sequence.first_frame
+
+    def get_last_frame(self) -> int:
+        """Returns the last frame of the image sequence as an integer"""
+        return self.sequence.last_frame
 
 class VideoToMp4():
     """
     This class is used to transcode a video into a mp4 file using ffmpeg
     An audio file may also be passed as an argument.
     """
-    def __init__(self, input_path: str, audio_path:str=None) -> None:
+    def __init__(self, input_path: str, audio_path:str=None, threads:int=None) -> None:
         self.input_path = Path(input_path)
         if not self.input_path.exists():
             raise FileNotFoundError(
@@ -171,6 +201,8 @@ class VideoToMp4():
         self.settings = get_settings()
         self.encoding_profile = self.get_encoding_profile()
         self.audio_path = Path(audio_path) if audio_path else None
+        self.threads = threads  # Number of threads ffmpeg may use, all cores if None
+        self.stream_copy = True  # Remux the inputs that already match the profile instead of encoding them
 
     @property
     def output_path(self) -> Path:
@@ -190,26 +222,120 @@ class VideoToMp4():
             content = json.loads(f.read())
         return content
 
+    @property
+    def gop_size(self) -> int:
+        """Returns the largest number of frames between two keyframes of a copied video, one second by default"""
+        return int(self.encoding_profile.get("gop_size") or self.settings["fps"])
+
     @property
     def ffmpeg_path(self) -> Path:
-        return Path(__file__).parent.parent.joinpath("ffmpeg/ffmpeg.exe")
+        return get_ffmpeg_path()
 
     @property
-    def ffmpeg_command(self) -> List[str]:
-        """returns the ffmpeg command to run"""
-        command = [self.ffmpeg_path.as_posix(), "-y"]
-        framerate = self.settings["fps"]
+    def ffprobe_path(self) -> Path:
+        return get_ffmpeg_path("ffprobe")
+
+    @property
+    def audio_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the audio"""
+        command = []
+        command += ["-acodec", self.encoding_profile["audio_codec"]]
+        command += ["-ar", self.encoding_profile["audio_sample_rate"]]
+        return [str(c) for c in command]
+
+    def get_stream_copy_arguments(self) -> List[str]:
+        """
+        Returns the ffmpeg arguments copying the video stream of the input into the output,
+        or None if the video doesn't match the encoding profile and must be encoded
+        The audio is copied too when it matches the profile, otherwise it is encoded
+        """
+        if not self.stream_copy:
+            return None
+        try:
+            probe_result = probe(self.input_path, self.ffprobe_path)
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            logging.warning("Can't probe %s, it will be encoded", self.input_path, exc_info=True)
+            return None
+        video = get_stream(probe_result, "video")
+        audio = get_stream(probe_result, "audio")
+        if video is None:
+            return None
+
+        # Check the video against the encoding profile
+        video_codec = self.encoding_profile["video_codec"]
         width = self.encoding_profile.get("width")
         height = self.encoding_profile.get("height")
-        quality = self.encoding_profile.get("quality") # On a scale of 0-100
-        video_bitrate = self.encoding_profile.get("video_bitrate")
-            
+        frame_rate = get_frame_rate(video)
+        if video.get("codec_name") != ENCODER_CODECS.get(video_codec, video_codec):
+            return None
+        if video.get("pix_fmt") != self.encoding_profile["pix_fmt"]:
+            return None
+        if width and (video.get("width"), video.get("height")) != (int(width), int(height)):
+            return None
+        if frame_rate is None or abs(frame_rate - float(self.settings["fps"])) > 0.001:
+            return None
+
+        # Players seek and scrub the encoded files easily : no b-frames, a bounded bitrate,
+        # and keyframes at least every gop_size frames
+        # A video whose values ffprobe can't give is encoded
+        if str(video.get("has_b_frames")) != "0":
+            return None
+        bitrate = video.get("bit_rate") or probe_result.get("format", {}).get("bit_rate")
+        max_bitrate = int(self.encoding_profile.get("stream_copy_max_bitrate") or STREAM_COPY_MAX_BITRATE)
+        if not str(bitrate or "").isdigit() or int(bitrate) > max_bitrate:
+            return None
+        try:
+            keyframes = probe_keyframes(self.input_path, self.ffprobe_path)
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            logging.warning("Can't read the keyframes of %s, it will be encoded", self.input_path, exc_info=True)
+            return None
+        if not keyframes["first_is_keyframe"] or keyframes["max_gop"] > self.gop_size:
+            return None
+
+        command = []
+        command += ["-map", "0:v:0", "-vcodec", "copy"]
+        if self.audio_path:
+            command += ["-map", "1:a:0"] + self.audio_arguments
+        elif audio is not None:
+            command += ["-map", "0:a:0"]
+            audio_codec = self.encoding_profile["audio_codec"]
+            audio_matches = (
+                audio.get("codec_name") == ENCODER_CODECS.get(audio_codec, audio_codec)
+                and str(audio.get("sample_rate")) == str(self.encoding_profile["audio_sample_rate"])
+            )
+            command += ["-acodec", "copy"] if audio_matches else self.audio_arguments
+        command += ["-movflags", "+faststart"]
+        return [str(c) for c in command]
+
+    @property
+    def input_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments reading the inputs"""
+        command = []
+
         # Add inputs
         command += ["-i", self.input_path.as_posix()]
-        command += ["-r", framerate]
 
         if self.audio_path:
             command += ["-i", self.audio_path.as_posix()]
+        return [str(c) for c in command]
+
+    @property
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the output, without the output path"""
+        framerate = self.settings["fps"]
+        width = self.encoding_profile.get("width")
+        height = self.encoding_profile.get("height")
+        quality = self.encoding_profile.get("quality") # On a scale of 0-100
+        video_bitrate = self.encoding_profile.get("video_bitrate")
+        command = []
+
+        # Inputs already matching the profile only need a new container
+        stream_copy_arguments = self.get_stream_copy_arguments()
+        if stream_copy_arguments:
+            return stream_copy_arguments
+
+        # Set output frame rate
+        command += ["-r", framerate]
 
         # Configure video codec
         command += ["-vcodec", self.encoding_profile["video_codec"]]
@@ -219,10 +345,10 @@ class VideoToMp4():
             command += ["-crf", crf]
         elif video_bitrate:
             command += ["-b:v", video_bitrate]
+        command += ["-g", self.gop_size]
         
         # Configure audio codec
-        command += ["-acodec", self.encoding_profile["audio_codec"]]
-        command += ["-ar", self.encoding_profile["audio_sample_rate"]]
+        command += self.audio_arguments
 
         # Configure output
         if width:
@@ -233,22 +359,29 @@ class VideoToMp4():
         command += ["-bf", "0"] # b_frames
         command += ["-video_track_timescale", int(framerate)*1000]
 
+        # Limit the number of threads used by the encoder
+        if self.threads:
+            command += ["-threads", self.threads]
+        return [str(c) for c in command]
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command to run"""
+        command = [self.ffmpeg_path.as_posix(), "-y"]
+        command += self.input_arguments
+        command += self.output_arguments
+
         # Set output path
         command += [self.output_path.as_posix()]
         return [str(c) for c in command]
 
-    def transcode(self) -> Path:
-        """Runs the transcoding of the input file using an ffmpeg subprocess"""
-        # Remove existing output
-        if self.output_path.exists():
-            os.remove(self.output_path)
-        
-        # Create folder
-        self.output_path.parent.mkdir(exist_ok=True, parents=True)
-
-        # Run ffmpeg command
-        logging.info("Executing command : \n%s", self.ffmpeg_command)
-        subprocess.check_call(self.ffmpeg_command)
+    def transcode(self, force: bool = False, fingerprint: str = None) -> Path:
+        """
+        Runs the transcoding of the input file using an ffmpeg subprocess
+        The encode is skipped when the output is up to date, unless force is True
+        The fingerprint of the encode may be given when it was already computed
+        """
+        encode_output(self, force, fingerprint)
         return self.output_path
 
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+"""
+This module holds the ProRes converters, the ProRes profiles are written by their child
+classes (convert_to_prores422 and convert_to_prores4444)
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import logging
+import subprocess
+from pathlib import Path
+from typing import List
+from settings import get_settings
+from pipeline import get_ffmpeg_path
+from image_sequences import find_sequence
+from image_headers import try_read_header
+from ffprobe_cache import probe, get_stream
+from transcode_fingerprint import encode_output
+
+class ImgSequenceToProres():
+    """
+    This class is used to transcode an image sequence into a mov file using ffmpeg
+    An audio file may also be passed as an argument.
+    Child classes set the folder of the outputs and the ProRes profile
+    """
+    # Folder of the outputs, next to the frames
+    output_folder = ""
+
+    # prores_ks profile number and pixel format of the output
+    profile = ""
+    pixel_format = ""
+
+    # Pixel format of the frames having an alpha channel, the alpha is dropped if None
+    alpha_pixel_format = None
+
+    def __init__(self, input_path: str, audio_path:str=None, threads:int=None) -> None:
+        self.input_path = Path(input_path)
+        if not self.input_path.exists():
+            raise FileNotFoundError(
+                "The input file does not exist : {}".format(self.input_path)
+            )
+        self.sequence = find_sequence(self.input_path)
+        self.settings = get_settings()
+        self.separator = self.get_separator()
+        self.input_img_sequence = self.get_input_image_sequence()
+        self.first_frame = self.get_first_frame()
+        self.last_frame = self.get_last_frame()
+        self.image_header = try_read_header(self.sequence.frame_path(self.first_frame))  # Resolution and channels, or None
+        self.preflight = True  # Check the frames before encoding them
+        self.audio_path = Path(audio_path) if audio_path else None
+        self.threads = threads  # Number of threads ffmpeg may use, all cores if None
+
+    def get_separator(self) -> str:
+        """Returns the separator between the name of the sequence and the frame number"""
+        return self.sequence.separator
+
+    def get_input_image_sequence(self) -> Path:
+        """Returns the input path, formatted as an image sequence with the "%<2digits>d" notation"""
+        return Path(self.sequence.pattern)
+
+    @property
+    def output_path(self) -> Path:
+        """Returns the path of the mov file to render out"""
+        path = self.input_img_sequence.as_posix()
+        path = path.split("%0")[0]  # Split before frame pattern
+        path = path[:-1]  # Remove separator
+        path = path + ".mov"
+        path = Path(path)
+        path = path.parent.joinpath(self.output_folder, path.name)
+        return path
+
+    # ProRes only has intra frames, every frame is a keyframe
+    gop_size = 1
+
+    @property
+    def audio_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the audio"""
+        command = []
+        command += ["-c:a", "pcm_s16le"]
+        command += ["-ar", "48000"]  # Audio sampling rate
+        command += ["-sample_fmt", "s16"]  # Audio sample size
+        return command
+
+    @property
+    def ffmpeg_path(self) -> Path:
+        return get_ffmpeg_path()
+
+    @property
+    def input_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments reading the inputs"""
+        framerate = self.settings["fps"]
+        command = []
+
+        # Configure video input
+        command += ["-framerate", framerate]
+        command += ["-start_number", self.first_frame]
+        command += ["-i", self.input_img_sequence.as_posix()]
+
+        # Configure audio input
+        if self.audio_path:
+            command += ["-i", self.audio_path.as_posix()]
+        return [str(part) for part in command]
+
+    @property
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the output, without the output path"""
+        framerate = self.settings["fps"]
+        command = []
+
+        # Encode the frame range of the sequence
+        command += ["-frames:v", self.last_frame - self.first_frame + 1]
+        command += ["-r", framerate]
+
+        # Configure video codec
+        command += ["-vcodec", "prores_ks"]  # Default prores encoder
+        command += ["-profile:v", self.profile]
+        if self.alpha_pixel_format and self.image_header and self.image_header.has_alpha:
+            command += ["-pix_fmt", self.alpha_pixel_format]
+        else:
+            command += ["-pix_fmt", self.pixel_format]
+        command += ["-vendor", "apl0"]
+        command += ["-movflags", "faststart"]
+
+        # Configure audio codec
+        if self.audio_path:
+            command += ["-map", "0:0"]
+            command += ["-map", "1:0"]
+            command += self.audio_arguments
+
+        # Limit the number of threads used by the encoder
+        if self.threads:
+            command += ["-threads", self.threads]
+        return [str(part) for part in command]
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command to run"""
+        command = [self.ffmpeg_path.as_posix(), "-y"]
+        command += self.input_arguments
+        command += self.output_arguments
+
+        # Set output path
+        command.append(self.output_path.as_posix())
+        return [str(part) for part in command]
+
+    def transcode(self, force: bool = False, fingerprint: str = None) -> Path:
+        """
+        Runs the transcoding of the input file using an ffmpeg subprocess
+        The encode is skipped when the output is up to date, unless force is True
+        The fingerprint of the encode may be given when it was already computed
+        """
+        encode_output(self, force, fingerprint)
+        return self.output_path
+
+    def get_first_frame(self) -> int:
+        """Returns the first frame of the image sequence as an integer"""
+        return self.sequence.first_frame
+
+    def get_last_frame(self) -> int:
+        """Returns the last frame of the image sequence as an integer"""
+        return self.sequence.last_frame
+
+
+class VideoToProres():
+    """
+    This class is used to transcode an video into a mov file using ffmpeg
+    An audio file may also be passed as an argument.
+    Child classes set the folder of the outputs and the ProRes profile
+    """
+    # Folder of the outputs, next to the input
+    output_folder = ""
+
+    # prores_ks profile number and pixel format of the output
+    profile = ""
+    pixel_format = ""
+
+    # Profile reported by ffprobe for the inputs already in this profile, which are copied
+    probe_profile = ""
+
+    def __init__(self, input_path: str, audio_path:str=None, threads:int=None) -> None:
+        self.input_path = Path(input_path)
+        if not self.input_path.exists():
+            raise FileNotFoundError(
+                "The input file does not exist : {}".format(self.input_path)
+            )
+        self.settings = get_settings()
+        self.audio_path = Path(audio_path) if audio_path else None
+        self.threads = threads  # Number of threads ffmpeg may use, all cores if None
+        self.stream_copy = True  # Remux the inputs that already match the profile instead of encoding them
+
+    @property
+    def output_path(self) -> Path:
+        """Returns the path of the mov file to render out"""
+        path = self.input_path.with_suffix(".mov")
+        path = path.parent.joinpath(self.output_folder, path.name)
+        return Path(path)
+
+    @property
+    def ffmpeg_path(self) -> Path:
+        return get_ffmpeg_path()
+
+    @property
+    def audio_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the audio"""
+        command = []
+        command += ["-c:a", "pcm_s16le"]
+        command += ["-ar", "48000"] # Audio sampling rate
+        command += ["-sample_fmt", "s16"] # Audio sample size
+        return command
+
+    def get_stream_copy_arguments(self) -> List[str]:
+        """
+        Returns the ffmpeg arguments copying the video stream of the input into the output,
+        or None if the input isn't already in the ProRes profile and must be encoded
+        The audio is copied too when it is already 16 bits PCM at 48kHz, otherwise it is encoded
+        """
+        if not self.stream_copy:
+            return None
+        try:
+            probe_result = probe(self.input_path, get_ffmpeg_path("ffprobe"))
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            logging.warning("Can't probe %s, it will be encoded", self.input_path, exc_info=True)
+            return None
+        video = get_stream(probe_result, "video")
+        audio = get_stream(probe_result, "audio")
+        if video is None or video.get("codec_name") != "prores":
+            return None
+        # The bit depth of the input may differ, yuv422p10le and yuv422p12le are both ProRes 422
+        pixel_format = self.pixel_format.split("10")[0]
+        if video.get("profile") != self.probe_profile or not video.get("pix_fmt", "").startswith(pixel_format):
+            return None
+
+        command = []
+        command += ["-map", "0:v:0", "-vcodec", "copy"]
+        if self.audio_path:
+            command += ["-map", "1:a:0"] + self.audio_arguments
+        elif audio is not None:
+            command += ["-map", "0:a:0"]
+            audio_matches = audio.get("codec_name") == "pcm_s16le" and str(audio.get("sample_rate")) == "48000"
+            command += ["-c:a", "copy"] if audio_matches else self.audio_arguments
+        command += ["-movflags", "faststart"]
+        return command
+
+    @property
+    def input_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments reading the inputs"""
+        command = []
+
+        # Configure video input
+        command += ["-i", self.input_path.as_posix()]
+
+        # Configure audio input
+        if self.audio_path:
+            command += ["-i", self.audio_path.as_posix()]
+        return [str(part) for part in command]
+
+    @property
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the output, without the output path"""
+        command = []
+
+        # Inputs already in the ProRes profile only need a new container
+        stream_copy_arguments = self.get_stream_copy_arguments()
+        if stream_copy_arguments:
+            return stream_copy_arguments
+
+        # Configure video codec
+        command += ["-vcodec", "prores_ks"] # Default prores encoder
+        command += ["-profile:v", self.profile]
+        command += ["-pix_fmt", self.pixel_format]
+        command += ["-vendor", "apl0"]
+        command += ["-movflags", "faststart"]
+
+        # Configure audio codec
+        if self.audio_path:
+            command += ["-map", "0:0"]
+            command += ["-map", "1:0"]
+            command += self.audio_arguments
+
+        # Limit the number of threads used by the encoder
+        if self.threads:
+            command += ["-threads", self.threads]
+        return [str(part) for part in command]
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command to run"""
+        command = [self.ffmpeg_path.as_posix(), "-y"]
+        command += self.input_arguments
+        command += self.output_arguments
+
+        # Set output path
+        command.append(self.output_path.as_posix())
+        return [str(part) for part in command]
+
+    def transcode(self, force: bool = False, fingerprint: str = None) -> Path:
+        """
+        Runs the transcoding of the input file using an ffmpeg subprocess
+        The encode is skipped when the output is up to date, unless force is True
+        The fingerprint of the encode may be given when it was already computed
+        """
+        encode_output(self, force, fingerprint)
+        return self.output_path
@@ -5,27 +5,29 @@ script_directory = os.path.split(__file__)[0]
 sys.path.append(script_directory)
 
 # Import pipeline modules
-from json_files import file_to_dict
-from pattern_resolver import resolve_pattern
-from create_folder import create_folder
+from folder_planner import plan_folders, create_folders, print_summary, parse_arguments, create_document_folders, get_selected_documents
 
-def create_shot_folders(shot_document):
+# Here we list and automatize the folders to create for each shot
+FOLDER_PATTERNS = [
+    "<project_root>/assembly/shots/<sequence>/<shot>/scene",
+    "<project_root>/assembly/shots/<sequence>/<shot>/visual",
+]
 
-    # Creates all folders provided as a dictionary
-    # Here we list and automatize the folders to create 
-    folders_to_create = [
-        "<project_root>/assembly/shots/<sequence>/<shot>/scene",
-        "<project_root>/assembly/shots/<sequence>/<shot>/visual",
-    ]
-    # Then we loop a folder creating funtion til every folder is created
-    for folder_pattern in folders_to_create:
-        create_folder(folder_pattern, shot_document)
+def create_shot_folders(shot_document):
+    """
+    Creates the assembly folders of the shot provided as a dictionary
+    """
+    folders = plan_folders(FOLDER_PATTERNS, [shot_document])
+    summary = create_folders(folders)
+    print_summary(summary)
+    return summary
 
 
 
 if __name__ == "__main__":
-    paths = sys.argv[1:]    #On recupere a partir de l'argument 1 entre dans la fonction, jusqu'a la fin
-    for path in paths:
-        shot_document = file_to_dict(path)
-        print("Creating folders for shot : " + shot_document["shot"])
-        create_shot_folders(shot_document)
\ No newline at end of file
+    # Every document passed as argument is planned and created in one go
+    arguments = parse_arguments("Creates the assembly folders of the provided shot documents", "shots")
+    create_document_folders(
+        FOLDER_PATTERNS, arguments.paths, arguments.workers, arguments.dry_run,
+        documents=get_selected_documents(arguments)
+    )
@@ -7,61 +7,100 @@ sys.path.append(script_directory)
 # Import pipeline modules
 from json_files import file_to_dict
 from pattern_resolver import resolve_pattern
+from folder_planner import plan_folders, create_folders, print_summary, get_argument_parser, get_selection, get_selected_documents
+from version_allocator import reserve_version, get_next_version, format_version
 
-def create_asset_folders(asset_document):
+# Folders created for each asset
+FOLDER_PATTERNS = [
+    "<project_root>/assets/<type>/<group>/<asset>/modeling/work",
+    "<project_root>/assets/<type>/<group>/<asset>/modeling/lp",
+    "<project_root>/assets/<type>/<group>/<asset>/modeling/hp",
+    "<project_root>/assets/<type>/<group>/<asset>/modeling/turn_around",
+    "<project_root>/assets/<type>/<group>/<asset>/modeling/publish",
+    "<project_root>/assets/<type>/<group>/<asset>/shading/work",
+    "<project_root>/assets/<type>/<group>/<asset>/shading/publish",
+    "<project_root>/assets/<type>/<group>/<asset>/rigging/work",
+    "<project_root>/assets/<type>/<group>/<asset>/rigging/publish",
+    "<project_root>/assets/<type>/<group>/<asset>/animating/work",
+    "<project_root>/assets/<type>/<group>/<asset>/animating/publish",
+]
+
+# Root folder of an asset, used to know if the asset already exists
+ASSET_ROOT_PATTERN = "<project_root>/assets/<type>/<group>/<asset>"
+
+def create_asset_folders(asset_document, increment=False, dry_run=False):
     """
     Creates all folders related to the asset provided as a dictionary
+    If the asset already exists and increment is True, the folders of a new version
+    of the asset are created instead (apple_V01, apple_V02...)
     """
-    folders_to_create = [
-        "<project_root>/assets/<type>/<group>/<asset>/modeling/work",
-        "<project_root>/assets/<type>/<group>/<asset>/modeling/lp",
-        "<project_root>/assets/<type>/<group>/<asset>/modeling/hp",
-        "<project_root>/assets/<type>/<group>/<asset>/modeling/turn_around",
-        "<project_root>/assets/<type>/<group>/<asset>/modeling/publish",
-        "<project_root>/assets/<type>/<group>/<asset>/shading/work",
-        "<project_root>/assets/<type>/<group>/<asset>/shading/publish",
-        "<project_root>/assets/<type>/<group>/<asset>/rigging/work",
-        "<project_root>/assets/<type>/<group>/<asset>/rigging/publish",
-        "<project_root>/assets/<type>/<group>/<asset>/animating/work",
-        "<project_root>/assets/<type>/<group>/<asset>/animating/publish",
-    ]
-
-    for folder_pattern in folders_to_create:
-        create_folder(folder_pattern, asset_document)
-
-
-def create_folder(folder_pattern, asset_document):
+    asset_document = dict(asset_document)
+    if increment and asset_exists(asset_document):
+        asset_document = increment_asset(asset_document, dry_run=dry_run)
+
+    folders = plan_folders(FOLDER_PATTERNS, [asset_document])
+    summary = create_folders(folders, dry_run=dry_run)
+    print_summary(summary, dry_run=dry_run)
+    return summary
+
+
+def asset_exists(asset_document):
+    """
+    Returns True if the root folder of the asset already exists
+    """
+    return os.path.exists(resolve_pattern(ASSET_ROOT_PATTERN, asset_document))
+
+
+def increment_asset(asset_document, dry_run=False):
     """
-    Resolves the pattern with the values provided through the asset document
+    Reserves the next version of the asset and returns a copy of the document
+    using the versioned asset name, for instance "apple_V03"
+    In dry run mode, the next version is computed but not reserved
     """
-    # Resolve pattern
-    folder = resolve_pattern(folder_pattern, asset_document)
-    count = 1
-    docCount = asset_document
-    # Create folder
-    if os.path.exists(folder):
-        incremental = input(str("Asset already exists do you want to do a incremental save ? y/n: ")).lower() in ('y','yes')
-
-    if not os.path.exists(folder):
-        print("Creating folder : " + folder)
-        os.makedirs(folder)
-    elif incremental:
-        docCount["asset"] = asset_document["asset"] + "_V0"+ str(count)
-        folder = resolve_pattern(folder_pattern, docCount)
-        while os.path.exists(folder):
-            count += 1
-            newDoc = str.split(docCount["asset"],"_"[0])
-            docCount["asset"] = newDoc[0] + "_V0"+ str(count)
-            folder = resolve_pattern(folder_pattern, docCount)
-        print("Creating folder : " + folder)
-        os.makedirs(folder)
+    asset_root = resolve_pattern(ASSET_ROOT_PATTERN, asset_document)
+    parent_folder, name = os.path.split(asset_root)
+    if dry_run:
+        versioned_name = format_version(name, get_next_version(parent_folder, name))
     else:
-        sys.exit("No folders created.")
+        versioned_name = os.path.basename(reserve_version(parent_folder, name)[1])
+
+    versioned_document = dict(asset_document)
+    versioned_document["asset"] = versioned_name
+    print(f"Asset already exists, creating version : {versioned_name}")
+    return versioned_document
+
+
+def ask_increment(asset_document):
+    """
+    Asks the user whether an existing asset should be saved incrementally
+    """
+    question = f"Asset {asset_document['asset']} already exists do you want to do a incremental save ? y/n: "
+    return input(question).lower() in ('y','yes')
+
 
 if __name__ == "__main__":
-    paths = sys.argv[1:]
-    for path in paths:
-        asset_document = file_to_dict(path)
-        CurrentAsset = asset_document["asset"]
-        print("Creating folders for asset : " + asset_document["asset"])
-        create_asset_folders(asset_document)
+    parser = get_argument_parser("Creates the folders of the provided asset documents", "assets")
+    parser.add_argument(
+        "-y", "--yes", "--increment", dest="increment", action="store_true",
+        help="create a new version of every asset that already exists, without asking"
+    )
+    arguments = parser.parse_args()
+    if not arguments.paths and not get_selection(arguments):
+        parser.error("provide json documents, or select them with --type and --group")
+    # Without a console to answer, existing assets are skipped unless --increment is used
+    interactive = sys.stdin is not None and sys.stdin.isatty()
+
+    asset_documents = []
+    for asset_document in [file_to_dict(path) for path in arguments.paths] + get_selected_documents(arguments):
+        if asset_exists(asset_document):
+            if arguments.increment or (interactive and ask_increment(asset_document)):
+                asset_document = increment_asset(asset_document, dry_run=arguments.dry_run)
+            else:
+                print("No folders created for asset : " + asset_document["asset"])
+                continue
+        asset_documents.append(asset_document)
+
+    # Every asset is planned and created in one go
+    folders = plan_folders(FOLDER_PATTERNS, asset_documents)
+    summary = create_folders(folders, max_workers=arguments.workers, dry_run=arguments.dry_run)
+    print_summary(summary, dry_run=arguments.dry_run)
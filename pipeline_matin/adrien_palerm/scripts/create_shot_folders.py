@@ -5,41 +5,31 @@ script_directory = os.path.split(__file__)[0]
 sys.path.append(script_directory)
 
 # Import pipeline modules
-from json_files import file_to_dict
-from pattern_resolver import resolve_pattern
+from folder_planner import plan_folders, create_folders, print_summary, parse_arguments, create_document_folders, get_selected_documents
+
+# Folders created for each shot
+FOLDER_PATTERNS = [
+    "<project_root>/shots/<sequence>/<shot>/layout/work",
+    "<project_root>/shots/<sequence>/<shot>/layout/publish",
+    "<project_root>/shots/<sequence>/<shot>/animation/work",
+    "<project_root>/shots/<sequence>/<shot>/animation/publish",
+    "<project_root>/shots/<sequence>/<shot>/lighting/work",
+    "<project_root>/shots/<sequence>/<shot>/lighting/publish",
+]
 
 def create_shot_folders(shot_document):
     """
     Creates all folders related to the shot provided as a dictionary
     """
-    folders_to_create = [
-        "<project_root>/shots/<sequence>/<shot>/layout/work",
-        "<project_root>/shots/<sequence>/<shot>/layout/publish",
-        "<project_root>/shots/<sequence>/<shot>/animation/work",
-        "<project_root>/shots/<sequence>/<shot>/animation/publish",
-        "<project_root>/shots/<sequence>/<shot>/lighting/work",
-        "<project_root>/shots/<sequence>/<shot>/lighting/publish",
-    ]
-    for folder_pattern in folders_to_create:
-        create_folder(folder_pattern, shot_document)
-
-
-def create_folder(folder_pattern, shot_document):
-    """
-    Resolves the pattern with the values provided through the shot document
-    """
-    # Resolve pattern
-    folder = resolve_pattern(folder_pattern, shot_document)
-
-    # Create folder
-    if not os.path.exists(folder):
-        print("Creating folder : " + folder)
-        os.makedirs(folder)
+    folders = plan_folders(FOLDER_PATTERNS, [shot_document])
+    summary = create_folders(folders)
+    print_summary(summary)
+    return summary
 
 
 if __name__ == "__main__":
-    paths = sys.argv[1:]
-    for path in paths:
-        shot_document = file_to_dict(path)
-        print("Creating folders for shot : " + shot_document["shot"])
-        create_shot_folders(shot_document)
\ No newline at end of file
+    arguments = parse_arguments("Creates the folders of the provided shot documents", "shots")
+    create_document_folders(
+        FOLDER_PATTERNS, arguments.paths, arguments.workers, arguments.dry_run,
+        documents=get_selected_documents(arguments)
+    )
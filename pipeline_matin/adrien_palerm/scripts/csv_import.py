@@ -0,0 +1,278 @@
+"""
+This module imports a csv sheet of assets or shots into the json database.
+
+Each row is compared with the document already in the database, using a hash of its
+json content : only the new and changed documents are written, so importing a large
+sheet where a single row changed writes a single file.
+Documents are written to a temporary file first, then renamed, so a document is never
+read half written.
+Rows are read one at a time and handed to a pool of workers writing the documents :
+on a network share most of the time is spent waiting for each write, so the workers
+wait at the same time. Reading stops while too many documents are waiting to be
+written, so the memory used doesn't depend on the size of the csv file.
+Rows that can't be imported (empty name, name defined twice...) are reported with their
+line number, the other rows are still imported.
+The hashes of the documents are kept in database/<table>.hashes.json, next to the
+document folders, and checked against the modification time and size of each file :
+a document edited by hand is read again instead of trusting its stored hash.
+The secondary indexes of the table (see document_indexes) are updated with the
+written and removed documents.
+
+    import_csv("path/to/shots.csv", "shots", remove_missing=True)
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import csv
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pipeline modules
+from pipeline import get_pipeline_root
+from json_files import invalidate, write_file_atomic
+import document_store
+import document_indexes
+
+# Key of the documents of each table, the name of their json file
+KEYS = {
+    "assets": "asset",
+    "shots": "shot",
+}
+
+# Number of documents written at the same time, most of the time is spent waiting for the share
+DEFAULT_WORKERS = 8
+
+# Documents waiting to be written per worker, the csv file is read no further ahead
+MAX_PENDING_WRITES = 4
+
+# Characters that can't be used in the name of a document
+INVALID_NAME_CHARACTERS = '/\\:*?"<>|'
+
+
+class ImportSummary():
+    """
+    Names of the documents added, changed, unchanged and removed by an import
+    """
+    def __init__(self, table: str) -> None:
+        self.table = table
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.removed = []
+        self.errors = []  # (line number, name, message) of the rows that couldn't be imported
+        self.elapsed = 0.0
+
+    def add_error(self, line_number: int, name: str, message: str) -> None:
+        self.errors.append((line_number, name, message))
+        logging.error("Line %s of the %s csv file (%s) : %s", line_number, self.table, name, message)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.table} : {len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.unchanged)} unchanged, {len(self.removed)} removed, {len(self.errors)} errors, "
+            f"in {self.elapsed:.2f}s"
+        )
+
+
+def get_database_folder():
+    """
+    Returns the folder holding the document folders
+    """
+    return get_pipeline_root() + "/database"
+
+
+def get_content_hash(content: str) -> str:
+    """Returns the hash of the json content of a document"""
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def get_hashes_path(database_folder: str, table: str) -> str:
+    """Returns the path of the file storing the hashes of the documents of the table"""
+    return f"{database_folder}/{table}.hashes.json"
+
+
+def read_hashes(database_folder: str, table: str):
+    """
+    Returns the hash of each document of the table, with the modification time and size
+    of its file : name -> [mtime_ns, size, hash], and True if they differ from the stored ones
+    Stored hashes are used when the file didn't change since they were computed,
+    the other documents are read and hashed
+    """
+    try:
+        with open(get_hashes_path(database_folder, table), 'r') as file:
+            stored_hashes = json.loads(file.read())
+    except (OSError, ValueError):
+        stored_hashes = {}
+
+    hashes = {}
+    try:
+        entries = list(os.scandir(f"{database_folder}/{table}"))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if not entry.name.endswith(".json") or not entry.is_file():
+            continue
+        name = entry.name[:-len(".json")]
+        stat = entry.stat()  # Given by the listing of the folder on Windows
+        signature = [stat.st_mtime_ns, stat.st_size]
+        stored = stored_hashes.get(name)
+        if stored is not None and stored[:2] == signature:
+            hashes[name] = stored
+        else:
+            with open(entry.path, 'r') as file:
+                hashes[name] = signature + [get_content_hash(file.read())]
+    return hashes, hashes != stored_hashes
+
+
+def write_hashes(database_folder: str, table: str, hashes: dict) -> None:
+    """
+    Stores the hashes returned by read_hashes
+    """
+    write_file_atomic(get_hashes_path(database_folder, table), json.dumps(hashes, sort_keys=True))
+
+
+def check_row(row: dict, key: str) -> str:
+    """
+    Returns the name of the document of the row
+    Raises ValueError if the row can't be imported
+    """
+    if None in row:
+        raise ValueError("the row has more fields than the header")
+    name = row.get(key)
+    if name is None:
+        raise ValueError(f"the row has no {key} field")
+    if not name:
+        raise ValueError(f"the {key} field is empty")
+    if name.startswith(".") or any(character in name for character in INVALID_NAME_CHARACTERS):
+        raise ValueError(f"{name!r} can't be used as a file name")
+    return name
+
+
+def read_rows(csv_file_path: str, summary: ImportSummary):
+    """
+    Yields the line number and content of each row of the csv file, one at a time
+    Rows that can't be parsed are reported in the summary and skipped
+    """
+    with open(csv_file_path, 'r', newline='') as csv_file:
+        reader = csv.DictReader(csv_file)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as error:
+                summary.add_error(reader.line_num, None, str(error))
+                continue
+            yield reader.line_num, row
+
+
+def import_csv(csv_file_path: str, table: str, remove_missing: bool = False, database_folder: str = None, workers: int = DEFAULT_WORKERS) -> ImportSummary:
+    """
+    Writes the new and changed rows of the csv file to the json documents of the table
+    Rows are read one at a time, and their documents are written by a pool of workers,
+    at most MAX_PENDING_WRITES per worker waiting at the same time
+    Rows that can't be imported are reported in the summary without stopping the import
+    When remove_missing is True, the documents that are not in the csv file anymore are
+    removed, unless some rows couldn't be imported
+    The document store is kept in sync when it is used, except when importing into
+    another database_folder (benchmarks)
+    Returns the summary of the import
+    """
+    start = time.perf_counter()
+    summary = ImportSummary(table)
+    key = KEYS[table]
+    sync_store = database_folder is None and document_store.store_exists()
+    database_folder = database_folder or get_database_folder()
+    output_folder = f"{database_folder}/{table}"
+    os.makedirs(output_folder, exist_ok=True)
+
+    hashes, outdated_hashes = read_hashes(database_folder, table)
+    seen = set()  # Names of the documents of the csv file
+    written = []  # Documents written by this import
+    lock = threading.Lock()
+    pending_writes = threading.BoundedSemaphore(workers * MAX_PENDING_WRITES)
+
+    def write_document(line_number, name, row, json_data, content_hash, added):
+        """Writes the document of a row, run by the workers"""
+        try:
+            json_filename = output_folder + "/" + name + ".json"
+            write_file_atomic(json_filename, json_data)
+            invalidate(json_filename)
+            stat = os.stat(json_filename)
+            with lock:
+                hashes[name] = [stat.st_mtime_ns, stat.st_size, content_hash]
+                written.append(row)
+                (summary.added if added else summary.changed).append(name)
+            logging.debug("Wrote %s entry : %s", table, json_filename)
+        except Exception as error:
+            # Any failure is reported with the row, instead of being lost in the worker
+            with lock:
+                summary.add_error(line_number, name, str(error) or type(error).__name__)
+        finally:
+            pending_writes.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for line_number, row in read_rows(csv_file_path, summary):
+            try:
+                name = check_row(row, key)
+                if name in seen:
+                    raise ValueError(f"{name} is defined several times, the first row is used")
+            except ValueError as error:
+                with lock:
+                    summary.add_error(line_number, row.get(key), str(error))
+                continue
+            seen.add(name)
+
+            json_data = json.dumps(row, indent=4)
+            content_hash = get_content_hash(json_data)
+            with lock:
+                previous_hash = hashes[name][2] if name in hashes else None
+                if previous_hash == content_hash:
+                    summary.unchanged.append(name)
+                    continue
+
+            # Wait for a worker when too many documents are waiting to be written
+            pending_writes.acquire()
+            executor.submit(write_document, line_number, name, row, json_data, content_hash, previous_hash is None)
+
+    if remove_missing and summary.errors:
+        logging.warning("Some rows of %s couldn't be imported, no document is removed", csv_file_path)
+    elif remove_missing:
+        for name in sorted(set(hashes) - seen):
+            json_filename = output_folder + "/" + name + ".json"
+            os.remove(json_filename)
+            invalidate(json_filename)
+            del hashes[name]
+            summary.removed.append(name)
+            logging.debug("Removed %s entry : %s", table, json_filename)
+
+    # The stored hashes change with the written files, and with the files edited by hand
+    if written or summary.removed or outdated_hashes:
+        write_hashes(database_folder, table, hashes)
+
+    # Documents edited by hand may have changed their indexed fields, the indexes are built again
+    if outdated_hashes:
+        document_indexes.rebuild_index(table, database_folder)
+    else:
+        document_indexes.update_index(table, written, summary.removed, database_folder)
+
+    # Keep the document store in sync when it is used, with the documents edited by hand too
+    if sync_store:
+        connection = document_store.get_connection()
+        if outdated_hashes:
+            document_store.import_json_table(connection, table)
+        else:
+            document_store.put_documents(connection, table, written)
+            document_store.delete_documents(connection, table, summary.removed)
+            document_store.save_folder_mtime(connection, table)
+
+    summary.elapsed = time.perf_counter() - start
+    return summary
@@ -4,39 +4,25 @@ import sys
 script_directory = os.path.split(__file__)[0]
 sys.path.append(script_directory)
 
-import csv
-import json
-from pipeline import get_pipeline_root
+import argparse
+from csv_import import import_csv, DEFAULT_WORKERS
 
-def csv_to_json(csv_file_path):
-    # Ensure the output folder exists
-    output_folder = get_pipeline_root() + "/database/shots"
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    
-    # Open and read the CSV file
-    with open(csv_file_path, 'r') as csv_file:
-        reader = csv.DictReader(csv_file)
-        
-        # Iterate over each row in the CSV
-        for row in reader:
-            # Convert row to JSON format
-            json_data = json.dumps(row, indent=4)
-            
-            # Create a filename for each JSON file
-            json_filename = output_folder + "/" + row["shot"] + ".json"
-            
-            # Remove json file if it already exists
-            if os.path.exists(json_filename):
-                os.remove(json_filename)
-
-            # Write the JSON data to a file
-            with open(json_filename, 'w') as json_file:
-                json_file.write(json_data)
-
-            print("Created shot entry : " + json_filename)
-            print(json_data)
+def csv_to_json(csv_file_path, remove_missing=False, workers=DEFAULT_WORKERS):
+    """
+    Writes the new and changed shots of the csv file to database/shots
+    When remove_missing is True, the shots that are not in the csv file anymore are removed
+    Rows that can't be imported are listed in the errors of the summary
+    Returns the summary of the import
+    """
+    return import_csv(csv_file_path, "shots", remove_missing=remove_missing, workers=workers)
 
 if __name__ == "__main__":
-    csv_file_path = sys.argv[1]
-    csv_to_json(csv_file_path)
+    parser = argparse.ArgumentParser(description="Imports the shots of a csv file into the database")
+    parser.add_argument("csv_file_path", help="csv file with one shot per row")
+    parser.add_argument("--remove-missing", action="store_true", help="remove the shots that are not in the csv file anymore")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of documents written at the same time")
+    arguments = parser.parse_args()
+    summary = csv_to_json(arguments.csv_file_path, arguments.remove_missing, arguments.workers)
+    print(summary)
+    if summary.errors:
+        sys.exit(1)
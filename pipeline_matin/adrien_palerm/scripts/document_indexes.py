@@ -0,0 +1,240 @@
+"""
+This module maintains secondary indexes over the json database, so questions such as
+"which shots belong to sq0040" or "which assets are characters" are answered without
+opening every document :
+  - shots : sequence -> shots
+  - assets : type -> assets, group -> assets
+
+The indexes of a table are stored in database/<table>.indexes.json, next to the
+document folders. The csv importers update them with the documents they write and
+remove. The indexes keep the modification time of the document folder when they were
+written : documents added or removed by hand change it, and the indexes are built again
+from the json files by load_current_index. They can also be rebuilt with :
+    python document_indexes.py rebuild
+Documents edited in place don't change the folder, the documents found with the indexes
+are checked against the filters again.
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import json
+import logging
+import threading
+from glob import glob
+
+# Import pipeline modules
+from pipeline import get_pipeline_root
+from json_files import write_file_atomic
+
+# Indexed fields of each table, the first one is the key of the documents
+INDEXES = {
+    "assets": ["asset", "type", "group"],
+    "shots": ["shot", "sequence"],
+}
+
+# path -> (mtime, size, index) of the indexes already read by this process
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class DocumentIndex():
+    """
+    The names of the documents of a table, for each value of its indexed fields
+    """
+    def __init__(self, table):
+        self.table = table
+        self.key = INDEXES[table][0]
+        self.fields = INDEXES[table][1:]
+        self.values = {field: {} for field in self.fields}  # field -> value -> set of names
+        self.documents = {}  # name -> indexed values of the document
+        self.folder_mtime_ns = None  # Modification time of the document folder when the index was written
+
+    def add(self, document):
+        """Adds a document, replacing the values it had in the index"""
+        name = document[self.key]
+        self.remove(name)
+        # Documents without a value for a field are not found by this field
+        values = {field: document[field] for field in self.fields if document.get(field) is not None}
+        for field, value in values.items():
+            self.values[field].setdefault(value, set()).add(name)
+        self.documents[name] = values
+
+    def remove(self, name):
+        """Removes a document from the index, if it is there"""
+        values = self.documents.pop(name, None)
+        if values is None:
+            return
+        for field, value in values.items():
+            names = self.values[field][value]
+            names.discard(name)
+            if not names:
+                del self.values[field][value]
+
+    def find(self, **filters):
+        """
+        Returns the names of the documents matching the filters, sorted
+        For instance :
+            index.find(type="prop", group="food")
+        """
+        names = None
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self.fields:
+                raise KeyError(f"{self.table} can't be filtered by {field}, use one of : {self.fields}")
+            matches = self.values[field].get(value, set())
+            names = matches if names is None else names & matches
+        return sorted(self.documents if names is None else names)
+
+    def get_values(self, field):
+        """Returns every value of the field, sorted"""
+        return sorted(self.values[field], key=str)
+
+    def as_dict(self):
+        return {
+            "folder_mtime_ns": self.folder_mtime_ns,
+            "documents": sorted(self.documents),
+            "fields": {
+                field: {value: sorted(names) for value, names in values.items()}
+                for field, values in self.values.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, table, data):
+        index = cls(table)
+        index.documents = {name: {} for name in data["documents"]}
+        index.folder_mtime_ns = data.get("folder_mtime_ns")
+        for field in index.fields:
+            for value, names in data["fields"].get(field, {}).items():
+                index.values[field][value] = set(names)
+                for name in names:
+                    index.documents[name][field] = value
+        return index
+
+
+def get_index_path(table, database_folder=None):
+    """
+    Returns the path of the file storing the indexes of the table
+    """
+    database_folder = database_folder or get_pipeline_root() + "/database"
+    return f"{database_folder}/{table}.indexes.json"
+
+
+def get_folder_mtime(table, database_folder=None):
+    """
+    Returns the modification time of the folder of the documents of the table, or None
+    It changes when documents are added, removed or replaced through a temporary file
+    """
+    database_folder = database_folder or get_pipeline_root() + "/database"
+    try:
+        return os.stat(f"{database_folder}/{table}").st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def index_exists(table, database_folder=None):
+    """
+    Returns True if the indexes of the table have been built
+    """
+    return os.path.exists(get_index_path(table, database_folder))
+
+
+def load_index(table, database_folder=None):
+    """
+    Returns the indexes of the table, or None if they have not been built
+    Indexes are read once per process, and again only when their file changes :
+    the returned index is shared, it must not be modified
+    """
+    path = get_index_path(table, database_folder)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+    with open(path, 'r') as file:
+        index = DocumentIndex.from_dict(table, json.loads(file.read()))
+    with _cache_lock:
+        _cache[path] = (signature, index)
+    return index
+
+
+def load_current_index(table, database_folder=None):
+    """
+    Returns the indexes of the table, built again when the document folder changed since
+    they were written, or None if they have not been built or can't be built again
+    """
+    index = load_index(table, database_folder)
+    if index is None or index.folder_mtime_ns == get_folder_mtime(table, database_folder):
+        return index
+    try:
+        return rebuild_index(table, database_folder)
+    except (OSError, ValueError):
+        # The documents are read without the indexes
+        logging.warning("Can't rebuild the indexes of %s", table, exc_info=True)
+        return None
+
+
+def save_index(index, database_folder=None):
+    """
+    Writes the indexes of a table, through a temporary file
+    The written documents must be in the document folder already
+    """
+    path = get_index_path(index.table, database_folder)
+    index.folder_mtime_ns = get_folder_mtime(index.table, database_folder)
+    write_file_atomic(path, json.dumps(index.as_dict(), sort_keys=True))
+    with _cache_lock:
+        _cache.pop(path, None)
+
+
+def rebuild_index(table, database_folder=None):
+    """
+    Builds the indexes of the table from every json document, and writes them
+    Returns the index
+    """
+    database_folder = database_folder or get_pipeline_root() + "/database"
+    index = DocumentIndex(table)
+    for path in glob(f"{database_folder}/{table}/*.json"):
+        with open(path, 'r') as file:
+            index.add(json.loads(file.read()))
+    save_index(index, database_folder)
+    return index
+
+
+def update_index(table, documents, removed_names=(), database_folder=None):
+    """
+    Adds the written documents to the indexes of the table and removes the removed ones
+    The indexes are built from the json documents when they don't exist yet
+    """
+    if not index_exists(table, database_folder):
+        return rebuild_index(table, database_folder)
+    if not documents and not removed_names:
+        return load_index(table, database_folder)
+
+    # The cached index is shared, a copy is modified
+    index = DocumentIndex.from_dict(table, load_index(table, database_folder).as_dict())
+    for name in removed_names:
+        index.remove(name)
+    for document in documents:
+        index.add(document)
+    save_index(index, database_folder)
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        raise Exception("This script takes one argument : rebuild")
+
+    for table in INDEXES:
+        index = rebuild_index(table)
+        counts = ", ".join(f"{len(index.values[field])} {field} values" for field in index.fields)
+        print(f"Rebuilt {get_index_path(table)} : {len(index.documents)} {table}, {counts}")
@@ -0,0 +1,256 @@
+"""
+This module holds compact versions of the asset and shot documents, for the tools
+keeping a whole project in memory (planning, indexing...).
+
+AssetDocument and ShotDocument store their fields in __slots__ instead of a dictionary,
+and share a single string for the values repeated by many documents (type, group,
+sequence). They behave as read-only dictionaries, so they can be given to
+resolve_pattern and to the code written for the json documents :
+    shot_document = ShotDocument({"shot": "sh0010", "sequence": "sq0010"})
+    shot_document["sequence"], shot_document.get("shot"), dict(shot_document)
+
+DocumentColumns stores a large set of documents column by column, each repeated value
+being stored once with a small integer per document :
+    shots = load_columns("shots")
+    shots.get("sh0010"), shots.find(sequence="sq0010")
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+from array import array
+from collections.abc import Mapping, Sequence
+
+# Import pipeline modules
+from documents import get_asset_documents, get_shot_documents
+
+
+class Document(Mapping):
+    """
+    A read-only document storing its known fields in slots
+    Fields that are not known by the class are kept in a dictionary
+    """
+    __slots__ = ("_extra",)
+    # Fields stored in slots, the first one is the name of the document
+    FIELDS = ()
+    # Fields whose values are shared by many documents
+    INTERNED = ()
+
+    def __init__(self, values=(), **fields):
+        if fields or not isinstance(values, Mapping):
+            values = dict(values, **fields)
+        set_attribute = object.__setattr__
+        found = 0
+        for field in self.FIELDS:
+            value = values.get(field)
+            if value is not None:
+                found += 1
+                if field in self.INTERNED and type(value) is str:
+                    value = sys.intern(value)
+            set_attribute(self, field, value)
+        extra = None
+        if len(values) > found:
+            extra = {key: value for key, value in values.items() if key not in self.FIELDS} or None
+        set_attribute(self, "_extra", extra)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only, use dict(document) to get a modifiable copy")
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Faster than the default implementation going through __getitem__
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        return (type(self), (self.to_dict(),))
+
+    @property
+    def name(self):
+        return getattr(self, self.FIELDS[0])
+
+    def to_dict(self):
+        """Returns the document as a dictionary, to be modified or written as json"""
+        return dict(self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class AssetDocument(Document):
+    """
+    An asset : asset, type and group
+    """
+    __slots__ = ("asset", "type", "group")
+    FIELDS = ("asset", "type", "group")
+    INTERNED = ("type", "group")
+
+
+class ShotDocument(Document):
+    """
+    A shot : shot and sequence
+    """
+    __slots__ = ("shot", "sequence")
+    FIELDS = ("shot", "sequence")
+    INTERNED = ("sequence",)
+
+
+# Document class of each table
+DOCUMENT_CLASSES = {
+    "assets": AssetDocument,
+    "shots": ShotDocument,
+}
+
+
+class DocumentColumns(Sequence):
+    """
+    A set of documents stored column by column
+    The name column is a list, the other known fields are encoded : each value is stored
+    once, and each document keeps the position of its value in a compact array
+    """
+    def __init__(self, document_class, documents=()):
+        self.document_class = document_class
+        self.names = []
+        self._codes = {field: array("I") for field in document_class.FIELDS[1:]}
+        self._values = {field: [] for field in document_class.FIELDS[1:]}  # field -> code -> value
+        self._value_codes = {field: {} for field in document_class.FIELDS[1:]}  # field -> value -> code
+        self._rows = None  # name -> row, built by the first lookup
+        self._extra = {}  # row -> fields that are not known by the document class
+        for document in documents:
+            self.append(document)
+
+    def append(self, document):
+        """Adds a document, given as a dictionary or a Document"""
+        row = len(self.names)
+        name = document[self.document_class.FIELDS[0]]
+        self.names.append(name)
+        if self._rows is not None:
+            self._rows[name] = row
+        for field, codes in self._codes.items():
+            value = document.get(field)
+            value_codes = self._value_codes[field]
+            code = value_codes.get(value)
+            if code is None:
+                code = value_codes[value] = len(self._values[field])
+                self._values[field].append(value)
+            codes.append(code)
+        extra = {key: value for key, value in document.items() if key not in self.document_class.FIELDS}
+        if extra:
+            self._extra[row] = extra
+
+    def __len__(self):
+        return len(self.names)
+
+    def _get_rows(self):
+        """Returns the row of each name, the last document wins when a name is used twice"""
+        if self._rows is None:
+            self._rows = {name: row for row, name in enumerate(self.names)}
+        return self._rows
+
+    def __iter__(self):
+        document_class = self.document_class
+        key = document_class.FIELDS[0]
+        columns = [(field, self._values[field], codes) for field, codes in self._codes.items()]
+        for row, name in enumerate(self.names):
+            values = {key: name}
+            for field, field_values, codes in columns:
+                values[field] = field_values[codes[row]]
+            if self._extra:
+                values.update(self._extra.get(row, {}))
+            yield document_class(values)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        values = {self.document_class.FIELDS[0]: self.names[row]}
+        for field, codes in self._codes.items():
+            values[field] = self._values[field][codes[row]]
+        values.update(self._extra.get(row, {}))
+        return self.document_class(values)
+
+    def __contains__(self, document):
+        if isinstance(document, str):
+            return document in self._get_rows()
+        return super().__contains__(document)
+
+    def get(self, name):
+        """Returns the document with the provided name, or None"""
+        row = self._get_rows().get(name)
+        return None if row is None else self[row]
+
+    def column(self, field):
+        """Returns the values of the field, one per document"""
+        if field == self.document_class.FIELDS[0]:
+            return list(self.names)
+        values = self._values[field]
+        return [values[code] for code in self._codes[field]]
+
+    def find(self, **filters):
+        """
+        Returns the documents matching the filters
+        For instance :
+            assets.find(type="prop", group="food")
+        """
+        rows = range(len(self))
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self._codes:
+                raise KeyError(f"{self.document_class.__name__} can't be filtered by {field}")
+            code = self._value_codes[field].get(value)
+            if code is None:
+                return []
+            codes = self._codes[field]
+            rows = [row for row in rows if codes[row] == code]
+        return [self[row] for row in rows]
+
+
+def from_dicts(table, documents):
+    """
+    Returns the documents of the table as Document objects
+    """
+    document_class = DOCUMENT_CLASSES[table]
+    return [document_class(document) for document in documents]
+
+
+def load_documents(table, **filters):
+    """
+    Returns the documents of the table matching the filters as Document objects
+    """
+    getter = get_asset_documents if table == "assets" else get_shot_documents
+    return from_dicts(table, getter(**filters))
+
+
+def load_columns(table, **filters):
+    """
+    Returns the documents of the table matching the filters in a DocumentColumns
+    """
+    getter = get_asset_documents if table == "assets" else get_shot_documents
+    return DocumentColumns(DOCUMENT_CLASSES[table], getter(**filters))
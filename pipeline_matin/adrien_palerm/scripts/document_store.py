@@ -0,0 +1,283 @@
+"""
+This module stores every asset and shot document in a single SQLite file
+(database/documents.db) instead of one json file per entity.
+
+Lookups and bulk queries ("all props in group food", "all shots in sq0030")
+go through indexed columns, so they don't need to list or open the json files.
+
+The json files stay the reference, they may be edited by hand :
+  - each document keeps the modification time and size of its json file, a document whose
+    file changed since it was stored is read from the file, and one whose file was removed
+    is not returned
+  - each table keeps the modification time of its json folder, bulk queries are made on the
+    json database when documents were added or removed by hand since (see is_current)
+
+The store can be filled from the json database, and written back to it :
+    python document_store.py import
+    python document_store.py export
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import json
+import sqlite3
+from glob import glob
+
+# Import pipeline modules
+from pipeline import get_pipeline_root
+from sqlite_files import get_thread_connection
+from json_files import file_to_dict, invalidate
+import document_indexes
+
+# Indexed columns for each kind of document, the first one is the primary key
+# The whole document is also kept as json, so additional fields are not lost
+TABLES = {
+    "assets": ["asset", "type", "group"],
+    "shots": ["shot", "sequence"],
+}
+
+
+def get_store_path():
+    """
+    Returns the path of the SQLite file holding the documents
+    """
+    return get_pipeline_root() + "/database/documents.db"
+
+
+def store_exists():
+    """
+    Returns True if the document store has been created
+    """
+    return os.path.exists(get_store_path())
+
+
+def connect(path=None):
+    """
+    Opens the document store, creating the tables and indexes if needed
+    """
+    connection = sqlite3.connect(path or get_store_path())
+    connection.row_factory = sqlite3.Row
+    for table, columns in TABLES.items():
+        key = columns[0]
+        column_definitions = ", ".join(f'"{column}" TEXT' for column in columns[1:])
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} '
+            f'("{key}" TEXT PRIMARY KEY, {column_definitions}, data TEXT NOT NULL, mtime_ns INTEGER, size INTEGER)'
+        )
+        # Stores created before the json files were checked don't have their signature
+        existing_columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        for column in ("mtime_ns", "size"):
+            if column not in existing_columns:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+        # One index per column used by bulk queries
+        for column in columns[1:]:
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ("{column}")'
+            )
+    # Assets are often queried by type and group at the same time
+    connection.execute('CREATE INDEX IF NOT EXISTS assets_type_group ON assets ("type", "group")')
+    # Modification time of the json folder of each table when the store was last synced with it
+    connection.execute('CREATE TABLE IF NOT EXISTS folders (name TEXT PRIMARY KEY, mtime_ns INTEGER)')
+    connection.commit()
+    return connection
+
+
+def get_connection():
+    """
+    Returns a connection to the document store, opened once per thread
+    """
+    return get_thread_connection(get_store_path(), connect)
+
+
+def get_json_path(table, name):
+    """
+    Returns the path of the json file of a document
+    """
+    return get_pipeline_root() + "/database/" + table + "/" + name + ".json"
+
+
+def put_documents(connection, table, documents):
+    """
+    Inserts or replaces the provided documents in the given table
+    The modification time and size of their json files are stored with them
+    """
+    columns = TABLES[table]
+    column_names = ", ".join(f'"{column}"' for column in columns)
+    placeholders = ", ".join("?" for _ in range(len(columns) + 3))
+    rows = []
+    for document in documents:
+        try:
+            stat = os.stat(get_json_path(table, document[columns[0]]))
+            signature = [stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            signature = [None, None]
+        rows.append([document.get(column) for column in columns] + [json.dumps(document)] + signature)
+    with connection:
+        connection.executemany(
+            f"INSERT OR REPLACE INTO {table} ({column_names}, data, mtime_ns, size) VALUES ({placeholders})",
+            rows
+        )
+
+
+def delete_documents(connection, table, names):
+    """
+    Removes the documents with the provided names from the given table
+    """
+    key = TABLES[table][0]
+    with connection:
+        connection.executemany(
+            f'DELETE FROM {table} WHERE "{key}" = ?',
+            [(name,) for name in names]
+        )
+
+
+def _load_row(table, row):
+    """
+    Returns the document of a row, read from its json file when the file changed since
+    it was stored, or None when the file was removed
+    """
+    path = get_json_path(table, row[TABLES[table][0]])
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # Documents stored without a json file are only in the store
+        return json.loads(row["data"]) if row["mtime_ns"] is None else None
+    if (stat.st_mtime_ns, stat.st_size) == (row["mtime_ns"], row["size"]):
+        return json.loads(row["data"])
+    # Edited by hand since it was stored
+    return file_to_dict(path)
+
+
+def get_document(connection, table, name):
+    """
+    Returns the document with the provided name, or None if it doesn't exist
+    """
+    key = TABLES[table][0]
+    row = connection.execute(
+        f'SELECT "{key}", data, mtime_ns, size FROM {table} WHERE "{key}" = ?', (name,)
+    ).fetchone()
+    if row is None:
+        return None
+    return _load_row(table, row)
+
+
+def find_documents(connection, table, **filters):
+    """
+    Returns every document of the table matching the provided filters, sorted by name
+    For instance :
+        find_documents(connection, "assets", type="prop", group="food")
+    """
+    columns = TABLES[table]
+    conditions = []
+    values = []
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if column not in columns:
+            raise KeyError(f"{table} can't be filtered by {column}, use one of : {columns}")
+        conditions.append(f'"{column}" = ?')
+        values.append(value)
+
+    query = f'SELECT "{columns[0]}", data, mtime_ns, size FROM {table}'
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f' ORDER BY "{columns[0]}"'
+    documents = []
+    for row in connection.execute(query, values):
+        document = _load_row(table, row)
+        # A document edited by hand may not match the filters anymore
+        if document is not None and all(value is None or document.get(column) == value for column, value in filters.items()):
+            documents.append(document)
+    return documents
+
+
+def is_current(connection, table):
+    """
+    Returns True if no json document of the table was added or removed since the store
+    was last synced with the json folder
+    """
+    row = connection.execute("SELECT mtime_ns FROM folders WHERE name = ?", (table,)).fetchone()
+    return row is not None and row["mtime_ns"] == document_indexes.get_folder_mtime(table)
+
+
+def save_folder_mtime(connection, table):
+    """
+    Records that the table is synced with its json folder, once its documents are written
+    """
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO folders (name, mtime_ns) VALUES (?, ?)",
+            (table, document_indexes.get_folder_mtime(table))
+        )
+
+
+def import_json_table(connection, table):
+    """
+    Fills a table of the store with the json documents of database/<table>
+    Documents that are not in the json database anymore are removed from the store
+    Returns the number of documents imported
+    """
+    documents = []
+    for path in sorted(glob(get_pipeline_root() + "/database/" + table + "/*.json")):
+        with open(path, 'r') as file:
+            documents.append(json.loads(file.read()))
+    put_documents(connection, table, documents)
+
+    # Remove the documents deleted from the json database
+    key = TABLES[table][0]
+    names = {document[key] for document in documents}
+    stored_names = [row[0] for row in connection.execute(f'SELECT "{key}" FROM {table}')]
+    delete_documents(connection, table, [name for name in stored_names if name not in names])
+    save_folder_mtime(connection, table)
+    return len(documents)
+
+
+def import_json_database(connection=None):
+    """
+    Fills the store with the documents of database/assets and database/shots
+    Documents that are not in the json database anymore are removed from the store
+    Returns the number of documents imported per table
+    """
+    connection = connection or get_connection()
+    return {table: import_json_table(connection, table) for table in TABLES}
+
+
+def export_json_database(connection=None):
+    """
+    Writes every document of the store back to database/assets and database/shots
+    Returns the number of documents exported per table
+    """
+    connection = connection or get_connection()
+    database_folder = get_pipeline_root() + "/database"
+    counts = {}
+    for table, columns in TABLES.items():
+        output_folder = database_folder + "/" + table
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        documents = find_documents(connection, table)
+        for document in documents:
+            json_filename = output_folder + "/" + document[columns[0]] + ".json"
+            with open(json_filename, 'w') as json_file:
+                json_file.write(json.dumps(document, indent=4))
+            invalidate(json_filename)
+        # The stored signatures are the ones of the written files
+        put_documents(connection, table, documents)
+        document_indexes.update_index(table, documents)
+        counts[table] = len(documents)
+    return counts
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("import", "export"):
+        raise Exception("This script takes one argument : import or export")
+
+    if sys.argv[1] == "import":
+        counts = import_json_database()
+        print(f"Imported into {get_store_path()} : {counts}")
+    else:
+        counts = export_json_database()
+        print(f"Exported from {get_store_path()} : {counts}")
@@ -4,14 +4,25 @@ import os
 script_directory = os.path.split(__file__)[0]
 sys.path.append(script_directory)
 
+from glob import glob
+
 # Import pipeline modules
 from pipeline import get_pipeline_root
 from json_files import file_to_dict
+import document_store
+import document_indexes
 
 def get_asset_document(asset_name):
     """
     Returns the asset document corresponding to the provided asset name
     """
+    # Use the document store when it has been created
+    if document_store.store_exists():
+        connection = document_store.get_connection()
+        asset_document = document_store.get_document(connection, "assets", asset_name)
+        if asset_document is not None:
+            return asset_document
+
     pipeline_root = get_pipeline_root()
     asset_file = pipeline_root + "/database/assets/" + asset_name + ".json"
     asset_document = file_to_dict(asset_file)
@@ -21,7 +32,100 @@ def get_shot_document(shot_name):
     """
     Returns the shot document corresponding to the provided shot name
     """
+    # Use the document store when it has been created
+    if document_store.store_exists():
+        connection = document_store.get_connection()
+        shot_document = document_store.get_document(connection, "shots", shot_name)
+        if shot_document is not None:
+            return shot_document
+
     pipeline_root = get_pipeline_root()
     shot_file = pipeline_root + "/database/shots/" + shot_name + ".json"
     shot_document = file_to_dict(shot_file)
-    return shot_document
\ No newline at end of file
+    return shot_document
+
+def get_asset_documents(type=None, group=None):
+    """
+    Returns every asset document matching the provided type and group
+    For instance, all props of the food group :
+        get_asset_documents(type="prop", group="food")
+    """
+    return _find_documents("assets", type=type, group=group)
+
+def get_shot_documents(sequence=None):
+    """
+    Returns every shot document of the provided sequence, sorted by shot name
+    """
+    return _find_documents("shots", sequence=sequence)
+
+def find_asset_names(type=None, group=None):
+    """
+    Returns the names of the assets matching the provided type and group, sorted
+    Only the indexes are read, not the documents
+    """
+    return _find_names("assets", type=type, group=group)
+
+def find_shot_names(sequence=None):
+    """
+    Returns the names of the shots of the provided sequence, sorted
+    Only the indexes are read, not the documents
+    """
+    return _find_names("shots", sequence=sequence)
+
+def get_sequences():
+    """
+    Returns the name of every sequence having shots, sorted
+    """
+    index = document_indexes.load_current_index("shots")
+    if index is not None:
+        return index.get_values("sequence")
+    return sorted({document["sequence"] for document in get_shot_documents() if document.get("sequence")})
+
+def _find_names(table, **filters):
+    """
+    Returns the names of the documents of the table matching the filters
+    """
+    index = document_indexes.load_current_index(table)
+    if index is not None:
+        return index.find(**filters)
+    key = document_indexes.INDEXES[table][0]
+    return [document[key] for document in _find_documents(table, **filters)]
+
+def _matches(document, filters):
+    """
+    Returns True if the document has the value of every filter
+    """
+    return all(value is None or document.get(key) == value for key, value in filters.items())
+
+def _find_documents(table, **filters):
+    """
+    Returns the documents of the table matching the filters
+    The document store is used when it is in sync with the json folder, then the secondary
+    indexes, so only the matching json files are read. Without them, every json file is read
+    """
+    if document_store.store_exists():
+        connection = document_store.get_connection()
+        if document_store.is_current(connection, table):
+            return document_store.find_documents(connection, table, **filters)
+
+    pipeline_root = get_pipeline_root()
+    index = document_indexes.load_current_index(table)
+    if index is not None:
+        documents = []
+        for name in index.find(**filters):
+            try:
+                document = file_to_dict(pipeline_root + "/database/" + table + "/" + name + ".json")
+            except FileNotFoundError:
+                # Removed by hand since the indexes were built
+                continue
+            # Edited by hand since the indexes were built
+            if _matches(document, filters):
+                documents.append(document)
+        return documents
+
+    documents = []
+    for path in sorted(glob(pipeline_root + "/database/" + table + "/*.json")):
+        document = file_to_dict(path)
+        if _matches(document, filters):
+            documents.append(document)
+    return documents
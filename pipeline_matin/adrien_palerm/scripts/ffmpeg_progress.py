@@ -0,0 +1,209 @@
+"""
+This module runs ffmpeg while following its progress.
+
+ffmpeg is asked to write its machine readable progress report on its standard output
+("-progress pipe:1"). Every report gives the number of encoded frames, the encoding
+speed and the size of the output, which are logged with an estimated time of arrival.
+
+When ffmpeg exits, a metrics record (wall time, CPU time, peak memory of the ffmpeg
+process, output bitrate...) is appended to a JSONL file, one line per encode.
+The CPU time and peak memory are measured with psutil : without it they are null, and so
+is the "measure_source" field of the record ("psutil" when they were measured).
+By default the file is logs/transcode_metrics.jsonl in the pipeline folder, the
+"transcode_metrics_path" setting may point elsewhere.
+
+The outputs given to run_ffmpeg are written to temporary files next to them, and moved
+over the previous files only once ffmpeg succeeded : a failed encode keeps the previous
+outputs.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import List
+
+# Import pipeline modules
+from pipeline import get_pipeline_root
+from settings import get_settings
+
+# psutil is optional, it measures the ffmpeg process itself while it runs
+# Without it the CPU time and peak memory are not measured : the usage of the child processes
+# of python mixes the encodes running at the same time
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Minimum number of seconds between two progress logs of the same encode
+REPORT_INTERVAL = 2.0
+
+# Added to the name of the outputs while they are written, before their extension
+TEMPORARY_SUFFIX = ".encoding"
+
+_metrics_lock = threading.Lock()
+
+
+def get_temporary_path(output_path) -> Path:
+    """
+    Returns the path an output is written to before it replaces the previous output
+    The file is hidden, and keeps the extension telling ffmpeg the format to write
+    """
+    output_path = Path(output_path)
+    return output_path.with_name("." + output_path.stem + TEMPORARY_SUFFIX + output_path.suffix)
+
+
+def get_metrics_path() -> Path:
+    """Returns the path of the JSONL file receiving the metrics of every encode"""
+    path = get_settings().get("transcode_metrics_path")
+    if path:
+        return Path(path)
+    return Path(get_pipeline_root()).joinpath("logs", "transcode_metrics.jsonl")
+
+
+def write_metrics(record: dict, path: Path = None) -> None:
+    """Appends a metrics record to the JSONL file"""
+    path = Path(path or get_metrics_path())
+    path.parent.mkdir(exist_ok=True, parents=True)
+    line = json.dumps(record) + "\n"
+    with _metrics_lock:
+        with path.open("a") as f:
+            f.write(line)
+
+
+class ProgressReport():
+    """
+    The state of an encode, updated from the progress blocks written by ffmpeg
+    """
+    def __init__(self, total_frames: int = None) -> None:
+        self.total_frames = total_frames
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = None
+        self.total_size = 0
+        self.out_time = 0.0  # Seconds of video encoded
+        self.finished = False
+        self.start = time.perf_counter()
+
+    def update(self, values: dict) -> None:
+        """Updates the report with the key=value pairs of a progress block"""
+        self.frame = int(values.get("frame", self.frame) or 0)
+        # ffmpeg reports 0 fps during the first second, use our own measure until then
+        self.fps = float(values.get("fps", 0.0) or 0.0)
+        elapsed = time.perf_counter() - self.start
+        if not self.fps and elapsed > 0:
+            self.fps = self.frame / elapsed
+        speed = values.get("speed", "").rstrip("x").strip()
+        self.speed = float(speed) if speed not in ("", "N/A") else self.speed
+        total_size = values.get("total_size", "N/A")
+        self.total_size = int(total_size) if total_size != "N/A" else self.total_size
+        out_time_us = values.get("out_time_us", values.get("out_time_ms", "N/A"))
+        if out_time_us not in ("N/A", "") and int(out_time_us) > 0:
+            self.out_time = int(out_time_us) / 1000000
+        self.finished = values.get("progress") == "end"
+
+    @property
+    def eta(self) -> float:
+        """Returns the estimated number of seconds left, or None if it can't be known"""
+        if not self.total_frames or not self.fps:
+            return None
+        return max(0.0, (self.total_frames - self.frame) / self.fps)
+
+    @property
+    def bitrate(self) -> float:
+        """Returns the average bitrate of the output in bits per second, or None"""
+        if not self.out_time:
+            return None
+        return self.total_size * 8 / self.out_time
+
+    def __str__(self) -> str:
+        frames = f"{self.frame}/{self.total_frames}" if self.total_frames else str(self.frame)
+        speed = f"{self.speed:.2f}x" if self.speed is not None else "?"
+        eta = f"{self.eta:.0f}s" if self.eta is not None else "?"
+        return f"frame {frames}, {self.fps:.1f} fps, speed {speed}, ETA {eta}"
+
+
+def _sample_process(handle, measures: dict) -> None:
+    """Records the CPU time and peak memory of a running process with psutil"""
+    try:
+        cpu_times = handle.cpu_times()
+        memory = handle.memory_info()
+    except psutil.Error:
+        return
+    measures["cpu_time"] = cpu_times.user + cpu_times.system
+    peak = getattr(memory, "peak_wset", memory.rss)  # peak_wset only exists on windows
+    measures["peak_rss_bytes"] = max(measures.get("peak_rss_bytes", 0), peak)
+
+
+def run_ffmpeg(command: List[str], total_frames: int = None, label: str = None, metrics_path: Path = None, outputs: List[Path] = None) -> ProgressReport:
+    """
+    Runs an ffmpeg command, logging its progress, then writes its metrics record
+    The outputs of the command given in outputs are written to temporary files, which
+    replace them once ffmpeg succeeded
+    Raises subprocess.CalledProcessError if ffmpeg fails, like subprocess.check_call
+    """
+    command = [str(part) for part in command]
+    label = label or Path(command[-1]).name
+    temporary_paths = {Path(path).as_posix(): get_temporary_path(path) for path in outputs or []}
+    run_command = [temporary_paths[part].as_posix() if part in temporary_paths else part for part in command]
+    progress_command = [run_command[0], "-progress", "pipe:1", "-nostats"] + run_command[1:]
+
+    report = ProgressReport(total_frames)
+    start = time.perf_counter()
+    started_at = time.time()
+    process = subprocess.Popen(progress_command, stdout=subprocess.PIPE, universal_newlines=True)
+    handle = None
+    if psutil is not None:
+        try:
+            handle = psutil.Process(process.pid)
+        except psutil.Error:
+            pass
+    measures = {}
+
+    # Each progress block is a list of key=value lines ending with "progress=..."
+    values = {}
+    last_report = 0.0
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        values[key] = value
+        if key != "progress":
+            continue
+        report.update(values)
+        values = {}
+        if handle is not None:
+            _sample_process(handle, measures)
+        now = time.perf_counter()
+        if report.finished or now - last_report >= REPORT_INTERVAL:
+            logging.info("%s : %s", label, report)
+            last_report = now
+    process.stdout.close()
+    process.wait()
+    wall_time = time.perf_counter() - start
+
+    write_metrics({
+        "label": label,
+        "command": command,
+        "started_at": started_at,
+        "returncode": process.returncode,
+        "wall_time": wall_time,
+        "cpu_time": measures.get("cpu_time"),
+        "peak_rss_bytes": measures.get("peak_rss_bytes"),
+        "measure_source": "psutil" if measures else None,
+        "frames": report.frame,
+        "encode_fps": report.frame / wall_time if wall_time else None,
+        "output_size": report.total_size,
+        "output_bitrate": report.bitrate,
+    }, metrics_path)
+
+    if process.returncode != 0:
+        # The previous outputs are kept, the temporary files of the failed encode are removed
+        for temporary_path in temporary_paths.values():
+            if temporary_path.exists():
+                os.remove(temporary_path)
+        raise subprocess.CalledProcessError(process.returncode, command)
+    for output_path, temporary_path in temporary_paths.items():
+        os.replace(temporary_path, output_path)
+    return report
@@ -0,0 +1,183 @@
+"""
+This module runs ffprobe on the inputs of the converters and caches the result.
+
+A probe is kept in memory for the running process, and in a SQLite file
+(database/ffprobe_cache.db) shared by every run. Entries are keyed by the path of the
+file and reused as long as its size and modification time don't change.
+
+    video = get_stream(probe("path/to/movie.mov"), "video")
+    video["codec_name"], video["pix_fmt"], get_frame_rate(video)
+
+The keyframes of the video stream are listed separately by probe_keyframes, reading the
+packets of the whole file is slower than reading its header.
+"""
+
+import os
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import subprocess
+from pathlib import Path
+
+# Import pipeline modules
+from pipeline import get_pipeline_root
+from sqlite_files import get_thread_connection
+
+# Arguments of ffprobe describing the container and every stream as json
+PROBE_ARGUMENTS = ["-v", "error", "-print_format", "json", "-show_format", "-show_streams"]
+
+# Arguments of ffprobe listing the flags of every packet of the video stream, "K" marks the keyframes
+KEYFRAME_ARGUMENTS = ["-v", "error", "-select_streams", "v:0", "-show_entries", "packet=flags", "-print_format", "csv=p=0"]
+
+# Codec reported by ffprobe for the files written by each encoder
+ENCODER_CODECS = {
+    "libx264": "h264",
+    "libx265": "hevc",
+    "prores_ks": "prores",
+}
+
+# (table, path, size, modification time) -> result, for the running process
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_cache_path():
+    """
+    Returns the path of the SQLite file holding the probes
+    """
+    return get_pipeline_root() + "/database/ffprobe_cache.db"
+
+
+def connect(path=None):
+    """
+    Opens the cache, creating the table if needed
+    """
+    path = path or get_cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path)
+    for table in ("probes", "keyframes"):
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, result TEXT NOT NULL)"
+        )
+    connection.commit()
+    return connection
+
+
+def get_connection():
+    """
+    Returns a connection to the cache, opened once per thread
+    """
+    return get_thread_connection(get_cache_path(), connect)
+
+
+def run_ffprobe(path, ffprobe_path="ffprobe"):
+    """
+    Runs ffprobe on a file and returns its result as a dictionary
+    """
+    command = [str(ffprobe_path)] + PROBE_ARGUMENTS + [str(path)]
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True).stdout
+    return json.loads(output)
+
+
+def run_ffprobe_keyframes(path, ffprobe_path="ffprobe"):
+    """
+    Runs ffprobe on a file and returns the keyframes of its video stream as a dictionary :
+      - packets : number of packets of the video stream
+      - first_is_keyframe : True if the stream starts with a keyframe
+      - max_gop : the largest number of packets between two keyframes, or until the end
+    """
+    command = [str(ffprobe_path)] + KEYFRAME_ARGUMENTS + [str(path)]
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, universal_newlines=True).stdout
+    flags = [line.strip() for line in output.splitlines() if line.strip()]
+    keyframes = [index for index, flag in enumerate(flags) if "K" in flag]
+    if not keyframes:
+        raise ValueError(f"No keyframe found in the video stream : {path}")
+    gops = [end - start for start, end in zip(keyframes, keyframes[1:] + [len(flags)])]
+    return {"packets": len(flags), "first_is_keyframe": keyframes[0] == 0, "max_gop": max(gops)}
+
+
+def _get_cached(table, path, run):
+    """
+    Returns the result of run(path) for a file, from the cache when the file didn't change
+    """
+    path = Path(path).absolute().as_posix()
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        result = _cache.get((table,) + key)
+    if result is not None:
+        return copy.deepcopy(result)
+
+    # The cache file is optional, the pipeline folder may be read only
+    try:
+        row = get_connection().execute(
+            f"SELECT result FROM {table} WHERE path = ? AND size = ? AND mtime_ns = ?", key
+        ).fetchone()
+    except sqlite3.Error:
+        logging.debug("Can't read the ffprobe cache", exc_info=True)
+        row = None
+
+    if row is not None:
+        result = json.loads(row[0])
+    else:
+        result = run(path)
+        try:
+            connection = get_connection()
+            with connection:
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {table} (path, size, mtime_ns, result) VALUES (?, ?, ?, ?)",
+                    key + (json.dumps(result),)
+                )
+        except sqlite3.Error:
+            logging.debug("Can't write the ffprobe cache", exc_info=True)
+
+    with _cache_lock:
+        _cache[(table,) + key] = result
+    return copy.deepcopy(result)
+
+
+def probe(path, ffprobe_path="ffprobe"):
+    """
+    Returns the ffprobe result of a file, from the cache when the file didn't change
+    """
+    return _get_cached("probes", path, lambda path: run_ffprobe(path, ffprobe_path))
+
+
+def probe_keyframes(path, ffprobe_path="ffprobe"):
+    """
+    Returns the keyframes of the video stream of a file (see run_ffprobe_keyframes),
+    from the cache when the file didn't change
+    """
+    return _get_cached("keyframes", path, lambda path: run_ffprobe_keyframes(path, ffprobe_path))
+
+
+def get_stream(probe_result, codec_type):
+    """
+    Returns the first stream of the type ("video", "audio"...), or None
+    """
+    for stream in probe_result.get("streams", []):
+        if stream.get("codec_type") == codec_type:
+            return stream
+    return None
+
+
+def get_frame_rate(stream):
+    """
+    Returns the frame rate of a video stream as a float, or None
+    """
+    numerator, _, denominator = stream.get("r_frame_rate", "0/0").partition("/")
+    try:
+        return int(numerator) / int(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def invalidate():
+    """
+    Empties the cache of the running process, the cache file is kept
+    """
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,382 @@
+"""
+This module keeps an in-memory index of the workfiles and publishes of the project.
+
+The asset and shot folders are crawled once with os.scandir, then the index is kept
+up to date by watching the folders :
+  - with the watchdog module when it is installed (inotify on linux,
+    ReadDirectoryChangesW on windows)
+  - otherwise by polling : the modification time of every known folder is checked
+    regularly, and only the folders that changed are listed again
+
+Questions such as "latest modeling workfile of apple" or "all publishes newer than T"
+are then answered from memory, without searching the network share.
+
+    index = FileIndex()
+    index.crawl()
+    index.start_watching()
+    index.latest_workfile("apple")
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import time
+import threading
+
+# Import pipeline modules
+from project import get_project_root
+from pattern_resolver import compile_matcher
+from publish_registry import PUBLISH_PATTERNS
+
+# watchdog is optional, the index falls back to polling without it
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Path of the workfiles of each task
+WORKFILE_PATTERNS = {
+    "modeling": "<project_root>/assets/<type>/<group>/<asset>/modeling/work/<asset>_v<version>*.ma",
+}
+
+# Folders crawled by default, relative to the project root
+INDEXED_FOLDERS = ["assets", "shots"]
+
+# Number of seconds between two checks of the folders when polling
+POLLING_INTERVAL = 5.0
+
+
+class FileEntry():
+    """
+    A file of the index, with the document parsed from its path when it is a
+    known workfile or publish
+    """
+    __slots__ = ("path", "size", "mtime", "kind", "task", "document")
+
+    def __init__(self, path, size, mtime, kind=None, task=None, document=None):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.kind = kind
+        self.task = task
+        self.document = document
+
+    @property
+    def version(self):
+        """Returns the version of the file as an integer, or None"""
+        if self.document and self.document.get("version"):
+            return int(self.document["version"])
+        return None
+
+    def __repr__(self):
+        return f"FileEntry({self.path!r}, kind={self.kind!r}, task={self.task!r})"
+
+
+class FileIndex():
+    """
+    In-memory index of the files found under the project folders
+    """
+    def __init__(self, project_root=None, folders=INDEXED_FOLDERS):
+        self.project_root = (project_root or get_project_root()).replace("\\", "/").rstrip("/")
+        self.roots = [self.project_root + "/" + folder for folder in folders]
+
+        # Matchers used to recognize workfiles and publishes : (kind, task, matcher)
+        self.matchers = []
+        for kind, patterns in (("workfile", WORKFILE_PATTERNS), ("publish", PUBLISH_PATTERNS)):
+            for task, pattern in patterns.items():
+                self.matchers.append((kind, task, compile_matcher(pattern, self.project_root)))
+
+        self.files = {}  # path -> FileEntry
+        self.directories = {}  # path -> modification time, used when polling
+        self.directory_files = {}  # path -> set of the paths of the files it contains
+        self.by_asset = {}  # (kind, task, asset) -> {path: FileEntry}
+        self._lock = threading.RLock()
+        self._observer = None
+        self._polling_thread = None
+        self._stop_event = threading.Event()
+
+    # Crawling
+
+    def crawl(self):
+        """
+        Lists every folder under the indexed roots, replacing the content of the index
+        Returns the time it took, in seconds
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.files.clear()
+            self.directories.clear()
+            self.directory_files.clear()
+            self.by_asset.clear()
+            for root in self.roots:
+                if os.path.isdir(root):
+                    self._scan_tree(root)
+        return time.perf_counter() - start
+
+    def _scan_tree(self, root):
+        """Adds every file and folder under root to the index"""
+        folders = [root]
+        while folders:
+            folders.extend(self._scan_directory(folders.pop()))
+
+    def _scan_directory(self, directory):
+        """
+        Lists a folder, updating the files it contains in the index
+        Returns the sub folders that were not indexed yet
+        """
+        new_folders = []
+        found_files = set()
+        try:
+            self.directories[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    path = directory + "/" + entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if path not in self.directories:
+                            new_folders.append(path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        found_files.add(path)
+                        known = self.files.get(path)
+                        if known is None or known.mtime != stat.st_mtime or known.size != stat.st_size:
+                            self.add_file(path, stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            self.remove_directory(directory)
+            return []
+
+        # Forget the files that are not in the folder anymore
+        for path in self.directory_files.get(directory, set()) - found_files:
+            self.remove_file(path)
+        self.directory_files[directory] = found_files
+        return new_folders
+
+    # Index maintenance
+
+    def add_file(self, path, size, mtime):
+        """
+        Adds or updates a file in the index
+        """
+        path = path.replace("\\", "/")
+        with self._lock:
+            self.remove_file(path)
+            entry = FileEntry(path, size, mtime)
+            for kind, task, matcher in self.matchers:
+                document = matcher.parse(path)
+                if document is not None:
+                    entry.kind = kind
+                    entry.task = task
+                    entry.document = document
+                    key = (kind, task, document.get("asset"))
+                    self.by_asset.setdefault(key, {})[path] = entry
+                    break
+            self.files[path] = entry
+            self.directory_files.setdefault(os.path.dirname(path), set()).add(path)
+            return entry
+
+    def remove_file(self, path):
+        """
+        Removes a file from the index, if it is indexed
+        """
+        path = path.replace("\\", "/")
+        with self._lock:
+            entry = self.files.pop(path, None)
+            if entry is None:
+                return
+            self.directory_files.get(os.path.dirname(path), set()).discard(path)
+            if entry.kind:
+                key = (entry.kind, entry.task, entry.document.get("asset"))
+                entries = self.by_asset.get(key, {})
+                entries.pop(path, None)
+                if not entries:
+                    self.by_asset.pop(key, None)
+
+    def remove_directory(self, directory):
+        """
+        Removes a folder and everything it contains from the index
+        """
+        directory = directory.replace("\\", "/").rstrip("/")
+        prefix = directory + "/"
+        with self._lock:
+            folders = [path for path in self.directories if path == directory or path.startswith(prefix)]
+            for folder in folders:
+                for path in list(self.directory_files.pop(folder, ())):
+                    self.remove_file(path)
+                del self.directories[folder]
+
+    def refresh_path(self, path):
+        """
+        Updates the index for a path that was created, modified or deleted
+        """
+        path = path.replace("\\", "/").rstrip("/")
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.remove_file(path)
+                self.remove_directory(path)
+                return
+            if os.path.isdir(path):
+                self._scan_tree(path)
+            else:
+                self.add_file(path, stat.st_size, stat.st_mtime)
+
+    # Watching
+
+    def start_watching(self, polling_interval=POLLING_INTERVAL):
+        """
+        Keeps the index up to date in the background, with watchdog if it is
+        installed, otherwise by polling the folders
+        """
+        self._stop_event.clear()
+        if Observer is not None:
+            self._observer = Observer()
+            handler = _IndexEventHandler(self)
+            for root in self.roots:
+                if os.path.isdir(root):
+                    self._observer.schedule(handler, root, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._polling_thread = threading.Thread(
+                target=self._poll, args=(polling_interval,), daemon=True
+            )
+            self._polling_thread.start()
+
+    def stop_watching(self):
+        """
+        Stops keeping the index up to date
+        """
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._polling_thread is not None:
+            self._polling_thread.join()
+            self._polling_thread = None
+
+    def poll(self):
+        """
+        Lists again the folders whose modification time changed since the last check
+        Files modified in place don't change the modification time of their folder,
+        only created, deleted and renamed files are noticed
+        """
+        with self._lock:
+            changed = []
+            for directory, mtime in list(self.directories.items()):
+                try:
+                    if os.stat(directory).st_mtime_ns != mtime:
+                        changed.append(directory)
+                except FileNotFoundError:
+                    self.remove_directory(directory)
+            for directory in changed:
+                if directory in self.directories:
+                    for folder in self._scan_directory(directory):
+                        self._scan_tree(folder)
+            # Roots created after the crawl
+            for root in self.roots:
+                if root not in self.directories and os.path.isdir(root):
+                    self._scan_tree(root)
+
+    def _poll(self, interval):
+        """Polling loop, run in a background thread"""
+        while not self._stop_event.wait(interval):
+            self.poll()
+
+    # Queries
+
+    def latest_workfile(self, asset, task="modeling"):
+        """
+        Returns the path of the workfile with the highest version, or None
+        """
+        return self._latest("workfile", task, asset)
+
+    def latest_publish(self, asset, task="modeling"):
+        """
+        Returns the path of the publish with the highest version, or None
+        """
+        return self._latest("publish", task, asset)
+
+    def _latest(self, kind, task, asset):
+        with self._lock:
+            entries = list(self.by_asset.get((kind, task, asset), {}).values())
+        if not entries:
+            return None
+        # Versions are compared as numbers, the most recent file wins between equal versions
+        latest = max(entries, key=lambda entry: (entry.version or 0, entry.mtime))
+        return latest.path
+
+    def files_newer_than(self, timestamp, kind=None, task=None):
+        """
+        Returns the entries modified after the timestamp, optionally filtered
+        by kind ("workfile" or "publish") and task, sorted by modification time
+        """
+        with self._lock:
+            entries = [
+                entry for entry in self.files.values()
+                if entry.mtime > timestamp
+                and (kind is None or entry.kind == kind)
+                and (task is None or entry.task == task)
+            ]
+        return sorted(entries, key=lambda entry: entry.mtime)
+
+
+class _IndexEventHandler(FileSystemEventHandler):
+    """
+    Forwards the watchdog events to the index
+    """
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def on_created(self, event):
+        self.index.refresh_path(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.index.refresh_path(event.src_path)
+
+    def on_deleted(self, event):
+        self.index.refresh_path(event.src_path)
+
+    def on_moved(self, event):
+        self.index.refresh_path(event.src_path)
+        self.index.refresh_path(event.dest_path)
+
+
+# Index shared by the tools of a long running process, such as a maya session
+_running_index = None
+_running_index_lock = threading.Lock()
+
+
+def start_index(project_root=None):
+    """
+    Crawls the project and starts watching it, once per process
+    Returns the shared index
+    """
+    global _running_index
+    with _running_index_lock:
+        if _running_index is None:
+            index = FileIndex(project_root)
+            index.crawl()
+            index.start_watching()
+            _running_index = index
+    return _running_index
+
+
+def get_running_index():
+    """
+    Returns the shared index if it has been started, otherwise None
+    """
+    return _running_index
+
+
+if __name__ == "__main__":
+    index = FileIndex()
+    elapsed = index.crawl()
+    print(f"Indexed {len(index.files)} files in {len(index.directories)} folders in {elapsed:.2f}s")
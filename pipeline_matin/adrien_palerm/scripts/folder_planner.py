@@ -0,0 +1,199 @@
+"""
+This module creates the folder structure of many documents at once.
+
+The folders of every document and every pattern are resolved first, then
+deduplicated so only the deepest folders are kept (creating them creates their
+parents too). Folders are then created by a pool of threads, each parent folder
+being created only once, which matters a lot on a high latency network share.
+
+Documents are given as json files, or selected from the database with the secondary
+indexes (--sequence for shots, --type and --group for assets). Selected documents are
+loaded as compact read-only documents, a selection may hold a whole project.
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pipeline modules
+from json_files import file_to_dict
+from pattern_resolver import resolve_patterns
+from document_model import load_documents
+
+# Number of folders created at the same time
+DEFAULT_WORKERS = 8
+
+# Fields used to select the documents of each table from the database
+SELECTION_FIELDS = {
+    "assets": ["type", "group"],
+    "shots": ["sequence"],
+}
+
+
+def plan_folders(folder_patterns, documents):
+    """
+    Returns the sorted list of folders to create for all the documents,
+    without duplicates and without the folders that are parents of other folders
+    """
+    folders = set()
+    for paths in resolve_patterns(folder_patterns, documents):
+        for path in paths:
+            folders.add(path.replace("\\", "/").rstrip("/"))
+
+    # Folders created implicitly by their children
+    parents = set()
+    for folder in folders:
+        parent = os.path.dirname(folder)
+        while parent and parent not in parents:
+            parents.add(parent)
+            parent = os.path.dirname(parent)
+
+    return sorted(folders - parents)
+
+
+def _create_children(parent, children, dry_run):
+    """
+    Creates the parent folder once, then each of its children
+    Returns a list of (folder, status, error) tuples
+    """
+    results = []
+    try:
+        parent_exists = os.path.isdir(parent)
+        if not parent_exists and not dry_run:
+            os.makedirs(parent, exist_ok=True)
+    except OSError as error:
+        return [(child, "failed", error) for child in children]
+
+    for child in children:
+        # Children of a parent that doesn't exist yet can't exist either
+        if dry_run:
+            status = "existing" if parent_exists and os.path.isdir(child) else "created"
+            results.append((child, status, None))
+            continue
+        try:
+            os.mkdir(child)
+            results.append((child, "created", None))
+        except FileExistsError:
+            results.append((child, "existing", None))
+        except OSError as error:
+            results.append((child, "failed", error))
+    return results
+
+
+def create_folders(folders, max_workers=DEFAULT_WORKERS, dry_run=False):
+    """
+    Creates the provided folders with a pool of threads
+    When dry_run is True, nothing is created and the summary tells what would be created
+
+    Returns a summary dictionary :
+        {"created": [...], "existing": [...], "failed": [(folder, error), ...], "elapsed": seconds}
+    """
+    start = time.perf_counter()
+
+    # Group folders by parent, so each parent is only created once
+    children_per_parent = {}
+    for folder in folders:
+        children_per_parent.setdefault(os.path.dirname(folder), []).append(folder)
+
+    summary = {"created": [], "existing": [], "failed": [], "elapsed": 0.0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_create_children, parent, children, dry_run)
+            for parent, children in children_per_parent.items()
+        ]
+        for future in futures:
+            for folder, status, error in future.result():
+                if status == "failed":
+                    summary["failed"].append((folder, error))
+                else:
+                    summary[status].append(folder)
+
+    summary["elapsed"] = time.perf_counter() - start
+    return summary
+
+
+def print_summary(summary, dry_run=False):
+    """
+    Prints the summary returned by create_folders
+    In dry run mode, every folder that would be created is listed
+    """
+    if dry_run:
+        for folder in summary["created"]:
+            print("Would create folder : " + folder)
+    for folder, error in summary["failed"]:
+        print(f"Failed to create folder : {folder} ({error})")
+
+    verb = "to create" if dry_run else "created"
+    print(
+        f"{len(summary['created'])} folders {verb}, "
+        f"{len(summary['existing'])} already existing, "
+        f"{len(summary['failed'])} failed, "
+        f"in {summary['elapsed']:.2f}s"
+    )
+
+
+def get_argument_parser(description, table=None):
+    """
+    Returns a parser of the command line arguments shared by the folder creation scripts
+    When the table ("assets" or "shots") is provided, documents may also be selected
+    from the database instead of being given as json files
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("paths", nargs="*" if table else "+", help="json documents to create the folders of")
+    parser.add_argument("--dry-run", action="store_true", help="only print the folders that would be created")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of folders created at the same time")
+    for field in SELECTION_FIELDS.get(table, []):
+        parser.add_argument(f"--{field}", default=None, help=f"also create the folders of the {table} of this {field}")
+    parser.set_defaults(table=table)
+    return parser
+
+
+def parse_arguments(description, table=None):
+    """
+    Returns the command line arguments shared by the folder creation scripts
+    """
+    parser = get_argument_parser(description, table)
+    arguments = parser.parse_args()
+    if table and not arguments.paths and not get_selection(arguments):
+        parser.error("provide json documents, or select them with " + ", ".join(
+            f"--{field}" for field in SELECTION_FIELDS[table]
+        ))
+    return arguments
+
+
+def get_selection(arguments):
+    """
+    Returns the values of the selection options that were provided : field -> value
+    """
+    fields = SELECTION_FIELDS.get(getattr(arguments, "table", None), [])
+    return {field: getattr(arguments, field) for field in fields if getattr(arguments, field) is not None}
+
+
+def get_selected_documents(arguments):
+    """
+    Returns the documents selected by the --sequence, --type and --group options, found
+    with the secondary indexes of the database, or an empty list without selection
+    The documents are read-only, use dict(document) to get a modifiable copy
+    """
+    selection = get_selection(arguments)
+    if not selection:
+        return []
+    return load_documents(arguments.table, **selection)
+
+
+def create_document_folders(folder_patterns, paths, max_workers=DEFAULT_WORKERS, dry_run=False, documents=()):
+    """
+    Reads the json documents and creates their folders, with the ones of the provided
+    documents, then prints a summary
+    """
+    documents = [file_to_dict(path) for path in paths] + list(documents)
+    folders = plan_folders(folder_patterns, documents)
+    summary = create_folders(folders, max_workers=max_workers, dry_run=dry_run)
+    print_summary(summary, dry_run=dry_run)
+    return summary
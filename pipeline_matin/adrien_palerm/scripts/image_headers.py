@@ -0,0 +1,250 @@
+"""
+This module reads the resolution and channels of EXR, PNG, TIFF and TGA frames from
+their headers, without any external tool.
+
+Only the first few KB of a file are read (at most MAX_HEADER_SIZE bytes, TIFF files
+may need a second small read where their directory is stored), so every frame of a
+sequence can be checked before an encode starts.
+
+    header = read_header("path/to/frame.1001.exr")
+    header.width, header.height, header.channels, header.has_alpha
+"""
+
+import struct
+import logging
+from pathlib import Path
+
+# Number of bytes read at the start of a file, enough for most headers
+HEADER_SIZE = 4096
+
+# Maximum number of bytes read for a header (EXR files with many layers have large headers)
+MAX_HEADER_SIZE = 65536
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+
+# PNG color types and their channels
+PNG_CHANNELS = {0: "Y", 2: "RGB", 3: "RGB", 4: "YA", 6: "RGBA"}
+
+# EXR pixel types
+EXR_PIXEL_TYPES = {0: "uint", 1: "half", 2: "float"}
+
+
+class ImageHeaderError(ValueError):
+    """Raised when a header is truncated or doesn't match its format"""
+
+
+class ImageHeader():
+    """
+    The resolution and channels of a frame
+    """
+    __slots__ = ("path", "format", "width", "height", "channels", "bit_depth")
+
+    def __init__(self, path, format, width, height, channels, bit_depth=None):
+        self.path = path
+        self.format = format
+        self.width = width
+        self.height = height
+        self.channels = channels  # Channel names, such as ["R", "G", "B", "A"]
+        self.bit_depth = bit_depth  # Bits per channel, or the EXR pixel type ("half", "float")
+
+    @property
+    def resolution(self):
+        return (self.width, self.height)
+
+    @property
+    def has_alpha(self):
+        return "A" in self.channels
+
+    def __repr__(self):
+        return f"ImageHeader({self.path!r}, {self.format}, {self.width}x{self.height}, {''.join(self.channels)})"
+
+
+def _read_start(path, size=HEADER_SIZE):
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+def read_header(path):
+    """
+    Returns the header of a frame, or None if its format isn't supported
+    Raises ImageHeaderError if the file is truncated or invalid
+    """
+    path = str(path)
+    extension = Path(path).suffix.lower()
+    readers = {
+        ".exr": read_exr_header,
+        ".png": read_png_header,
+        ".tif": read_tiff_header,
+        ".tiff": read_tiff_header,
+        ".tga": read_tga_header,
+    }
+    reader = readers.get(extension)
+    if reader is None:
+        return None
+    try:
+        return reader(path)
+    except ImageHeaderError:
+        raise
+    except (struct.error, ValueError, IndexError) as error:
+        # Offsets and sizes read from a corrupt header may point anywhere
+        raise ImageHeaderError(f"Invalid {extension[1:].upper()} header : {path} ({error})") from error
+
+
+def read_png_header(path):
+    """Reads the IHDR chunk, and looks for a tRNS chunk (transparency of palette images)"""
+    data = _read_start(path)
+    if not data.startswith(PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        raise ImageHeaderError(f"Not a PNG file : {path}")
+    try:
+        width, height, bit_depth, color_type = struct.unpack(">IIBB", data[16:26])
+    except struct.error:
+        raise ImageHeaderError(f"Truncated PNG header : {path}")
+    channels = list(PNG_CHANNELS.get(color_type, "RGB"))
+
+    # The chunks before the image data tell if a palette image has transparency
+    position = 8
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        if chunk_type == b"tRNS" and "A" not in channels:
+            channels.append("A")
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        position += length + 12
+    return ImageHeader(path, "png", width, height, channels, bit_depth)
+
+
+def read_tga_header(path):
+    """Reads the 18 bytes header, alpha bits are given by the image descriptor"""
+    data = _read_start(path, 18)
+    if len(data) < 18:
+        raise ImageHeaderError(f"Truncated TGA header : {path}")
+    image_type = data[2]
+    width, height, pixel_depth, descriptor = struct.unpack("<HHBB", data[12:18])
+    if image_type not in (1, 2, 3, 9, 10, 11) or not width or not height:
+        raise ImageHeaderError(f"Not a TGA file : {path}")
+    channels = ["Y"] if image_type in (3, 11) else ["R", "G", "B"]
+    if descriptor & 0x0F or pixel_depth == 32:
+        channels.append("A")
+    bit_depth = 8 if pixel_depth in (8, 24, 32) else pixel_depth
+    return ImageHeader(path, "tga", width, height, channels, bit_depth)
+
+
+def read_tiff_header(path):
+    """Reads the first image file directory, which may be stored anywhere in the file"""
+    with open(path, "rb") as f:
+        data = f.read(8)
+        if data[:4] == b"II*\x00":
+            order = "<"
+        elif data[:4] == b"MM\x00*":
+            order = ">"
+        else:
+            raise ImageHeaderError(f"Not a TIFF file : {path}")
+        (offset,) = struct.unpack(order + "I", data[4:8])
+        f.seek(offset)
+        data = f.read(2)
+        if len(data) < 2:
+            raise ImageHeaderError(f"Truncated TIFF header : {path}")
+        (count,) = struct.unpack(order + "H", data)
+        entries = f.read(count * 12)
+        if len(entries) < count * 12:
+            raise ImageHeaderError(f"Truncated TIFF header : {path}")
+
+        # Tag -> first value, only the tags stored in the entry itself are needed
+        tags = {}
+        for index in range(count):
+            tag, value_type, value_count = struct.unpack(order + "HHI", entries[index * 12:index * 12 + 8])
+            value = entries[index * 12 + 8:index * 12 + 12]
+            if value_type == 3:  # SHORT
+                tags[tag] = struct.unpack(order + "H", value[:2])[0]
+                if tag == 258 and value_count > 2:
+                    # Bits per sample of each channel, stored elsewhere, they are all the same
+                    f.seek(struct.unpack(order + "I", value)[0])
+                    bits = f.read(2)
+                    if len(bits) < 2:
+                        raise ImageHeaderError(f"Truncated TIFF header : {path}")
+                    tags[tag] = struct.unpack(order + "H", bits)[0]
+            elif value_type == 4:  # LONG
+                tags[tag] = struct.unpack(order + "I", value)[0]
+
+    if 256 not in tags or 257 not in tags:
+        raise ImageHeaderError(f"TIFF file without resolution : {path}")
+    samples = tags.get(277, 1)
+    channels = ["R", "G", "B"][:samples] if samples >= 3 else ["Y"]
+    # Extra samples 1 and 2 are associated and unassociated alpha
+    if samples in (2, 4) or tags.get(338) in (1, 2):
+        channels.append("A")
+    return ImageHeader(path, "tiff", tags[256], tags[257], channels, tags.get(258))
+
+
+def read_exr_header(path):
+    """Reads the attributes of the header until the channels and the data window are found"""
+    data = _read_start(path)
+    if not data.startswith(EXR_MAGIC):
+        raise ImageHeaderError(f"Not an EXR file : {path}")
+
+    channels = None
+    pixel_type = None
+    data_window = None
+    position = 8
+    while channels is None or data_window is None:
+        try:
+            name_end = data.index(b"\x00", position)
+            if name_end == position:
+                break  # End of the header
+            type_end = data.index(b"\x00", name_end + 1)
+            (size,) = struct.unpack("<i", data[type_end + 1:type_end + 5])
+            if type_end + 5 + size > len(data):
+                raise ValueError
+        except (ValueError, struct.error):
+            # The attribute isn't complete yet, read more of the file
+            if len(data) >= MAX_HEADER_SIZE:
+                raise ImageHeaderError(f"EXR header larger than {MAX_HEADER_SIZE} bytes : {path}")
+            previous_size = len(data)
+            data = _read_start(path, min(len(data) * 4, MAX_HEADER_SIZE))
+            if len(data) == previous_size:
+                raise ImageHeaderError(f"Truncated EXR header : {path}")
+            continue
+        name = data[position:name_end]
+        value = data[type_end + 5:type_end + 5 + size]
+        if name == b"channels":
+            channels, pixel_type = _parse_exr_channels(value, path)
+        elif name == b"dataWindow":
+            if len(value) < 16:
+                raise ImageHeaderError(f"Invalid EXR data window : {path}")
+            data_window = struct.unpack("<iiii", value[:16])
+        position = type_end + 5 + size
+
+    if channels is None or data_window is None:
+        raise ImageHeaderError(f"EXR header without channels or data window : {path}")
+    x_min, y_min, x_max, y_max = data_window
+    return ImageHeader(path, "exr", x_max - x_min + 1, y_max - y_min + 1, channels, pixel_type)
+
+
+def _parse_exr_channels(value, path):
+    """Returns the channel names and the pixel type of the first channel of a chlist attribute"""
+    channels = []
+    pixel_type = None
+    position = 0
+    while position < len(value) and value[position] != 0:
+        name_end = value.find(b"\x00", position)
+        if name_end < 0 or name_end + 17 > len(value):
+            raise ImageHeaderError(f"Invalid EXR channel list : {path}")
+        channels.append(value[position:name_end].decode("utf-8", "replace"))
+        if pixel_type is None:
+            pixel_type = EXR_PIXEL_TYPES.get(struct.unpack("<i", value[name_end + 1:name_end + 5])[0])
+        position = name_end + 17  # pixel type, pLinear, reserved, x sampling, y sampling
+    return channels, pixel_type
+
+
+def try_read_header(path):
+    """
+    Returns the header of a frame, or None if its format isn't supported or its header
+    can't be read, ffmpeg may still be able to decode it
+    """
+    try:
+        return read_header(path)
+    except (OSError, ImageHeaderError) as error:
+        logging.warning("Can't read the header of %s : %s", path, error)
+        return None
+
@@ -0,0 +1,158 @@
+"""
+This module detects the image sequences of a folder.
+
+A folder is listed once with os.scandir, and every file named like
+"path/to/file(.|_)<frame_number>.<extension>" is grouped with the other frames
+sharing its stem, separator and extension.
+Results are cached per folder, and reused as long as the modification time of
+the folder doesn't change (adding, removing or renaming a frame changes it).
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List
+from collections import OrderedDict
+
+# Matches the name of a frame : <stem><separator><frame_number>.<extension>
+FRAME_REGEX = re.compile(r"^(?P<stem>.+?)(?P<separator>[._])(?P<frame_number>\d+)\.(?P<extension>[^._]+)$")
+
+# Maximum number of folders kept in the cache
+CACHE_SIZE = 128
+
+
+class ImageSequence():
+    """
+    An image sequence found in a folder
+    """
+    def __init__(self, directory: str, stem: str, separator: str, extension: str) -> None:
+        self.directory = directory
+        self.stem = stem
+        self.separator = separator
+        self.extension = extension
+        self.files = {}  # frame number -> file name
+        self.padding = None
+
+    def add_frame(self, frame_number: str, file_name: str) -> None:
+        """Adds a frame, given as the digits found in its name"""
+        self.files[int(frame_number)] = file_name
+        # The padding is the smallest number of digits, frame 10000 of a sequence padded
+        # on 4 digits has 5 digits
+        if self.padding is None or len(frame_number) < self.padding:
+            self.padding = len(frame_number)
+
+    @property
+    def frames(self) -> List[int]:
+        """Returns the sorted list of frame numbers"""
+        return sorted(self.files)
+
+    @property
+    def first_frame(self) -> int:
+        return min(self.files)
+
+    @property
+    def last_frame(self) -> int:
+        return max(self.files)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.files)
+
+    @property
+    def missing_frames(self) -> List[int]:
+        """Returns the frame numbers missing between the first and the last frame"""
+        return sorted(set(range(self.first_frame, self.last_frame + 1)) - set(self.files))
+
+    @property
+    def pattern(self) -> str:
+        """Returns the path of the sequence with the "%<2digits>d" notation used by ffmpeg"""
+        frame_pattern = "%{}d".format(str(self.padding).zfill(2))
+        return f"{self.directory}/{self.stem}{self.separator}{frame_pattern}.{self.extension}"
+
+    def frame_path(self, frame: int) -> str:
+        """Returns the path of a frame of the sequence"""
+        return self.directory + "/" + self.files[frame]
+
+    def frame_paths(self) -> List[str]:
+        """Returns the path of every frame, in order"""
+        return [self.frame_path(frame) for frame in self.frames]
+
+    def __repr__(self) -> str:
+        return f"ImageSequence({self.pattern!r}, {self.first_frame}-{self.last_frame})"
+
+
+# directory -> (modification time, sequences), the most recently used entry is at the end
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _sequence_key(stem: str, separator: str, extension: str) -> tuple:
+    """Key identifying a sequence in a folder, extensions are compared case insensitively"""
+    return (stem, separator, extension.lower())
+
+
+def scan_directory(directory: str) -> Dict[tuple, ImageSequence]:
+    """
+    Returns the image sequences of the folder, keyed by (stem, separator, extension)
+    """
+    directory = str(directory).replace("\\", "/").rstrip("/")
+    mtime = os.stat(directory).st_mtime_ns
+    with _cache_lock:
+        entry = _cache.get(directory)
+        if entry is not None and entry[0] == mtime:
+            _cache.move_to_end(directory)
+            return entry[1]
+
+    sequences = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            match = FRAME_REGEX.match(entry.name)
+            if not match or not entry.is_file():
+                continue
+            stem, separator, frame_number, extension = match.group("stem", "separator", "frame_number", "extension")
+            key = _sequence_key(stem, separator, extension)
+            sequence = sequences.get(key)
+            if sequence is None:
+                sequence = sequences[key] = ImageSequence(directory, stem, separator, extension)
+            sequence.add_frame(frame_number, entry.name)
+
+    with _cache_lock:
+        _cache[directory] = (mtime, sequences)
+        _cache.move_to_end(directory)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return sequences
+
+
+def get_sequences(directory: str) -> List[ImageSequence]:
+    """
+    Returns the image sequences of the folder, sorted by stem
+    """
+    return sorted(scan_directory(directory).values(), key=lambda sequence: sequence.pattern)
+
+
+def find_sequence(frame_path: str) -> ImageSequence:
+    """
+    Returns the image sequence the provided frame belongs to
+    """
+    frame_path = Path(frame_path)
+    match = FRAME_REGEX.match(frame_path.name)
+    if not match:
+        raise Exception('File did not match the patern "path/to/file(.|_)<frame_number>.<extension>"')
+    key = _sequence_key(*match.group("stem", "separator", "extension"))
+    sequence = scan_directory(frame_path.parent.as_posix()).get(key)
+    if sequence is None:
+        raise FileNotFoundError("The input file does not exist : {}".format(frame_path))
+    return sequence
+
+
+def invalidate(directory: str = None) -> None:
+    """
+    Removes the provided folder from the cache, or every folder if no folder is provided
+    """
+    with _cache_lock:
+        if directory is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(directory).replace("\\", "/").rstrip("/"), None)
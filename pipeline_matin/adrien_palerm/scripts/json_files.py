@@ -1,10 +1,85 @@
+import os
 import json
+import copy
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Maximum number of parsed files kept in memory
+CACHE_SIZE = 512
+
+# path -> (mtime, size, dictionary), the most recently used entry is at the end
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
 
 def file_to_dict(path):
     """
     Reads the provided file and return it as a dictionary
+
+    Parsed files are cached : as long as the modification time and size of the file
+    don't change, the file is not read again.
+    Each call returns a copy, so modifying the result doesn't alter the cache.
     """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    # Look for a valid cache entry
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == signature:
+            _cache.move_to_end(path)
+            _cache_stats["hits"] += 1
+            return copy.deepcopy(entry[1])
+        _cache_stats["misses"] += 1
+
+    # Read the file
     with open(path, 'r') as file:
         content = file.read()
     dictionary = json.loads(content)
-    return dictionary
\ No newline at end of file
+
+    # Store it, removing the least recently used entries
+    with _cache_lock:
+        _cache[path] = (signature, dictionary)
+        _cache.move_to_end(path)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return copy.deepcopy(dictionary)
+
+def write_file_atomic(path, content):
+    """
+    Writes the content to a temporary file of the same folder, then renames it
+    """
+    folder, name = os.path.split(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(prefix="." + name, suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+def invalidate(path=None):
+    """
+    Removes the provided file from the cache, or every file if no path is provided
+    """
+    with _cache_lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(path), None)
+
+def cache_info():
+    """
+    Returns the hit and miss counters of the cache, and its current size
+    """
+    with _cache_lock:
+        return {
+            "hits": _cache_stats["hits"],
+            "misses": _cache_stats["misses"],
+            "size": len(_cache),
+            "max_size": CACHE_SIZE,
+        }
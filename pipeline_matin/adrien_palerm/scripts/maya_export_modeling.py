@@ -1,8 +1,12 @@
 
 import os
 from maya import cmds
-from pattern_resolver import resolve_pattern
+from pattern_resolver import resolve_pattern, parse_path
 from documents import get_asset_document
+from publish_registry import record_publish
+
+# Pattern of the workfiles, used to get the asset document back from the scene path
+WORKFILE_PATTERN = "<project_root>/assets/<type>/<group>/<asset>/modeling/work/<asset>_v<version>*.ma"
 
 def export_modeling():
     """
@@ -12,16 +16,20 @@ def export_modeling():
     current_path = cmds.file(q=True, sceneName=True)
     maya_file_name = os.path.split(current_path)[1]
 
-    # Get asset document
-    asset_name = maya_file_name.split("_")[0]
-    asset_document = get_asset_document(asset_name)
+    # Get asset document and version from the path of the scene
+    asset_document = parse_path(WORKFILE_PATTERN, current_path)
+
+    # Scenes saved outside of the project structure : use the file name and the database
+    if asset_document is None:
+        asset_name = maya_file_name.split("_")[0]
+        asset_document = get_asset_document(asset_name)
 
-    # Get version
-    version = maya_file_name.split("_v", 1)[1] # should get something like "001_description.ma"
-    version = version.split("_")[0].split(".")[0] # get rid of everything after the version
+        # Get version
+        version = maya_file_name.split("_v", 1)[1] # should get something like "001_description.ma"
+        version = version.split("_")[0].split(".")[0] # get rid of everything after the version
 
-    # Add version to the document to resolve the path later on
-    asset_document["version"] = version
+        # Add version to the document to resolve the path later on
+        asset_document["version"] = version
 
     # Get export path
     pattern = "<project_root>/assets/<type>/<group>/<asset>/modeling/publish/v<version>/<asset>_v<version>.ma"
@@ -40,3 +48,6 @@ def export_modeling():
         type="mayaAscii",
         exportSelected=True
     )
+
+    # Record the publish, so it can be found without searching the publish folders
+    record_publish(asset_document["asset"], "modeling", asset_document["version"], export_path)
@@ -1,8 +1,11 @@
-
+import os
+import threading
 from glob import glob
 from maya import cmds
 from maya_drop_document_dialog import DocumentDropDialog
-from pattern_resolver import resolve_pattern
+from pattern_resolver import resolve_pattern, parse_path
+from publish_registry import PUBLISH_PATTERNS, get_latest_publish
+from file_index import start_index, get_running_index
 
 class ImportModelingPublishDialog(DocumentDropDialog):
     """
@@ -13,22 +16,19 @@ class ImportModelingPublishDialog(DocumentDropDialog):
     close_when_done = False
     title = "Import Modeling Publish"
 
+    def __init__(self, parent=None):
+        super(ImportModelingPublishDialog, self).__init__(parent)
+        # Start the file index of this maya session in the background, once per session
+        # Until the project is crawled, the publish folders are searched
+        threading.Thread(target=start_index, daemon=True).start()
+
     def process_document(self, document):
         """
         Main method of the class, that processes each document dropped on the dialog
         Looks for the latest published file, and imports it as a reference
         """
-        # Get search pattern
-        pattern = "<project_root>/assets/<type>/<group>/<asset>/modeling/publish/v*/<asset>_v*.ma"
-        search = resolve_pattern(pattern, document)
-
-        # Look for paths that match the search pattern
-        print(f"Looking for files matching the pattern : {search}")
-        paths = glob(search)
-        if paths:
-            # Get last version
-            last_path = sorted(paths)[-1]
-
+        last_path = self.get_latest_publish_path(document)
+        if last_path:
             # Import it
             cmds.file(
                 last_path,
@@ -41,4 +41,38 @@ class ImportModelingPublishDialog(DocumentDropDialog):
             title = "Warning"
             message = f"No publish found for asset : {document['asset']}"
             buttons = ["OK"]
-            cmds.confirmDialog(t=title, m=message, b=buttons)
\ No newline at end of file
+            cmds.confirmDialog(t=title, m=message, b=buttons)
+
+    def get_latest_publish_path(self, document):
+        """
+        Returns the path of the latest modeling publish of the asset, or None
+        The publish registry is used first, then the file index if one is running,
+        the publish folders are only searched as a last resort
+        """
+        latest_publish = get_latest_publish(document["asset"], "modeling")
+        if latest_publish and os.path.exists(latest_publish["path"]):
+            return latest_publish["path"]
+
+        # Ask the file index when it is running in this maya session
+        index = get_running_index()
+        if index is not None:
+            path = index.latest_publish(document["asset"], "modeling")
+            if path:
+                return path
+
+        # Get search pattern
+        pattern = "<project_root>/assets/<type>/<group>/<asset>/modeling/publish/v*/<asset>_v*.ma"
+        search = resolve_pattern(pattern, document)
+
+        # Look for paths that match the search pattern
+        print(f"Looking for files matching the pattern : {search}")
+        versions = {}
+        for path in glob(search):
+            publish = parse_path(PUBLISH_PATTERNS["modeling"], path)
+            if publish:
+                versions[int(publish["version"])] = path
+
+        # Compare versions as numbers, so v1000 comes after v999
+        if versions:
+            return versions[max(versions)]
+        return None
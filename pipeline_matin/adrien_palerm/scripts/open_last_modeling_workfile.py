@@ -11,14 +11,15 @@ sys.path.append(script_directory)
 
 # Import pipeline modules
 from json_files import file_to_dict
-from pattern_resolver import resolve_pattern
+from pattern_resolver import resolve_pattern, parse_path
+from file_index import WORKFILE_PATTERNS
 from settings import get_settings
 
 
 def open_last_modeling_workfile(asset_document):
     """
     This function opens the latest modeling workfile.
-    Please note that "latest" means "latest in alphabetical order", not "latest in date"
+    Versions are compared as numbers (v100 is after v99), the most recent file wins between equal versions
     """
     # Get search pattern
     pattern = "<project_root>/assets/<type>/<group>/<asset>/modeling/work/<asset>_v*_*.ma"
@@ -27,8 +28,12 @@ def open_last_modeling_workfile(asset_document):
     # Look for paths that match the search pattern
     paths = glob(search)
     if paths:
-        # Get last version
-        last_path = sorted(paths)[-1]
+        # Get last version, parsed from the path as the file index does
+        def version_key(path):
+            document = parse_path(WORKFILE_PATTERNS["modeling"], path)
+            version = int(document["version"]) if document and document.get("version") else 0
+            return version, os.path.getmtime(path)
+        last_path = max(paths, key=version_key)
 
         # Open it in maya
         maya_path = get_settings()["maya_path"]
@@ -1,5 +1,191 @@
+import os
+import re
+from functools import lru_cache
+from operator import itemgetter
 from project import get_project_root
 
+# Matches the tokens of a pattern, such as <asset> or <project_root>
+TOKEN_REGEX = re.compile(r"<([^<>]+)>")
+
+# Regular expressions used for some tokens when parsing a path,
+# the other tokens match anything between two slashes
+TOKEN_EXPRESSIONS = {
+    "version": r"\d+",
+}
+
+
+def get_values_getter(keys):
+    """
+    Returns a function giving the tuple of values of the keys in a dictionary,
+    raising a KeyError if one is missing
+    """
+    if len(keys) > 1:
+        return itemgetter(*keys)
+    # itemgetter doesn't return a tuple for less than two keys
+    keys = tuple(keys)
+
+    def get_values(dictionary):
+        return tuple(dictionary[key] for key in keys)
+    return get_values
+
+
+class UnresolvedPatternError(Exception):
+    """
+    Raised when a pattern uses tokens that the document doesn't provide
+    """
+    def __init__(self, pattern, missing_tokens):
+        self.pattern = pattern
+        self.missing_tokens = missing_tokens
+        super().__init__(
+            f"Failed to fully resolve the pattern : {pattern}, missing : {', '.join(missing_tokens)}"
+        )
+
+
+class PatternTemplate():
+    """
+    A pattern compiled once into literal parts and tokens,
+    so it can be resolved in a single pass
+    """
+    def __init__(self, pattern):
+        self.pattern = pattern
+        # Splitting on the token regex alternates literals and token names :
+        # [literal, token, literal, token, ..., literal]
+        parts = TOKEN_REGEX.split(pattern)
+        self.literals = parts[0::2]
+        self.tokens = parts[1::2]
+        self.uses_project_root = "project_root" in self.tokens
+
+    def get_format(self, project_root):
+        """
+        Returns the pattern as a %-format string with the project root written in it,
+        and a function returning the tuple of document values it is formatted with
+        """
+        parts = [self.literals[0].replace("%", "%%")]
+        document_tokens = []
+        for token, literal in zip(self.tokens, self.literals[1:]):
+            if token == "project_root":
+                parts.append(project_root.replace("%", "%%"))
+            else:
+                parts.append("%s")
+                document_tokens.append(token)
+            parts.append(literal.replace("%", "%%"))
+        return "".join(parts), get_values_getter(document_tokens)
+
+    def resolve(self, document, project_root=None):
+        """
+        Returns the pattern resolved with the values of the document
+        The project root is fetched from the settings if it is used and not provided
+        """
+        if self.uses_project_root and project_root is None:
+            project_root = get_project_root()
+        return _format_pattern(self.pattern, project_root, document)
+
+    def resolve_tokens(self, document, project_root):
+        """
+        Resolves the pattern token by token, raising an error for the missing tokens
+        """
+        parts = [self.literals[0]]
+        missing_tokens = []
+        for token, literal in zip(self.tokens, self.literals[1:]):
+            if token == "project_root":
+                value = project_root
+            else:
+                value = document.get(token)
+            if value is None:
+                missing_tokens.append(token)
+                continue
+            parts.append(str(value))
+            parts.append(literal)
+
+        # Raise an error if the path couldn't be fully resolved
+        if missing_tokens:
+            raise UnresolvedPatternError(self.pattern, missing_tokens)
+        return "".join(parts)
+
+
+class PatternMatcher():
+    """
+    A pattern compiled into a regular expression, used to get the values of
+    the tokens back from a path (the reverse of PatternTemplate.resolve)
+    """
+    def __init__(self, pattern, project_root=None):
+        self.pattern = pattern
+        template = compile_pattern(pattern)
+        if template.uses_project_root and project_root is None:
+            project_root = get_project_root()
+        self.tokens = []
+
+        expression = ""
+        for index, literal in enumerate(template.literals):
+            expression += self._literal_expression(literal)
+            if index == len(template.tokens):
+                break
+            token = template.tokens[index]
+            if token == "project_root":
+                expression += self._literal_expression(project_root.replace("\\", "/"))
+            elif token in self.tokens:
+                # A token used several times must have the same value everywhere
+                expression += "(?P=t{})".format(self.tokens.index(token))
+            else:
+                group = "t{}".format(len(self.tokens))
+                token_expression = TOKEN_EXPRESSIONS.get(token, r"[^/]+?")
+                expression += "(?P<{}>{})".format(group, token_expression)
+                self.tokens.append(token)
+
+        # Windows paths are not case sensitive
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        self.regex = re.compile(expression, flags)
+
+    @staticmethod
+    def _literal_expression(literal):
+        """Escapes a literal part of the pattern, keeping the glob wildcards"""
+        expression = re.escape(literal.replace("\\", "/"))
+        expression = expression.replace(r"\*", "[^/]*").replace(r"\?", "[^/]")
+        return expression
+
+    def parse(self, path):
+        """
+        Returns a dictionary with the value of each token found in the path,
+        or None if the path doesn't match the pattern
+        """
+        match = self.regex.fullmatch(str(path).replace("\\", "/"))
+        if not match:
+            return None
+        return {
+            token: match.group("t{}".format(index))
+            for index, token in enumerate(self.tokens)
+        }
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """
+    Returns the compiled template of the pattern, compiled templates are cached
+    """
+    return PatternTemplate(pattern)
+
+
+@lru_cache(maxsize=256)
+def _get_format(pattern, project_root):
+    return compile_pattern(pattern).get_format(project_root)
+
+
+def _format_pattern(pattern, project_root, document):
+    """
+    Resolves a pattern with the values of the document in a single % operation
+    """
+    format_string, get_values = _get_format(pattern, project_root)
+    try:
+        values = get_values(document)
+    except KeyError:
+        values = (None,)
+    # Documents missing a token, or giving it no value, are resolved again token by token
+    # to report the missing tokens
+    if None in values:
+        return compile_pattern(pattern).resolve_tokens(document, project_root)
+    return format_string % values
+
+
 def resolve_pattern(pattern, document):
     """
     Resolves the provided pattern with the provided document
@@ -9,18 +195,50 @@ def resolve_pattern(pattern, document):
     It may also include the "*" character, used to search files with the glob() function
     For instance :
       "<project_root>/assets/<type>/<group>/<asset>/modeling/work/<asset>_v*_*.ma"
+
+    The project root is cached, and read again only when the settings change
+    """
+    return _format_pattern(pattern, get_project_root(), document)
+
+
+def compile_matcher(pattern, project_root=None):
+    """
+    Returns the compiled matcher of the pattern, compiled matchers are cached
+    The project root of the settings is used when it is not provided
+    """
+    if project_root is None and compile_pattern(pattern).uses_project_root:
+        project_root = get_project_root()
+    return _compile_matcher(pattern, project_root)
+
+
+@lru_cache(maxsize=256)
+def _compile_matcher(pattern, project_root):
+    return PatternMatcher(pattern, project_root)
+
+
+def parse_path(pattern, path):
+    """
+    Returns the document described by a path, according to the provided pattern
+    For instance, with the pattern :
+      "<project_root>/assets/<type>/<group>/<asset>/modeling/work/<asset>_v<version>_*.ma"
+    the path "D:/project/assets/prop/food/apple/modeling/work/apple_v003_wip.ma" gives :
+      {"type": "prop", "group": "food", "asset": "apple", "version": "003"}
+
+    Returns None if the path doesn't match the pattern
+    """
+    return compile_matcher(pattern).parse(path)
+
+
+def resolve_patterns(patterns, documents):
+    """
+    Resolves every pattern with every document, reading the project root only once
+    Returns one list of resolved paths per document, in the order of the patterns
     """
-    # Replace root project
-    project_root = get_project_root()
-    pattern = pattern.replace("<project_root>", project_root)
-
-    # Replace fields related to the asset
-    for key, value in document.items():
-        to_replace = "<" + key + ">"
-        pattern = pattern.replace(to_replace, value)
-    
-    # Raise an error if the path couldn't be fully resolved
-    if "<" in pattern:
-        raise Exception(f"Failed to fully resolve the pattern : {pattern}")
-    
-    return pattern
\ No newline at end of file
+    templates = [compile_pattern(pattern) for pattern in patterns]
+    project_root = None
+    if any(template.uses_project_root for template in templates):
+        project_root = get_project_root()
+    return [
+        [_format_pattern(pattern, project_root, document) for pattern in patterns]
+        for document in documents
+    ]
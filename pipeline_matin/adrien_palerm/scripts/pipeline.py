@@ -1,4 +1,6 @@
 import os
+from pathlib import Path
+from functools import lru_cache
 
 def get_pipeline_root():
     """
@@ -9,5 +11,17 @@ def get_pipeline_root():
     root_folder = os.path.split(parent_folder)[0]
     return root_folder
 
+@lru_cache(maxsize=None)
+def get_ffmpeg_path(program="ffmpeg"):
+    """
+    Returns the path of ffmpeg (or ffprobe) used by every converter
+    The executable shipped in the "ffmpeg" folder of the pipeline is used when it is there,
+    otherwise the one found in the PATH
+    """
+    shipped_path = Path(get_pipeline_root()).joinpath("ffmpeg", program + ".exe")
+    if shipped_path.exists():
+        return shipped_path
+    return Path(program)
+
 if __name__ == "__main__":
     print(get_pipeline_root())
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+This script checks the frames of image sequences before they are encoded.
+
+The checks run in seconds, instead of letting ffmpeg fail after minutes of encoding
+or write a movie with holes :
+  - continuity : frames missing between the first and the last frame, from the listing
+    of the folder
+  - sizes : empty frames, and frames much smaller than the others (likely truncated)
+  - headers : frames whose header can't be read, PNG frames without their end chunk,
+    and frames whose resolution differs from the first frame
+Frames are checked by a pool of threads, most of the time is spent waiting for the disk.
+
+    python preflight.py <first_frame_of_a_sequence> [--json]
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import json
+import time
+import struct
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pipeline modules
+from image_sequences import find_sequence
+from image_headers import read_header, ImageHeaderError
+
+# Number of frames checked at the same time
+DEFAULT_WORKERS = 16
+
+# Frames smaller than this ratio of the median size are reported as likely truncated
+OUTLIER_RATIO = 0.5
+
+# Last bytes of every complete PNG file : the IEND chunk and its CRC
+PNG_END = b"IEND\xaeB`\x82"
+
+# Kinds of issues preventing an encode, the other kinds are warnings
+ERRORS = {"missing", "empty", "header", "resolution", "unreadable"}
+
+
+class PreflightIssue():
+    """
+    A problem found on a frame
+    """
+    __slots__ = ("frame", "path", "kind", "message")
+
+    def __init__(self, frame, path, kind, message):
+        self.frame = frame
+        self.path = path
+        self.kind = kind  # missing, empty, size_outlier, header, resolution or unreadable
+        self.message = message
+
+    @property
+    def is_error(self):
+        return self.kind in ERRORS
+
+    def as_dict(self):
+        return {"frame": self.frame, "path": self.path, "kind": self.kind, "message": self.message}
+
+    def __str__(self):
+        level = "ERROR" if self.is_error else "WARNING"
+        return f"[{level}] frame {self.frame} : {self.message}"
+
+
+class PreflightReport():
+    """
+    The result of the checks of a frame range of an image sequence
+    """
+    def __init__(self, pattern, first_frame, last_frame):
+        self.pattern = pattern
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.frame_count = 0  # Frames found in the range
+        self.resolution = None
+        self.issues = []
+        self.elapsed = 0.0
+
+    @property
+    def errors(self) -> List[PreflightIssue]:
+        return [issue for issue in self.issues if issue.is_error]
+
+    @property
+    def warnings(self) -> List[PreflightIssue]:
+        return [issue for issue in self.issues if not issue.is_error]
+
+    @property
+    def ok(self) -> bool:
+        """Returns True if the sequence can be encoded"""
+        return not self.errors
+
+    def as_dict(self) -> dict:
+        return {
+            "pattern": self.pattern,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "frame_count": self.frame_count,
+            "resolution": self.resolution,
+            "ok": self.ok,
+            "issues": [issue.as_dict() for issue in self.issues],
+            "elapsed": self.elapsed,
+        }
+
+    def summary(self, max_issues=10) -> str:
+        """Returns a short description of the report, listing the first issues"""
+        status = "OK" if self.ok else "REJECTED"
+        lines = [
+            f"{status} {self.pattern} [{self.first_frame}-{self.last_frame}] : {self.frame_count} frames, "
+            f"{len(self.errors)} errors, {len(self.warnings)} warnings ({self.elapsed:.2f}s)"
+        ]
+        lines += [str(issue) for issue in self.issues[:max_issues]]
+        if len(self.issues) > max_issues:
+            lines.append(f"... and {len(self.issues) - max_issues} more")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.summary()
+
+
+class PreflightError(Exception):
+    """Raised when the frames of a sequence can't be encoded"""
+    def __init__(self, report: PreflightReport) -> None:
+        super().__init__(report.summary(max_issues=5))
+        self.report = report
+
+
+def check_frame(path):
+    """
+    Returns the size and header of a frame, and the issue found while reading them
+    as (kind, message), or None
+    """
+    try:
+        size = os.stat(path).st_size
+    except OSError as error:
+        return 0, None, ("unreadable", f"can't be read : {error}")
+    if size == 0:
+        return 0, None, ("empty", "the file is empty")
+    try:
+        header = read_header(path)
+        if header is not None and header.format == "png":
+            with open(path, "rb") as f:
+                f.seek(-len(PNG_END), os.SEEK_END)
+                if f.read() != PNG_END:
+                    return size, header, ("header", "the file is truncated")
+    except ImageHeaderError as error:
+        return size, None, ("header", str(error))
+    except (struct.error, ValueError) as error:
+        # Parse errors of a corrupt header, reported with the frame instead of stopping the checks
+        return size, None, ("header", f"the header can't be parsed : {error}")
+    except OSError as error:
+        return size, None, ("unreadable", f"can't be read : {error}")
+    return size, header, None
+
+
+def run_preflight(sequence, first_frame=None, last_frame=None, workers=DEFAULT_WORKERS) -> PreflightReport:
+    """
+    Checks the frames of the sequence between first_frame and last_frame (the whole
+    sequence by default) and returns the report
+    """
+    start = time.perf_counter()
+    first_frame = sequence.first_frame if first_frame is None else first_frame
+    last_frame = sequence.last_frame if last_frame is None else last_frame
+    report = PreflightReport(sequence.pattern, first_frame, last_frame)
+    frames = [frame for frame in sequence.frames if first_frame <= frame <= last_frame]
+    report.frame_count = len(frames)
+
+    # Continuity, from the listing of the folder
+    for frame in sorted(set(range(first_frame, last_frame + 1)) - set(frames)):
+        report.issues.append(PreflightIssue(frame, None, "missing", "the frame is missing"))
+
+    # Sizes and headers, read in parallel
+    paths = [sequence.frame_path(frame) for frame in frames]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check_frame, paths))
+
+    sizes = [size for size, _, issue in results if size and not issue]
+    median_size = statistics.median(sizes) if sizes else 0
+    for frame, path, (size, header, issue) in zip(frames, paths, results):
+        if issue is not None:
+            report.issues.append(PreflightIssue(frame, path, *issue))
+            continue
+        if size < median_size * OUTLIER_RATIO:
+            report.issues.append(PreflightIssue(
+                frame, path, "size_outlier",
+                f"{size} bytes, much smaller than the other frames ({median_size:.0f} bytes), it may be truncated"
+            ))
+        if header is None:
+            continue
+        if report.resolution is None:
+            report.resolution = header.resolution
+        elif header.resolution != report.resolution:
+            width, height = header.resolution
+            report.issues.append(PreflightIssue(
+                frame, path, "resolution",
+                f"{width}x{height} instead of {report.resolution[0]}x{report.resolution[1]}"
+            ))
+
+    report.issues.sort(key=lambda issue: issue.frame)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def check_transcoder(transcoder) -> PreflightReport:
+    """
+    Checks the frames read by an image sequence transcoder before its encode
+    Raises PreflightError if they can't be encoded, unless the transcoder has preflight disabled
+    """
+    if not getattr(transcoder, "preflight", True):
+        return None
+    report = run_preflight(transcoder.sequence, transcoder.first_frame, transcoder.last_frame)
+    if not report.ok:
+        raise PreflightError(report)
+    if report.warnings:
+        logging.warning("%s", report)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO")
+    parser = argparse.ArgumentParser(description="Checks the frames of image sequences before they are encoded")
+    parser.add_argument("inputs", nargs="+", help="one frame of each image sequence")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of frames checked at the same time")
+    parser.add_argument("--json", action="store_true", help="print the reports as json")
+    arguments = parser.parse_args()
+
+    reports = [run_preflight(find_sequence(Path(path)), workers=arguments.workers) for path in arguments.inputs]
+    if arguments.json:
+        print(json.dumps([report.as_dict() for report in reports], indent=4))
+    else:
+        for report in reports:
+            print(report.summary(max_issues=50))
+    if not all(report.ok for report in reports):
+        sys.exit(1)
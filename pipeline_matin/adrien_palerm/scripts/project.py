@@ -1,9 +1,18 @@
 from settings import get_settings
 
+# (settings, project root) : the root is read again only when the settings change
+_project_root = (None, None)
+
+
 def get_project_root():
-    """Returns the root of the project as a string"""
+    """
+    Returns the root of the project as a string, cached until the settings change
+    """
+    global _project_root
     settings = get_settings()
-    return settings["project_root"]
+    if _project_root[0] is not settings:
+        _project_root = (settings, settings["project_root"])
+    return _project_root[1]
 
 if __name__ == "__main__":
-    print(get_project_root())
\ No newline at end of file
+    print(get_project_root())
@@ -0,0 +1,169 @@
+"""
+This module keeps track of every publish in a SQLite file (database/publishes.db),
+so finding the latest publish of an asset doesn't need to search the publish folders.
+
+Publishes are recorded by the export tools. If the registry doesn't match the files
+anymore (files copied by hand, registry deleted...), it can be rebuilt from disk :
+    python publish_registry.py rebuild
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import time
+import sqlite3
+from glob import glob
+
+# Import pipeline modules
+from pipeline import get_pipeline_root
+from sqlite_files import get_thread_connection
+from pattern_resolver import compile_pattern, resolve_pattern, parse_path
+
+# Path of the published files of each task
+PUBLISH_PATTERNS = {
+    "modeling": "<project_root>/assets/<type>/<group>/<asset>/modeling/publish/v<version>/<asset>_v<version>.ma",
+}
+
+# Number of assets looked up per query
+QUERY_BATCH_SIZE = 500
+
+
+def get_registry_path():
+    """
+    Returns the path of the SQLite file holding the publishes
+    """
+    return get_pipeline_root() + "/database/publishes.db"
+
+
+def connect(path=None):
+    """
+    Opens the registry, creating the table if needed
+    The primary key doubles as the index used to find the latest version
+    """
+    connection = sqlite3.connect(path or get_registry_path())
+    connection.row_factory = sqlite3.Row
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS publishes ("
+        "asset TEXT NOT NULL, task TEXT NOT NULL, version INTEGER NOT NULL, "
+        "path TEXT NOT NULL, size INTEGER, timestamp REAL, "
+        "PRIMARY KEY (asset, task, version))"
+    )
+    connection.commit()
+    return connection
+
+
+def get_connection():
+    """
+    Returns a connection to the registry, opened once per thread
+    """
+    return get_thread_connection(get_registry_path(), connect)
+
+
+def record_publish(asset, task, version, path, connection=None):
+    """
+    Records a published file in the registry, replacing any previous record of that version
+    """
+    connection = connection or get_connection()
+    stat = os.stat(path)
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO publishes (asset, task, version, path, size, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (asset, task, int(version), path.replace("\\", "/"), stat.st_size, stat.st_mtime)
+        )
+
+
+def get_latest_publish(asset, task, connection=None):
+    """
+    Returns the latest publish of the asset for the task as a dictionary
+    (asset, task, version, path, size, timestamp), or None if there is none
+    """
+    connection = connection or get_connection()
+    row = connection.execute(
+        "SELECT * FROM publishes WHERE asset = ? AND task = ? ORDER BY version DESC LIMIT 1",
+        (asset, task)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def get_latest_publishes(assets, task, connection=None):
+    """
+    Returns the latest publish of each asset for the task : asset -> publish dictionary
+    Assets without publish are not in the result. Combined with the secondary indexes,
+    the latest publishes of a whole selection are found with a few queries :
+        get_latest_publishes(find_asset_names(type="prop"), "modeling")
+    """
+    connection = connection or get_connection()
+    assets = list(assets)
+    publishes = {}
+    # SQLite limits the number of parameters of a query
+    for start in range(0, len(assets), QUERY_BATCH_SIZE):
+        batch = assets[start:start + QUERY_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        rows = connection.execute(
+            f"SELECT * FROM publishes WHERE task = ? AND asset IN ({placeholders}) ORDER BY asset, version",
+            [task] + batch
+        )
+        for row in rows:
+            publishes[row["asset"]] = dict(row)  # The latest version comes last
+    return publishes
+
+
+def get_publishes(asset, task, connection=None):
+    """
+    Returns every publish of the asset for the task, from the oldest to the latest version
+    """
+    connection = connection or get_connection()
+    rows = connection.execute(
+        "SELECT * FROM publishes WHERE asset = ? AND task = ? ORDER BY version",
+        (asset, task)
+    )
+    return [dict(row) for row in rows]
+
+
+def rebuild_registry(connection=None):
+    """
+    Clears the registry and fills it again with the published files found on disk
+    Returns the number of publishes recorded per task
+    """
+    connection = connection or get_connection()
+
+    rows = []
+    counts = {}
+    for task, pattern in PUBLISH_PATTERNS.items():
+        # Turn every token except the project root into a wildcard to search the files
+        tokens = compile_pattern(pattern).tokens
+        search = resolve_pattern(pattern, {token: "*" for token in tokens if token != "project_root"})
+        counts[task] = 0
+        for path in glob(search):
+            document = parse_path(pattern, path)
+            if document is None:
+                continue
+            stat = os.stat(path)
+            rows.append((
+                document["asset"], task, int(document["version"]),
+                path.replace("\\", "/"), stat.st_size, stat.st_mtime
+            ))
+            counts[task] += 1
+
+    # Replace the whole content of the registry in a single transaction
+    with connection:
+        connection.execute("DELETE FROM publishes")
+        connection.executemany(
+            "INSERT OR REPLACE INTO publishes (asset, task, version, path, size, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+    return counts
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        raise Exception("This script takes one argument : rebuild")
+
+    start = time.perf_counter()
+    counts = rebuild_registry()
+    print(f"Rebuilt {get_registry_path()} in {time.perf_counter() - start:.2f}s : {counts}")
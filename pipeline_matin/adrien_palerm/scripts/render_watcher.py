@@ -0,0 +1,232 @@
+"""
+This script watches the render folders of the shots and transcodes the image sequences
+once their render is complete.
+
+Every few seconds, the folders matching
+"<project_root>/light_render/shots/<sequence>/<shot>/render" (and their sub folders)
+are listed. An image sequence is considered complete when its frame count, last frame,
+total size and latest modification time of its frames didn't change for a while
+("--stable-delay", 60 seconds by default), so frames rendered again are waited for too. It is then queued on a pool of workers converting it into the review profiles.
+
+A sequence rendered again is transcoded again once it is stable, and outputs that are
+already up to date are skipped, so restarting the watcher doesn't encode anything twice.
+The profiles of a sequence are written by a single ffmpeg process when they can share
+the decode of the frames, such as a movie and its review proxy.
+
+    python render_watcher.py --profile mp4 --profile proxy --profile contact_sheet --workers 2
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import glob
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pipeline modules
+from project import get_project_root
+from settings import get_settings
+from image_sequences import get_sequences
+from review_proxies import PROXY_FOLDER
+from batch_convert import PROFILES, REVIEW_PROFILES, IMAGE_EXTENSIONS, run_job_profiles, get_default_threads
+
+# Folders receiving the renders, their sub folders are watched too
+RENDER_FOLDERS_PATTERN = "{project_root}/light_render/shots/*/*/render"
+
+# Number of seconds a sequence must stay unchanged before it is transcoded
+STABLE_DELAY = 60.0
+
+# Number of seconds between two scans of the render folders
+POLLING_INTERVAL = 10.0
+
+# Number of sequences transcoded at the same time
+DEFAULT_WORKERS = 2
+
+
+class WatchedSequence():
+    """
+    The state of an image sequence found in a render folder
+    """
+    def __init__(self, sequence, signature):
+        self.sequence = sequence
+        self.signature = signature  # Changes whenever a frame is added or still being written
+        # A sequence found when the watcher starts is as old as its latest frame
+        self.changed_at = signature[-1] / 1e9
+        self.queued_signature = None  # Signature of the sequence when it was last queued
+        self.running = False
+
+    def update(self, sequence, signature, now):
+        """Updates the sequence with the result of a new scan"""
+        self.sequence = sequence
+        if signature != self.signature:
+            self.signature = signature
+            self.changed_at = now
+
+    def is_ready(self, now, stable_delay):
+        """Returns True if the sequence is stable and wasn't queued in this state yet"""
+        return (
+            not self.running
+            and self.signature != self.queued_signature
+            and now - self.changed_at >= stable_delay
+        )
+
+
+class RenderWatcher():
+    """
+    Finds the image sequences of the render folders and transcodes them once they are stable
+    """
+    def __init__(self, profiles, workers=DEFAULT_WORKERS, threads=None, stable_delay=STABLE_DELAY, project_root=None):
+        self.profiles = profiles
+        self.threads = threads or get_default_threads(workers)
+        self.stable_delay = stable_delay
+        self.project_root = (project_root or get_project_root()).replace("\\", "/").rstrip("/")
+        self.sequences = {}  # pattern -> WatchedSequence
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def get_render_folders(self):
+        """Returns the render folders of every shot and their sub folders"""
+        folders = []
+        for render_folder in glob.glob(RENDER_FOLDERS_PATTERN.format(project_root=self.project_root)):
+            for folder, sub_folders, _ in os.walk(render_folder):
+                # Skip the hidden folders, such as the chunks of the chunked encodes, and the review outputs
+                sub_folders[:] = [name for name in sub_folders if not name.startswith(".") and name != PROXY_FOLDER]
+                folders.append(folder.replace("\\", "/"))
+        return folders
+
+    def scan(self):
+        """
+        Lists the render folders, updates the state of every sequence and queues the
+        ones that are ready
+        Returns the number of sequences queued
+        """
+        now = time.time()
+        found = set()
+        for folder in self.get_render_folders():
+            try:
+                sequences = get_sequences(folder)
+                file_stats = get_file_stats(folder)
+            except FileNotFoundError:
+                continue
+            for sequence in sequences:
+                if "." + sequence.extension.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                signature = get_signature(sequence, file_stats)
+                if signature is None:
+                    continue
+                found.add(sequence.pattern)
+                with self._lock:
+                    watched = self.sequences.get(sequence.pattern)
+                    if watched is None:
+                        self.sequences[sequence.pattern] = WatchedSequence(sequence, signature)
+                    else:
+                        watched.update(sequence, signature, now)
+
+        queued = 0
+        with self._lock:
+            # Forget the sequences that were deleted
+            for pattern in set(self.sequences) - found:
+                if not self.sequences[pattern].running:
+                    del self.sequences[pattern]
+            for watched in self.sequences.values():
+                if watched.is_ready(now, self.stable_delay):
+                    watched.running = True
+                    watched.queued_signature = watched.signature
+                    self.executor.submit(self.transcode, watched)
+                    queued += 1
+        return queued
+
+    def transcode(self, watched):
+        """Converts a stable sequence into every profile, run by the workers"""
+        sequence = watched.sequence
+        first_frame_path = sequence.frame_path(sequence.first_frame)
+        logging.info("Transcoding %s (%d frames)", sequence.pattern, sequence.frame_count)
+        try:
+            results = run_job_profiles(first_frame_path, self.profiles, self.threads)
+            for result in results:
+                if result.succeeded:
+                    logging.info("%s", result)
+                else:
+                    logging.error("%s", result)
+        finally:
+            with self._lock:
+                watched.running = False
+
+    def run(self, interval=POLLING_INTERVAL):
+        """Scans the render folders every interval seconds, until stop() is called"""
+        logging.info("Watching %s", RENDER_FOLDERS_PATTERN.format(project_root=self.project_root))
+        while not self._stop_event.is_set():
+            try:
+                self.scan()
+            except Exception:
+                logging.exception("Scan of the render folders failed")
+            self._stop_event.wait(interval)
+
+    def stop(self, wait=True):
+        """Stops scanning, and waits for the queued transcodes if wait is True"""
+        self._stop_event.set()
+        self.executor.shutdown(wait=wait)
+
+
+def get_file_stats(folder):
+    """
+    Returns the size and modification time of every file of a folder : name -> (size, mtime_ns)
+    The folder is listed once for all its sequences, the listing gives the stats on Windows
+    """
+    file_stats = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            file_stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return file_stats
+
+
+def get_signature(sequence, file_stats):
+    """
+    Returns what changes while a sequence is being rendered : the frame count, the last
+    frame, the total size of the frames and their latest modification time
+    Returns None if a frame was deleted since the folder was listed
+    """
+    total_size = 0
+    latest_mtime = 0
+    for file_name in sequence.files.values():
+        stat = file_stats.get(file_name)
+        if stat is None:
+            return None
+        total_size += stat[0]
+        latest_mtime = max(latest_mtime, stat[1])
+    return (sequence.frame_count, sequence.last_frame, total_size, latest_mtime)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO", format="%(asctime)s %(levelname)s %(message)s")
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Transcodes the image sequences of the render folders once they are complete")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES) + sorted(REVIEW_PROFILES), help="output format, may be used several times (default : mp4)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of sequences transcoded at the same time")
+    parser.add_argument("--threads", type=int, default=None, help="number of threads of each ffmpeg process (default : cores / workers)")
+    parser.add_argument("--stable-delay", type=float, default=settings.get("render_watcher_stable_delay", STABLE_DELAY), help="number of seconds a sequence must stay unchanged before it is transcoded")
+    parser.add_argument("--interval", type=float, default=POLLING_INTERVAL, help="number of seconds between two scans of the render folders")
+    parser.add_argument("--once", action="store_true", help="scan the render folders once, transcode the stable sequences and exit")
+    arguments = parser.parse_args()
+
+    watcher = RenderWatcher(arguments.profile or ["mp4"], arguments.workers, arguments.threads, arguments.stable_delay)
+    if arguments.once:
+        watcher.scan()
+        watcher.stop()
+    else:
+        try:
+            watcher.run(arguments.interval)
+        except KeyboardInterrupt:
+            logging.info("Stopping, waiting for the running transcodes")
+            watcher.stop()
@@ -0,0 +1,166 @@
+"""
+This module writes light review outputs of image sequences :
+  - proxy movies : a low resolution h264 movie, quick to open over the network
+  - contact sheets : a single image tiling every Nth frame of the sequence
+
+Both are written in a "proxy" folder next to the frames, and are cached on the
+fingerprint of the frames : they are written again only when frames change.
+
+They behave like the converters of the image sequences (same input arguments), so
+batch_convert writes them with a full size output in a single-decode job, reusing the
+frames decoded for the full size encode :
+
+    python batch_convert.py --profile prores4444 --profile proxy --profile contact_sheet <frames>
+"""
+
+import sys
+import os
+# Add script directory to paths python can use, to avoid import errors
+script_directory = os.path.split(__file__)[0]
+sys.path.append(script_directory)
+
+import math
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List
+
+# Import pipeline modules
+from pipeline import get_ffmpeg_path
+from convert_to_mp4 import ImgSequenceToMp4
+from transcode_fingerprint import encode_output
+
+# Name of the folder receiving the review outputs, next to the frames
+PROXY_FOLDER = "proxy"
+
+# Maximum width of the proxy movies, the height follows the aspect ratio of the frames
+PROXY_WIDTH = 960
+
+# Quality of the proxy movies, h264 crf (lower is better)
+PROXY_CRF = 28
+
+# Contact sheets : one frame every CONTACT_SHEET_STEP frames, tiled on
+# CONTACT_SHEET_COLUMNS columns, each tile being CONTACT_SHEET_TILE_WIDTH pixels wide
+CONTACT_SHEET_STEP = 10
+CONTACT_SHEET_COLUMNS = 6
+CONTACT_SHEET_TILE_WIDTH = 320
+
+
+class ReviewOutput(ABC):
+    """
+    A review output of an image sequence, read with the input arguments of the mp4 converter
+    Child classes set the suffix of the output and define its output arguments
+    """
+    # Name of the output file, after the name of the sequence
+    suffix = ""
+
+    def __init__(self, input_path: str, audio_path: str = None, threads: int = None) -> None:
+        self.transcoder = ImgSequenceToMp4(input_path=input_path, audio_path=audio_path, threads=threads)
+        self.preflight = True  # Check the frames before encoding them
+
+    # The attributes used by the fingerprint and the pre-flight are the ones of the transcoder
+
+    @property
+    def sequence(self):
+        return self.transcoder.sequence
+
+    @property
+    def first_frame(self) -> int:
+        return self.transcoder.first_frame
+
+    @property
+    def last_frame(self) -> int:
+        return self.transcoder.last_frame
+
+    @property
+    def audio_path(self) -> Path:
+        return self.transcoder.audio_path
+
+    @property
+    def threads(self) -> int:
+        return self.transcoder.threads
+
+    @property
+    def output_path(self) -> Path:
+        """Returns the path of the output, in the proxy folder next to the frames"""
+        name = self.transcoder.output_path.stem + self.suffix
+        return Path(self.sequence.directory).joinpath(PROXY_FOLDER, name)
+
+    @property
+    def input_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments reading the inputs, the same as the converters"""
+        return self.transcoder.input_arguments
+
+    @property
+    @abstractmethod
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments writing the output, without the output path"""
+
+    @property
+    def ffmpeg_command(self) -> List[str]:
+        """returns the ffmpeg command to run"""
+        command = [get_ffmpeg_path().as_posix(), "-y"]
+        command += self.input_arguments
+        command += self.output_arguments
+        command += [self.output_path.as_posix()]
+        return command
+
+    def transcode(self, force: bool = False, fingerprint: str = None) -> Path:
+        """
+        Writes the output, unless it is up to date
+        The fingerprint of the encode may be given when it was already computed
+        """
+        encode_output(self, force, fingerprint)
+        return self.output_path
+
+
+class ProxyMovie(ReviewOutput):
+    """
+    A low resolution h264 movie of an image sequence
+    """
+    suffix = "_proxy.mp4"
+
+    @property
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments encoding the proxy, without the output path"""
+        command = []
+        command += ["-frames:v", self.last_frame - self.first_frame + 1]
+        command += ["-r", self.transcoder.settings["fps"]]
+        command += ["-map", "0:v:0"]
+        # Smaller frames are not enlarged, width and height are even as needed by yuv420p
+        command += ["-vf", f"scale='2*trunc(min({PROXY_WIDTH},iw)/2)':-2"]
+        command += ["-vcodec", "libx264", "-preset", "veryfast", "-crf", PROXY_CRF]
+        command += ["-pix_fmt", "yuv420p"]
+        if self.audio_path:
+            command += ["-map", "1:a:0", "-acodec", "aac"]
+        command += ["-movflags", "+faststart"]
+        if self.threads:
+            command += ["-threads", self.threads]
+        return [str(part) for part in command]
+
+
+class ContactSheet(ReviewOutput):
+    """
+    A single image tiling one frame every CONTACT_SHEET_STEP frames of an image sequence
+    """
+    suffix = "_contact_sheet.jpg"
+
+    @property
+    def output_arguments(self) -> List[str]:
+        """returns the ffmpeg arguments writing the contact sheet, without the output path"""
+        frame_count = self.last_frame - self.first_frame + 1
+        tile_count = math.ceil(frame_count / CONTACT_SHEET_STEP)
+        columns = min(CONTACT_SHEET_COLUMNS, tile_count)
+        rows = math.ceil(tile_count / columns)
+        filters = [
+            f"select='not(mod(n\\,{CONTACT_SHEET_STEP}))'",
+            f"scale={CONTACT_SHEET_TILE_WIDTH}:-2",
+            f"tile={columns}x{rows}",
+        ]
+        command = []
+        command += ["-map", "0:v:0"]
+        command += ["-vf", ",".join(filters)]
+        command += ["-frames:v", "1"]
+        command += ["-q:v", "3"]  # Jpeg quality, from 2 (best) to 31
+        if self.threads:
+            command += ["-threads", self.threads]
+        return [str(part) for part in command]
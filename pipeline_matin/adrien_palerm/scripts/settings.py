@@ -1,18 +1,203 @@
+"""
+This module reads the settings of the pipeline, layered from the lowest to the highest
+priority :
+  - project : settings.json at the root of the pipeline
+  - machine : settings of the workstation, in PROGRAMDATA/pipeline/settings.json
+    (or the file given by the PIPELINE_MACHINE_SETTINGS environment variable)
+  - user : settings of the user, in ~/.pipeline/settings.json
+    (or the file given by the PIPELINE_USER_SETTINGS environment variable)
+  - environment : PIPELINE_<SETTING> variables, for instance PIPELINE_PROJECT_ROOT or
+    PIPELINE_FPS=30, overriding settings of the other layers only : values are converted
+    to the type of the setting they replace, other variables are ignored with a warning
+
+The merged settings are built once per process and shared as a read-only mapping.
+At most every CHECK_INTERVAL seconds, the files are checked with a stat and read again
+only if one of them changed, so get_settings can be called from any hot path.
+
+    python settings.py   (prints every setting and the layer it comes from)
+"""
+
 import os
+import json
+import time
+import logging
+import threading
+from types import MappingProxyType
 from pipeline import get_pipeline_root
 from json_files import file_to_dict
 
+# Prefix of the environment variables overriding settings
+ENVIRONMENT_PREFIX = "PIPELINE_"
+
+# Environment variables giving the path of the machine and user settings
+MACHINE_SETTINGS_VARIABLE = "PIPELINE_MACHINE_SETTINGS"
+USER_SETTINGS_VARIABLE = "PIPELINE_USER_SETTINGS"
+
+# Minimum number of seconds between two checks of the settings files
+CHECK_INTERVAL = 1.0
+
+# Snapshot of the settings, with what it was built from
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+class SettingsSnapshot():
+    """
+    The merged settings, the signature of the layers they were built from,
+    and the layer each setting comes from
+    """
+    __slots__ = ("settings", "sources", "signature", "checked_at")
+
+    def __init__(self, settings, sources, signature, checked_at):
+        self.settings = settings
+        self.sources = sources
+        self.signature = signature
+        self.checked_at = checked_at
+
+
+def get_layer_paths():
+    """
+    Returns the settings files of each layer, from the lowest to the highest priority
+    """
+    machine_folder = os.environ.get("PROGRAMDATA", "/etc")
+    return [
+        ("project", os.path.join(get_pipeline_root(), "settings.json")),
+        ("machine", os.environ.get(MACHINE_SETTINGS_VARIABLE) or os.path.join(machine_folder, "pipeline", "settings.json")),
+        ("user", os.environ.get(USER_SETTINGS_VARIABLE) or os.path.join(os.path.expanduser("~"), ".pipeline", "settings.json")),
+    ]
+
+
+def get_environment_overrides():
+    """
+    Returns the text of the PIPELINE_<SETTING> environment variables, by setting name
+    Variable names are compared in upper case, as on Windows
+    """
+    overrides = {}
+    for name, value in os.environ.items():
+        name = name.upper()
+        if not name.startswith(ENVIRONMENT_PREFIX) or name in (MACHINE_SETTINGS_VARIABLE, USER_SETTINGS_VARIABLE):
+            continue
+        overrides[name[len(ENVIRONMENT_PREFIX):].lower()] = value
+    return overrides
+
+
+def convert_override(text, current):
+    """
+    Returns the text of an environment variable converted to the type of the setting it
+    overrides, for instance "25" or "25.0" for an integer setting give 25
+    Raises ValueError if the text can't be converted
+    """
+    if isinstance(current, str):
+        return text
+    if isinstance(current, bool):
+        if text.strip().lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"{text!r} is not a boolean")
+        return text.strip().lower() in ("true", "1")
+    if isinstance(current, int):
+        number = float(text)
+        if not number.is_integer():
+            raise ValueError(f"{text!r} is not an integer")
+        return int(number)
+    if isinstance(current, float):
+        return float(text)
+    # Lists, dictionaries and settings without value are given as json
+    value = json.loads(text)
+    if current is not None and type(value) is not type(current):
+        raise ValueError(f"{text!r} is not a {type(current).__name__}")
+    return value
+
+
+def _get_signature(layer_paths, overrides):
+    """Returns what the settings are built from : modification time and size of each file, and the overrides"""
+    signature = []
+    for _, path in layer_paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return (tuple(signature), json.dumps(overrides, sort_keys=True))
+
+
+def _build_snapshot(layer_paths, overrides, signature, now):
+    """Reads every layer and merges them"""
+    settings = {}
+    sources = {}
+    for layer, path in layer_paths:
+        if layer == "project":
+            values = file_to_dict(path)  # The project settings are required
+        elif not os.path.exists(path):
+            continue
+        else:
+            try:
+                values = file_to_dict(path)
+            except (OSError, ValueError) as error:
+                logging.warning("The %s settings %s are ignored : %s", layer, path, error)
+                continue
+        settings.update(values)
+        sources.update(dict.fromkeys(values, layer))
+    for key, text in overrides.items():
+        if key not in settings:
+            logging.warning("%s%s is ignored : there is no %s setting", ENVIRONMENT_PREFIX, key.upper(), key)
+            continue
+        try:
+            settings[key] = convert_override(text, settings[key])
+        except ValueError as error:
+            logging.warning("%s%s is ignored : %s", ENVIRONMENT_PREFIX, key.upper(), error)
+            continue
+        sources[key] = "environment"
+    return SettingsSnapshot(MappingProxyType(settings), MappingProxyType(sources), signature, now)
+
+
+def _get_snapshot():
+    """
+    Returns the current snapshot, built again when a layer changed
+    """
+    global _snapshot
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and now - snapshot.checked_at < CHECK_INTERVAL:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is not None and now - snapshot.checked_at < CHECK_INTERVAL:
+            return snapshot
+        layer_paths = get_layer_paths()
+        overrides = get_environment_overrides()
+        signature = _get_signature(layer_paths, overrides)
+        if snapshot is not None and snapshot.signature == signature:
+            snapshot.checked_at = now
+        else:
+            snapshot = _snapshot = _build_snapshot(layer_paths, overrides, signature, now)
+        return snapshot
+
+
 def get_settings():
     """
-    Returns project settings contained in the settings.json file as a dictionary
+    Returns the settings of the pipeline as a read-only mapping
+    Use dict(get_settings()) to get a modifiable copy
+    """
+    return _get_snapshot().settings
+
+
+def get_setting_sources():
+    """
+    Returns the layer each setting comes from : project, machine, user or environment
+    """
+    return _get_snapshot().sources
+
+
+def invalidate():
+    """
+    Forgets the current settings, they are read again by the next call
     """
-    # Get file path
-    root_dir = get_pipeline_root()
-    json_file = os.path.join(root_dir, "settings.json")
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
 
-    # Convert to dictionary
-    settings = file_to_dict(json_file)
-    return settings
 
 if __name__ == "__main__":
-    print(get_settings())
\ No newline at end of file
+    sources = get_setting_sources()
+    for key, value in get_settings().items():
+        print(f"{key} = {value!r} ({sources[key]})")
@@ -0,0 +1,26 @@
+"""
+This module shares the connections to the SQLite files of the pipeline (document store,
+publish registry, ffprobe cache).
+
+SQLite connections can't be shared between threads, so each thread keeps its own
+connection to each file, opened the first time the thread uses it.
+"""
+
+import threading
+
+# Connections of each thread : path -> connection
+_local = threading.local()
+
+
+def get_thread_connection(path, connect):
+    """
+    Returns the connection of the current thread to the SQLite file, opened with
+    connect(path) the first time
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        connection = connections[path] = connect(path)
+    return connection
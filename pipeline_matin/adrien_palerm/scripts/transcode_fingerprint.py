@@ -0,0 +1,145 @@
+"""
+This module decides whether an output of the converters needs to be encoded again.
+
+A fingerprint of everything an encode depends on (the input frames or video with
+their sizes and modification times, the audio file, and the ffmpeg command) is
+stored next to each output, in "<output>.fingerprint".
+When the fingerprint of a new run matches the stored one, the output is up to date.
+
+The converters encode their output with encode_output, which skips the outputs that
+are up to date.
+"""
+
+import os
+import json
+import logging
+import hashlib
+from pathlib import Path
+from typing import List
+
+# Import pipeline modules
+from preflight import check_transcoder
+from ffmpeg_progress import run_ffmpeg
+
+# Extension of the files storing the fingerprints, added after the output extension
+FINGERPRINT_SUFFIX = ".fingerprint"
+
+# ffmpeg options that don't change the encoded result : (option, number of values)
+IGNORED_OPTIONS = {"-threads": 1, "-y": 0}
+
+
+def get_input_files(transcoder) -> List[str]:
+    """Returns the paths of the files read by the transcoder"""
+    input_paths = getattr(transcoder, "input_paths", None)
+    if input_paths is not None:
+        return [Path(path).as_posix() for path in input_paths]
+    sequence = getattr(transcoder, "sequence", None)
+    if sequence is not None:
+        # Only the frame range encoded by the transcoder, which may be a part of the sequence
+        first_frame = getattr(transcoder, "first_frame", sequence.first_frame)
+        last_frame = getattr(transcoder, "last_frame", sequence.last_frame)
+        return [sequence.frame_path(frame) for frame in sequence.frames if first_frame <= frame <= last_frame]
+    return [Path(transcoder.input_path).as_posix()]
+
+
+def describe_file(path) -> list:
+    """Returns the path, size and modification time of a file, or only its path if it is missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return [str(path)]
+    return [str(path), stat.st_size, stat.st_mtime_ns]
+
+
+def get_encoding_arguments(command: List[str]) -> List[str]:
+    """Returns the ffmpeg command without the options that don't change the result"""
+    arguments = []
+    skip = 0
+    for argument in command:
+        if skip:
+            skip -= 1
+        elif argument in IGNORED_OPTIONS:
+            skip = IGNORED_OPTIONS[argument]
+        else:
+            arguments.append(argument)
+    return arguments
+
+
+def compute_fingerprint(transcoder) -> str:
+    """Returns the fingerprint of the encode the transcoder would run"""
+    audio_path = getattr(transcoder, "audio_path", None)
+    description = {
+        "inputs": [describe_file(path) for path in get_input_files(transcoder)],
+        "audio": describe_file(audio_path) if audio_path else None,
+        "command": get_encoding_arguments(transcoder.ffmpeg_command),
+    }
+    content = json.dumps(description, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_fingerprint_path(output_path) -> Path:
+    """Returns the path of the file storing the fingerprint of an output"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + FINGERPRINT_SUFFIX)
+
+
+def read_fingerprint(output_path) -> str:
+    """Returns the stored fingerprint of an output, or None"""
+    try:
+        return get_fingerprint_path(output_path).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_fingerprint(output_path, fingerprint: str) -> None:
+    """Stores the fingerprint of an output that was just encoded"""
+    get_fingerprint_path(output_path).write_text(fingerprint)
+
+
+def remove_fingerprint(output_path) -> None:
+    """Removes the stored fingerprint of an output, before it is encoded again"""
+    try:
+        os.remove(get_fingerprint_path(output_path))
+    except FileNotFoundError:
+        pass
+
+
+def is_up_to_date(transcoder, fingerprint: str = None) -> bool:
+    """
+    Returns True if the output of the transcoder exists and was encoded
+    from the same inputs with the same command
+    """
+    if not Path(transcoder.output_path).exists():
+        return False
+    fingerprint = fingerprint or compute_fingerprint(transcoder)
+    return read_fingerprint(transcoder.output_path) == fingerprint
+
+
+def encode_output(transcoder, force: bool = False, fingerprint: str = None, preflight: bool = True) -> bool:
+    """
+    Runs the ffmpeg command of a transcoder, unless its output is up to date or force is True
+    The fingerprint of the encode may be given when it was already computed
+    The frames of image sequences are checked first, unless preflight is False : the existing
+    output is kept if they are broken, and replaced only once the encode succeeded
+    Returns True if the output was encoded
+    """
+    fingerprint = fingerprint or compute_fingerprint(transcoder)
+    output_path = Path(transcoder.output_path)
+    if not force and is_up_to_date(transcoder, fingerprint):
+        logging.info("Output is up to date : %s", output_path)
+        return False
+
+    total_frames = None
+    if getattr(transcoder, "sequence", None) is not None:
+        total_frames = transcoder.last_frame - transcoder.first_frame + 1
+        # Check the frames before starting a long encode
+        if preflight:
+            check_transcoder(transcoder)
+
+    output_path.parent.mkdir(exist_ok=True, parents=True)
+    remove_fingerprint(output_path)
+    command = transcoder.ffmpeg_command
+    logging.info("Executing command : \n%s", command)
+    run_ffmpeg(command, total_frames=total_frames, outputs=[output_path])
+    write_fingerprint(output_path, fingerprint)
+    return True
@@ -0,0 +1,69 @@
+"""
+This module finds and reserves the next version of a versioned folder,
+such as "apple_V03" next to "apple", "apple_V01" and "apple_V02".
+
+The parent folder is listed only once, and versions are compared as numbers,
+so "apple_V10" comes after "apple_V09".
+A version is reserved by creating its folder : creating a folder either
+succeeds or fails if it already exists, so two people asking for a new version
+at the same time always get different ones.
+"""
+
+import os
+import re
+
+# Versions are written with at least two digits : apple_V01, apple_V02, ..., apple_V10
+VERSION_FORMAT = "{name}_V{version:02d}"
+
+# Number of times we try the next version when someone else reserved it first
+MAX_ATTEMPTS = 100
+
+
+def format_version(name, version):
+    """
+    Returns the name of the provided version, for instance "apple_V03"
+    """
+    return VERSION_FORMAT.format(name=name, version=version)
+
+
+def get_versions(parent_folder, name):
+    """
+    Returns the sorted list of the existing versions of name in the parent folder
+    """
+    regex = re.compile(re.escape(name) + r"_V(\d+)$", re.IGNORECASE)
+    versions = []
+    try:
+        with os.scandir(parent_folder) as entries:
+            for entry in entries:
+                match = regex.match(entry.name)
+                if match:
+                    versions.append(int(match.group(1)))
+    except FileNotFoundError:
+        pass
+    return sorted(versions)
+
+
+def get_next_version(parent_folder, name):
+    """
+    Returns the number of the version following the last existing one
+    """
+    versions = get_versions(parent_folder, name)
+    return versions[-1] + 1 if versions else 1
+
+
+def reserve_version(parent_folder, name):
+    """
+    Creates the folder of the next version of name in the parent folder
+    Returns the version number and the path of the created folder
+    """
+    os.makedirs(parent_folder, exist_ok=True)
+    version = get_next_version(parent_folder, name)
+    for _ in range(MAX_ATTEMPTS):
+        folder = os.path.join(parent_folder, format_version(name, version)).replace("\\", "/")
+        try:
+            os.mkdir(folder)
+            return version, folder
+        except FileExistsError:
+            # Someone else reserved this version in the meantime
+            version += 1
+    raise RuntimeError(f"Couldn't reserve a new version of {name} in {parent_folder}")
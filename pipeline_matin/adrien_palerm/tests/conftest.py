@@ -0,0 +1,11 @@
+"""
+The pipeline scripts import each other by name, the scripts folder is added to the paths
+python can use, as the scripts do themselves
+"""
+
+import sys
+import os
+
+scripts_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+if scripts_directory not in sys.path:
+    sys.path.insert(0, scripts_directory)
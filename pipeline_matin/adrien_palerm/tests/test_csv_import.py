@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from csv_import import get_content_hash, import_csv, read_hashes
+
+
+def write_csv(path, rows, header="shot,sequence"):
+    path.write_text("\n".join([header] + rows) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def database(tmp_path):
+    folder = tmp_path / "database"
+    folder.mkdir()
+    return folder
+
+
+def test_first_import_adds_every_row(tmp_path, database):
+    csv_path = write_csv(tmp_path / "shots.csv", ["sh0010,sq0010", "sh0020,sq0010"])
+    summary = import_csv(csv_path, "shots", database_folder=str(database))
+    assert sorted(summary.added) == ["sh0010", "sh0020"]
+    assert json.loads((database / "shots" / "sh0010.json").read_text()) == {"shot": "sh0010", "sequence": "sq0010"}
+    hashes, outdated = read_hashes(str(database), "shots")
+    assert sorted(hashes) == ["sh0010", "sh0020"]
+    assert not outdated
+
+
+def test_only_changed_rows_are_written(tmp_path, database):
+    csv_path = write_csv(tmp_path / "shots.csv", ["sh0010,sq0010", "sh0020,sq0010"])
+    import_csv(csv_path, "shots", database_folder=str(database))
+    unchanged_stat = os.stat(database / "shots" / "sh0010.json")
+
+    write_csv(tmp_path / "shots.csv", ["sh0010,sq0010", "sh0020,sq0020", "sh0030,sq0020"])
+    summary = import_csv(csv_path, "shots", database_folder=str(database))
+    assert summary.unchanged == ["sh0010"]
+    assert summary.changed == ["sh0020"]
+    assert summary.added == ["sh0030"]
+    assert os.stat(database / "shots" / "sh0010.json").st_mtime_ns == unchanged_stat.st_mtime_ns
+    assert json.loads((database / "shots" / "sh0020.json").read_text())["sequence"] == "sq0020"
+
+
+def test_removed_rows_are_removed_only_when_asked(tmp_path, database):
+    csv_path = write_csv(tmp_path / "shots.csv", ["sh0010,sq0010", "sh0020,sq0010"])
+    import_csv(csv_path, "shots", database_folder=str(database))
+
+    write_csv(tmp_path / "shots.csv", ["sh0010,sq0010"])
+    summary = import_csv(csv_path, "shots", database_folder=str(database))
+    assert summary.removed == []
+    assert (database / "shots" / "sh0020.json").exists()
+
+    summary = import_csv(csv_path, "shots", remove_missing=True, database_folder=str(database))
+    assert summary.removed == ["sh0020"]
+    assert not (database / "shots" / "sh0020.json").exists()
+    assert sorted(read_hashes(str(database), "shots")[0]) == ["sh0010"]
+
+
+def test_nothing_is_removed_when_rows_are_invalid(tmp_path, database):
+    csv_path = write_csv(tmp_path / "shots.csv", ["sh0010,sq0010", "sh0020,sq0010"])
+    import_csv(csv_path, "shots", database_folder=str(database))
+
+    write_csv(tmp_path / "shots.csv", ["sh0010,sq0010", ",sq0010", "sh0010,sq0020"])
+    summary = import_csv(csv_path, "shots", remove_missing=True, database_folder=str(database))
+    assert [line_number for line_number, _, _ in summary.errors] == [3, 4]
+    assert summary.removed == []
+    assert (database / "shots" / "sh0020.json").exists()
+
+
+def test_document_edited_by_hand_is_written_again(tmp_path, database):
+    csv_path = write_csv(tmp_path / "shots.csv", ["sh0010,sq0010"])
+    import_csv(csv_path, "shots", database_folder=str(database))
+
+    # The stored hash doesn't match the file anymore, it must not be trusted
+    document_path = database / "shots" / "sh0010.json"
+    document_path.write_text(json.dumps({"shot": "sh0010", "sequence": "sq9999"}, indent=4))
+    stat = os.stat(document_path)
+    os.utime(document_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    hashes, outdated = read_hashes(str(database), "shots")
+    assert outdated
+    assert hashes["sh0010"][2] == get_content_hash(document_path.read_text())
+
+    summary = import_csv(csv_path, "shots", database_folder=str(database))
+    assert summary.changed == ["sh0010"]
+    assert json.loads(document_path.read_text())["sequence"] == "sq0010"
+    assert not read_hashes(str(database), "shots")[1]
+
+
+def test_document_edited_back_by_hand_is_unchanged(tmp_path, database):
+    csv_path = write_csv(tmp_path / "shots.csv", ["sh0010,sq0010"])
+    import_csv(csv_path, "shots", database_folder=str(database))
+
+    # Rewritten with the same content : hashed again, and found unchanged
+    document_path = database / "shots" / "sh0010.json"
+    content = document_path.read_text()
+    document_path.write_text(content)
+    stat = os.stat(document_path)
+    os.utime(document_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    summary = import_csv(csv_path, "shots", database_folder=str(database))
+    assert summary.unchanged == ["sh0010"]
+    assert not read_hashes(str(database), "shots")[1]
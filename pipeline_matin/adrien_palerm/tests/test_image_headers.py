@@ -0,0 +1,125 @@
+import struct
+import zlib
+
+import pytest
+
+from image_headers import ImageHeaderError, read_header, try_read_header
+
+
+def write_png(path, width, height, color_type):
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    chunk = struct.pack(">I", len(header)) + b"IHDR" + header + struct.pack(">I", zlib.crc32(b"IHDR" + header))
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk + struct.pack(">I", 0) + b"IEND" + struct.pack(">I", zlib.crc32(b"IEND")))
+
+
+def write_tiff(path, width, height, samples, bits_offset=None):
+    """Writes the first directory of a little endian TIFF file, the bits per sample are stored after it"""
+    entries = [(256, 3, 1, width), (257, 3, 1, height), (277, 3, 1, samples)]
+    directory_size = 2 + 12 * (len(entries) + 1) + 4
+    bits_offset = 8 + directory_size if bits_offset is None else bits_offset
+    entries.append((258, 3, samples, bits_offset))
+    data = b"II*\x00" + struct.pack("<I", 8) + struct.pack("<H", len(entries))
+    for tag, value_type, count, value in sorted(entries):
+        packed = struct.pack("<I", value) if tag == 258 else struct.pack("<HH", value, 0)
+        data += struct.pack("<HHI", tag, value_type, count) + packed
+    data += struct.pack("<I", 0)
+    data += struct.pack("<H", 16) * samples
+    path.write_bytes(data)
+
+
+def exr_attribute(name, attribute_type, value):
+    return name + b"\x00" + attribute_type + b"\x00" + struct.pack("<i", len(value)) + value
+
+
+def write_exr(path, channels, width, height, chlist=None):
+    if chlist is None:
+        chlist = b"".join(name.encode() + b"\x00" + struct.pack("<iB3xii", 1, 0, 1, 1) for name in sorted(channels)) + b"\x00"
+    data = b"\x76\x2f\x31\x01" + struct.pack("<I", 2)
+    data += exr_attribute(b"channels", b"chlist", chlist)
+    data += exr_attribute(b"dataWindow", b"box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1))
+    data += b"\x00"
+    path.write_bytes(data)
+
+
+def test_png_header(tmp_path):
+    path = tmp_path / "frame.0001.png"
+    write_png(path, 1920, 1080, 6)
+    header = read_header(path)
+    assert header.resolution == (1920, 1080)
+    assert header.has_alpha
+
+
+def test_tga_header(tmp_path):
+    path = tmp_path / "frame.0001.tga"
+    path.write_bytes(bytes([0, 0, 2]) + bytes(9) + struct.pack("<HHBB", 64, 32, 24, 0))
+    header = read_header(path)
+    assert header.resolution == (64, 32)
+    assert not header.has_alpha
+
+
+def test_tiff_header(tmp_path):
+    path = tmp_path / "frame.0001.tif"
+    write_tiff(path, 640, 480, 4)
+    header = read_header(path)
+    assert header.resolution == (640, 480)
+    assert header.channels == ["R", "G", "B", "A"]
+    assert header.bit_depth == 16
+
+
+def test_exr_header(tmp_path):
+    path = tmp_path / "frame.0001.exr"
+    write_exr(path, ["R", "G", "B"], 2048, 858)
+    header = read_header(path)
+    assert header.resolution == (2048, 858)
+    assert header.channels == ["B", "G", "R"]
+    assert header.bit_depth == "half"
+
+
+def test_unsupported_format(tmp_path):
+    path = tmp_path / "frame.0001.jpg"
+    path.write_bytes(b"\xff\xd8")
+    assert read_header(path) is None
+
+
+def test_truncated_png(tmp_path):
+    path = tmp_path / "frame.0001.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n")
+    with pytest.raises(ImageHeaderError):
+        read_header(path)
+
+
+def test_tiff_bits_per_sample_past_the_end(tmp_path):
+    path = tmp_path / "frame.0001.tif"
+    write_tiff(path, 640, 480, 3, bits_offset=100000)
+    with pytest.raises(ImageHeaderError):
+        read_header(path)
+
+
+def test_tiff_directory_past_the_end(tmp_path):
+    path = tmp_path / "frame.0001.tif"
+    path.write_bytes(b"II*\x00" + struct.pack("<I", 100000))
+    with pytest.raises(ImageHeaderError):
+        read_header(path)
+
+
+def test_exr_unterminated_channel_list(tmp_path):
+    path = tmp_path / "frame.0001.exr"
+    write_exr(path, None, 16, 16, chlist=b"R")
+    with pytest.raises(ImageHeaderError):
+        read_header(path)
+
+
+def test_exr_short_data_window(tmp_path):
+    path = tmp_path / "frame.0001.exr"
+    data = b"\x76\x2f\x31\x01" + struct.pack("<I", 2)
+    data += exr_attribute(b"channels", b"chlist", b"R\x00" + struct.pack("<iB3xii", 1, 0, 1, 1) + b"\x00")
+    data += exr_attribute(b"dataWindow", b"box2i", b"\x00" * 8)
+    path.write_bytes(data + b"\x00")
+    with pytest.raises(ImageHeaderError):
+        read_header(path)
+
+
+def test_try_read_header_falls_back_to_none(tmp_path):
+    path = tmp_path / "frame.0001.exr"
+    write_exr(path, None, 16, 16, chlist=b"R")
+    assert try_read_header(path) is None
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from image_sequences import FRAME_REGEX, find_sequence, get_sequences, scan_directory
+
+
+def make_frames(folder, names):
+    for name in names:
+        (folder / name).write_bytes(b"")
+
+
+@pytest.mark.parametrize("name, groups", [
+    ("shot.0001.exr", ("shot", ".", "0001", "exr")),
+    ("shot_0001.png", ("shot", "_", "0001", "png")),
+    ("shot.v02.1001.exr", ("shot.v02", ".", "1001", "exr")),
+    ("shot_v02_10000.EXR", ("shot_v02", "_", "10000", "EXR")),
+])
+def test_frame_names(name, groups):
+    match = FRAME_REGEX.match(name)
+    assert match is not None
+    assert match.group("stem", "separator", "frame_number", "extension") == groups
+
+
+@pytest.mark.parametrize("name", ["shot.exr", "shot0001.exr", ".0001.exr", "shot.0001", "shot.0001.tar.gz", "shot.00a1.exr"])
+def test_names_that_are_not_frames(name):
+    assert FRAME_REGEX.match(name) is None
+
+
+def test_frames_are_grouped_by_sequence(tmp_path):
+    make_frames(tmp_path, ["shot.0001.exr", "shot.0002.exr", "shot.0004.exr", "shot_0001.exr", "shot.0003.png", "notes.txt"])
+    (tmp_path / "folder.0001.exr").mkdir()
+    sequences = scan_directory(tmp_path)
+    assert sorted(sequences) == [("shot", ".", "exr"), ("shot", ".", "png"), ("shot", "_", "exr")]
+
+    sequence = sequences[("shot", ".", "exr")]
+    assert sequence.frames == [1, 2, 4]
+    assert sequence.missing_frames == [3]
+    assert sequence.pattern == tmp_path.as_posix() + "/shot.%04d.exr"
+    assert sequence.frame_paths()[-1] == tmp_path.as_posix() + "/shot.0004.exr"
+
+
+def test_padding_is_the_smallest_number_of_digits(tmp_path):
+    make_frames(tmp_path, ["shot.9999.exr", "shot.10000.exr"])
+    sequence, = get_sequences(tmp_path)
+    assert sequence.padding == 4
+    assert (sequence.first_frame, sequence.last_frame, sequence.frame_count) == (9999, 10000, 2)
+
+
+def test_extensions_are_compared_case_insensitively(tmp_path):
+    make_frames(tmp_path, ["shot.0001.EXR", "shot.0002.exr"])
+    sequence = find_sequence(tmp_path / "shot.0002.exr")
+    assert sequence.frames == [1, 2]
+
+
+def test_scan_is_cached_until_the_folder_changes(tmp_path):
+    make_frames(tmp_path, ["shot.0001.exr"])
+    first = scan_directory(tmp_path)
+    assert scan_directory(tmp_path) is first
+
+    make_frames(tmp_path, ["shot.0002.exr"])
+    # Make sure the modification time changes on file systems with a coarse resolution
+    stat = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert find_sequence(tmp_path / "shot.0001.exr").frames == [1, 2]
+
+
+def test_find_sequence_errors(tmp_path):
+    make_frames(tmp_path, ["shot.0001.exr"])
+    with pytest.raises(Exception, match="did not match"):
+        find_sequence(tmp_path / "shot.exr")
+    with pytest.raises(FileNotFoundError):
+        find_sequence(tmp_path / "other.0001.exr")
@@ -0,0 +1,53 @@
+import struct
+import zlib
+
+import preflight
+from image_sequences import find_sequence
+
+
+def write_png(path, width=64, height=32):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(header)) + b"IHDR" + header + struct.pack(">I", zlib.crc32(b"IHDR" + header))
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk + struct.pack(">I", 0) + b"IEND" + struct.pack(">I", zlib.crc32(b"IEND")))
+
+
+def make_sequence(directory, frames):
+    for frame in frames:
+        write_png(directory / f"shot.{frame:04d}.png")
+    return find_sequence(directory / f"shot.{frames[0]:04d}.png")
+
+
+def test_complete_sequence(tmp_path):
+    report = preflight.run_preflight(make_sequence(tmp_path, range(1, 6)))
+    assert report.ok
+    assert report.frame_count == 5
+    assert report.resolution == (64, 32)
+
+
+def test_missing_and_empty_frames(tmp_path):
+    make_sequence(tmp_path, [1, 2, 4, 5])
+    (tmp_path / "shot.0002.png").write_bytes(b"")
+    report = preflight.run_preflight(find_sequence(tmp_path / "shot.0001.png"))
+    assert not report.ok
+    assert [(issue.frame, issue.kind) for issue in report.issues] == [(2, "empty"), (3, "missing")]
+
+
+def test_corrupt_header_is_reported(tmp_path):
+    sequence = make_sequence(tmp_path, range(1, 6))
+    (tmp_path / "shot.0003.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    report = preflight.run_preflight(sequence)
+    assert [(issue.frame, issue.kind) for issue in report.errors] == [(3, "header")]
+
+
+def test_parse_errors_are_reported(tmp_path, monkeypatch):
+    sequence = make_sequence(tmp_path, range(1, 6))
+    read_header = preflight.read_header
+
+    def failing_read_header(path):
+        if str(path).endswith("0004.png"):
+            raise struct.error("unpack requires a buffer of 4 bytes")
+        return read_header(path)
+
+    monkeypatch.setattr(preflight, "read_header", failing_read_header)
+    report = preflight.run_preflight(sequence)
+    assert [(issue.frame, issue.kind) for issue in report.errors] == [(4, "header")]
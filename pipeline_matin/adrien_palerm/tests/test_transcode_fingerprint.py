@@ -0,0 +1,100 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import transcode_fingerprint
+from transcode_fingerprint import compute_fingerprint, encode_output, is_up_to_date, read_fingerprint
+
+
+class FakeTranscoder():
+    """A transcoder converting a video, without running ffmpeg"""
+    def __init__(self, input_path, output_path, arguments=("-vcodec", "libx264")):
+        self.input_path = Path(input_path)
+        self.output_path = Path(output_path)
+        self.arguments = list(arguments)
+
+    @property
+    def ffmpeg_command(self):
+        return ["ffmpeg", "-y", "-i", self.input_path.as_posix()] + self.arguments + [self.output_path.as_posix()]
+
+
+@pytest.fixture
+def encodes(monkeypatch):
+    """Replaces ffmpeg by a function writing the outputs, returns the commands it ran"""
+    commands = []
+
+    def run_ffmpeg(command, total_frames=None, outputs=None):
+        commands.append(command)
+        for output_path in outputs:
+            Path(output_path).write_bytes(b"encoded")
+
+    monkeypatch.setattr(transcode_fingerprint, "run_ffmpeg", run_ffmpeg)
+    return commands
+
+
+@pytest.fixture
+def transcoder(tmp_path):
+    input_path = tmp_path / "input.mov"
+    input_path.write_bytes(b"frames")
+    return FakeTranscoder(input_path, tmp_path / "mp4" / "input.mp4")
+
+
+def test_fingerprint_ignores_threads(transcoder):
+    fingerprint = compute_fingerprint(transcoder)
+    transcoder.arguments += ["-threads", "4"]
+    assert compute_fingerprint(transcoder) == fingerprint
+    transcoder.arguments += ["-crf", "18"]
+    assert compute_fingerprint(transcoder) != fingerprint
+
+
+def test_fingerprint_follows_the_input(transcoder):
+    fingerprint = compute_fingerprint(transcoder)
+    transcoder.input_path.write_bytes(b"frames rendered again")
+    assert compute_fingerprint(transcoder) != fingerprint
+
+
+def test_up_to_date_output_is_skipped(transcoder, encodes):
+    assert encode_output(transcoder)
+    assert read_fingerprint(transcoder.output_path) == compute_fingerprint(transcoder)
+    assert is_up_to_date(transcoder)
+    assert not encode_output(transcoder)
+    assert len(encodes) == 1
+
+
+def test_forced_encode(transcoder, encodes):
+    encode_output(transcoder)
+    assert encode_output(transcoder, force=True)
+    assert len(encodes) == 2
+
+
+def test_changed_input_is_encoded_again(transcoder, encodes):
+    encode_output(transcoder)
+    stat = os.stat(transcoder.input_path)
+    os.utime(transcoder.input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert encode_output(transcoder)
+    assert len(encodes) == 2
+
+
+def test_missing_output_is_encoded_again(transcoder, encodes):
+    encode_output(transcoder)
+    os.remove(transcoder.output_path)
+    assert encode_output(transcoder)
+    assert len(encodes) == 2
+
+
+def test_failed_encode_is_not_up_to_date(transcoder, encodes, monkeypatch):
+    encode_output(transcoder)
+    transcoder.arguments += ["-crf", "18"]
+
+    def failing_run_ffmpeg(command, total_frames=None, outputs=None):
+        raise subprocess.CalledProcessError(1, command)
+
+    monkeypatch.setattr(transcode_fingerprint, "run_ffmpeg", failing_run_ffmpeg)
+    with pytest.raises(subprocess.CalledProcessError):
+        encode_output(transcoder)
+    # The previous output is kept, without a fingerprint telling it matches the new command
+    assert transcoder.output_path.exists()
+    assert read_fingerprint(transcoder.output_path) is None
+    assert not is_up_to_date(transcoder)
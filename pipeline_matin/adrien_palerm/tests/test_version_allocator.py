@@ -0,0 +1,63 @@
+import os
+import threading
+
+import pytest
+
+import version_allocator
+from version_allocator import format_version, get_next_version, get_versions, reserve_version
+
+
+def test_versions_are_compared_as_numbers(tmp_path):
+    for name in ("apple_V09", "apple_V10", "apple_V02", "apple", "apple_V03_old", "pear_V11"):
+        (tmp_path / name).mkdir()
+    assert get_versions(tmp_path, "apple") == [2, 9, 10]
+    assert get_next_version(tmp_path, "apple") == 11
+
+
+def test_missing_parent_folder_starts_at_one(tmp_path):
+    assert get_versions(tmp_path / "missing", "apple") == []
+    assert get_next_version(tmp_path / "missing", "apple") == 1
+
+
+def test_reserve_creates_the_next_version(tmp_path):
+    parent_folder = tmp_path / "assets"
+    assert reserve_version(parent_folder, "apple") == (1, (parent_folder / "apple_V01").as_posix())
+    version, folder = reserve_version(parent_folder, "apple")
+    assert version == 2
+    assert os.path.isdir(folder)
+    assert format_version("apple", 2) == "apple_V02"
+
+
+def test_reserve_skips_a_version_taken_in_the_meantime(tmp_path, monkeypatch):
+    # Someone else created V01 and V02 after the folder was listed
+    monkeypatch.setattr(version_allocator, "get_next_version", lambda parent_folder, name: 1)
+    (tmp_path / "apple_V01").mkdir()
+    (tmp_path / "apple_V02").mkdir()
+    assert reserve_version(tmp_path, "apple")[0] == 3
+
+
+def test_reserve_gives_up_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(version_allocator, "MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(version_allocator, "get_next_version", lambda parent_folder, name: 1)
+    (tmp_path / "apple_V01").mkdir()
+    (tmp_path / "apple_V02").mkdir()
+    with pytest.raises(RuntimeError):
+        reserve_version(tmp_path, "apple")
+
+
+def test_concurrent_reservations_get_different_versions(tmp_path):
+    count = 16
+    barrier = threading.Barrier(count)
+    versions = []
+
+    def reserve():
+        barrier.wait()
+        versions.append(reserve_version(tmp_path, "apple")[0])
+
+    threads = [threading.Thread(target=reserve) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(versions) == list(range(1, count + 1))
+    assert get_versions(tmp_path, "apple") == list(range(1, count + 1))